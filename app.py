@@ -1,16 +1,43 @@
-from flask import Flask, request, jsonify
-from models import db, Quote, WingTrip, Chat, Message, TripLeg, User
+from flask import Blueprint, Flask, Response, current_app, request, jsonify, stream_with_context
+from models import db, Quote, WingTrip, Chat, Message, TripLeg, User, AIJob, TripPartner, QuoteShare, QuoteTemplate
 import uuid
+from urllib.parse import urlencode
 import os
 import json
-import re
-from datetime import datetime
-import openai
-import base64
-import io
-import pdfplumber
-from schemas import TripInput, QuoteInput
+import math
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import case, func, insert, literal, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased, selectinload
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from schemas import TripInput, TripUpdateInput, QuoteInput
 from pydantic import ValidationError
+import parse_cache
+import pdf_extract
+import jobs
+import trip_parser
+import pagination
+import partners
+import message_bus
+import tokens
+import responses
+import migrations
+import llm
+import serving
+import metrics
+import prices
+import parse_corpus
+import upstream
+import compaction
+import quote_templates
+import search
+import trip_values
+import archive
+from trip_parser import fallback_regex_parser
 
 # === Auth Helper for AI Endpoints ===
 def verify_ai_auth(request):
@@ -18,81 +45,144 @@ def verify_ai_auth(request):
     provided_token = request.headers.get("X-Wingstack-AI-Key")
     return expected_token and provided_token == expected_token
 
-# === OpenAI Setup ===
-openai_api_key = os.environ.get('OPENAI_API_KEY')
-if not openai_api_key:
-    raise ValueError("Missing OPENAI_API_KEY environment variable.")
-client = openai.OpenAI(api_key=openai_api_key)
-
 # === Flask Setup ===
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('SQLALCHEMY_DATABASE_URI')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
-
-with app.app_context():
-    db.create_all()
-
-@app.route('/')
+# Importing this module has no side effects: no OpenAI client, no PDF stack and no
+# database round trips. Schema changes run via `flask --app wsgi init-db`.
+api = Blueprint("api", __name__)
+
+def create_app(config=None):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('SQLALCHEMY_DATABASE_URI')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = serving.engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+    if config:
+        app.config.update(config)
+    db.init_app(app)
+    jobs.init_app(app)
+    metrics.init_app(app, db)
+    archive.init_app(app)
+    app.register_blueprint(api)
+    app.cli.add_command(migrations.init_db_command)
+    app.cli.add_command(parse_cache.purge_parse_cache_command)
+    app.cli.add_command(jobs.purge_ai_jobs_command)
+    return app
+
+@api.route('/')
 def home():
     return jsonify({"message": "WingStack backend is alive!"})
 
-# === Fallback Regex Parser ===
-def fallback_regex_parser(text):
-    legs = []
-    date_pattern = r"\b(\d{1,2}/\d{1,2}/\d{2,4})\b"
-    airport_pattern = r"\b([A-Z]{3})[- ]+([A-Z]{3})\b"
-    pax_pattern = r"(\d+)\s*(pax|passengers|adults)"
-    budget_pattern = r"\$?(\d{1,3}(?:,\d{3})*|\d+)(k|K| thousand)?\s*(USD|usd|\$)?"
-
-    leg_matches = re.findall(rf"{airport_pattern}.*?{date_pattern}", text)
-    for match in leg_matches:
-        from_airport, to_airport, date_str = match
-        try:
-            formatted_date = datetime.strptime(date_str, "%m/%d/%Y").strftime("%m/%d/%Y")
-            legs.append({"from": from_airport, "to": to_airport, "date": formatted_date, "time": ""})
-        except:
-            continue
-
-    pax_match = re.search(pax_pattern, text.lower())
-    passenger_count = pax_match.group(1) if pax_match else ""
-
-    budget_match = re.search(budget_pattern, text)
-    if budget_match:
-        raw_amount = budget_match.group(1).replace(",", "")
-        if budget_match.group(2) in ["k", "K", " thousand"]:
-            budget = str(int(float(raw_amount) * 1000))
-        else:
-            budget = raw_amount
+# === Cached OpenAI Parsing ===
+def run_llm_parse(kind, input_text, system_prompt, user_prompt_template, model="gpt-4",
+                  temperature=0.2, max_tokens=800, validate=None, bypass_cache=False):
+    """Returns (parsed, cache_status) where cache_status is 'hit', 'miss' or 'bypass'."""
+    key = parse_cache.cache_key(kind, input_text, model, system_prompt, user_prompt_template, temperature, max_tokens)
+    if bypass_cache:
+        parse_cache.record_bypass()
     else:
-        budget = ""
+        cached = parse_cache.get(key)
+        if cached is not None:
+            return cached, "hit"
 
-    return {
-        "legs": legs,
-        "passenger_count": passenger_count,
-        "budget": budget
-    }
+    # Give the connection back to the pool for the length of the OpenAI call; batch
+    # threads would otherwise each pin one while they wait on GPT-4.
+    db.session.commit()
+    response = llm.create_completion(
+        kind,
+        model=model,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt_template.format(input_text=input_text)}
+        ],
+        temperature=temperature,
+        max_tokens=max_tokens
+    )
+    content = response.choices[0].message.content.strip()
+    parsed = json.loads(content)
+    if validate:
+        validate(parsed)
+
+    parse_cache.put(key, kind, model, parsed)
+    return parsed, "bypass" if bypass_cache else "miss"
+
+def ai_response(body, status_code, cache_status=None):
+    resp = jsonify(body)
+    if cache_status:
+        resp.headers["X-Wingstack-Cache"] = cache_status
+    if status_code == 503 and isinstance(body, dict) and body.get("retry_after"):
+        resp.headers["Retry-After"] = str(body["retry_after"])
+    return resp, status_code
+
+def upstream_unavailable_body(e):
+    return {"error": "AI parsing is temporarily unavailable. Please retry shortly.",
+            "reason": e.reason, "retry_after": e.retry_after}
+
+# === Async AI Jobs ===
+def submit_ai_job(kind, payload, coalesce_on=None):
+    job, coalesced = jobs.submit(kind, payload, coalesce_on=coalesce_on)
+    return jsonify({
+        "job_id": job.id,
+        "status": job.status,
+        "coalesced": coalesced,
+        "status_url": f"/jobs/{job.id}"
+    }), 202
+
+@api.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    # Polling needs the same credentials as submitting: the AI key, except for job
+    # kinds whose routes are open (chat summaries).
+    job = db.session.get(AIJob, job_id)
+    if jobs.requires_ai_auth(job.kind if job else None) and not verify_ai_auth(request):
+        return jsonify({"error": "Unauthorized"}), 401
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(jobs.serialize(job)), 200
 
-# === AI Trip Parsing Endpoint ===
-@app.route('/parse-trip-input', methods=['POST'])
-def parse_trip_input():
+@api.route('/parse-trip-input/stats', methods=['GET'])
+def get_trip_parser_stats():
     if not verify_ai_auth(request):
         return jsonify({"error": "Unauthorized"}), 401
+    return jsonify(trip_parser.tier_stats()), 200
 
-    data = request.get_json()
-    input_text = data.get("input_text", "").strip()
-    if not input_text:
-        return jsonify({"error": "No input text provided."}), 400
+@api.route('/upstream/stats', methods=['GET'])
+def get_upstream_stats():
+    if not verify_ai_auth(request):
+        return jsonify({"error": "Unauthorized"}), 401
+    return jsonify(upstream.stats()), 200
 
-    # ... (rest of your logic remains unchanged)
-    system_prompt = (
-        "You are an AI assistant for private jet bookings. "
-        "Extract trip details from natural language into a strict JSON format. "
-        "Correct spelling, infer IATA codes (KOAK = Oakland, MMSD = Cabo), convert dates to MM/DD/YYYY. "
-        "Include legs, passenger count, and budget if available. Use empty strings if missing."
-    )
+@api.route('/parse-cache/stats', methods=['GET'])
+def get_parse_cache_stats():
+    if not verify_ai_auth(request):
+        return jsonify({"error": "Unauthorized"}), 401
+    return jsonify(parse_cache.stats()), 200
 
-    user_prompt = f"""
+@api.route('/quote-templates/stats', methods=['GET'])
+def get_quote_template_stats():
+    if not verify_ai_auth(request):
+        return jsonify({"error": "Unauthorized"}), 401
+    templates, active, hits = db.session.execute(select(
+        func.count(QuoteTemplate.fingerprint),
+        func.count(QuoteTemplate.fingerprint).filter(
+            QuoteTemplate.confirmations >= quote_templates.TEMPLATE_MIN_CONFIRMATIONS),
+        func.coalesce(func.sum(QuoteTemplate.hits), 0)
+    )).one()
+    return jsonify(dict(quote_templates.stats(), templates=templates, active_templates=active, total_hits=hits)), 200
+
+metrics.register_stats("wingstack_trip_parser", "Trip parser tier counters (see /parse-trip-input/stats).", trip_parser.tier_stats)
+metrics.register_stats("wingstack_llm_upstream", "LLM circuit breaker and bulkhead counters (breaker_state_code: 0 closed, 1 half-open, 2 open).", upstream.stats)
+metrics.register_stats("wingstack_parse_corpus", "Parse corpus writer counters.", parse_corpus.stats)
+metrics.register_stats("wingstack_quote_templates", "Broker quote template counters (see /quote-templates/stats).", quote_templates.stats)
+metrics.register_stats("wingstack_archive", "Hot/cold trip archival counters.", archive.stats)
+metrics.register_stats("wingstack_parse_cache", "Parse cache counters (see /parse-cache/stats).", parse_cache.stats)
+
+# === AI Trip Parsing Endpoint ===
+TRIP_SYSTEM_PROMPT = (
+    "You are an AI assistant for private jet bookings. "
+    "Extract trip details from natural language into a strict JSON format. "
+    "Correct spelling, infer IATA codes (KOAK = Oakland, MMSD = Cabo), convert dates to MM/DD/YYYY. "
+    "Include legs, passenger count, and budget if available. Use empty strings if missing."
+)
+
+TRIP_USER_PROMPT = """
 Input: \"{input_text}\"
 
 Format:
@@ -103,50 +193,76 @@ Format:
 }}
 """
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.2,
-            max_tokens=600
-        )
-        content = response.choices[0].message.content.strip()
-        parsed = json.loads(content)
+def validate_trip_parse(parsed):
+    if not isinstance(parsed.get("legs"), list) or not parsed.get("passenger_count"):
+        raise ValueError("Missing required fields")
 
-        if not isinstance(parsed.get("legs"), list) or not parsed.get("passenger_count"):
-            raise ValueError("Missing required fields")
+@api.route('/parse-trip-input', methods=['POST'])
+def parse_trip_input():
+    if not verify_ai_auth(request):
+        return jsonify({"error": "Unauthorized"}), 401
 
-        return jsonify(parsed), 200
+    data = request.get_json()
+    input_text = data.get("input_text", "").strip()
+    if not input_text:
+        return jsonify({"error": "No input text provided."}), 400
+
+    bypass_cache = parse_cache.cache_bypassed(request)
+    if jobs.wants_async(request):
+        return submit_ai_job("parse_trip", {"input_text": input_text, "no_cache": bypass_cache}, coalesce_on=[input_text, bypass_cache])
+    return ai_response(*do_parse_trip(input_text, bypass_cache))
+
+def do_parse_trip(input_text, bypass_cache=False):
+    # Tier 1: deterministic shorthand parser; the LLM is only asked when it isn't confident.
+    deterministic, confidence, missing = trip_parser.parse_deterministic(input_text)
+    if trip_parser.is_confident(confidence, missing):
+        trip_parser.record_tier("deterministic")
+        parse_corpus.maybe_sample("trip", input_text, "deterministic", deterministic, confidence)
+        return dict(deterministic, tier="deterministic", confidence=confidence), 200, None
+
+    try:
+        parsed, cache_status = run_llm_parse(
+            "trip", input_text, TRIP_SYSTEM_PROMPT, TRIP_USER_PROMPT,
+            max_tokens=600, validate=validate_trip_parse, bypass_cache=bypass_cache
+        )
+        trip_parser.record_tier("llm")
+        parse_corpus.maybe_sample("trip", input_text, "llm", parsed, confidence)
+        return dict(parsed, tier="llm"), 200, cache_status
+
+    except upstream.UpstreamUnavailable as e:
+        # Breaker open or bulkhead full: answer from the regex parser without waiting on OpenAI.
+        trip_parser.record_tier("fallback")
+        metrics.parse_fallbacks.inc(kind="trip", reason="upstream_unavailable")
+        fallback = fallback_regex_parser(input_text)
+        return dict(fallback, tier="fallback", confidence=confidence), 200, None
 
     except Exception as e:
         print("❌ AI failed. Falling back to regex parser.")
+        trip_parser.record_tier("fallback")
+        metrics.parse_fallbacks.inc(kind="trip", reason="timeout" if upstream.is_timeout(e) else "error")
         fallback = fallback_regex_parser(input_text)
+        parse_corpus.record("trip", "failure", input_text, tier="fallback", result=fallback,
+                            error=str(e), confidence=confidence)
 
-        # Log failed input
-        os.makedirs("logs", exist_ok=True)
-        with open("logs/failed_parse_logs.txt", "a") as f:
-            f.write(f"[{datetime.now()}] Failed AI input:\n{input_text}\nFallback result:\n{json.dumps(fallback)}\n\n")
+        return dict(fallback, tier="fallback", confidence=confidence), 200, None
 
-        return jsonify(fallback), 200
+jobs.register("parse_trip", lambda p: do_parse_trip(p["input_text"], p.get("no_cache"))[:2])
 
 # === Trip Creation ===
-@app.route('/trips', methods=['POST'])
+@api.route('/trips', methods=['POST'])
 def create_trip():
     data = request.get_json()
-    print("\U0001F4E6 Received trip data:", data)
+    current_app.logger.debug("Received trip data: %s", data)
 
     required = ["route", "departure_date"]
     if not all(field in data for field in required):
-        print("❌ Missing required fields:", data)
+        current_app.logger.info("Trip rejected: missing required fields")
         return jsonify({"error": "Missing required fields"}), 400
 
     try:
         datetime.strptime(data["departure_date"], "%m/%d/%Y")
     except ValueError:
-        print("❌ Invalid date format:", data["departure_date"])
+        current_app.logger.info("Trip rejected: invalid date format %r", data["departure_date"])
         return jsonify({"error": "Invalid date format. Use MM/DD/YYYY."}), 400
 
     trip_id = str(uuid.uuid4())
@@ -157,6 +273,7 @@ def create_trip():
         passenger_count=data.get("passenger_count", ""),
         size=data.get("size", ""),
         budget=data.get("budget", ""),
+        **trip_values.typed_values(data["departure_date"], data.get("passenger_count"), data.get("budget")),
         partner_names=json.dumps(data.get("partner_names", [])),
         partner_emails=json.dumps(data.get("partner_emails", [])),
         planner_name=data.get("planner_name", ""),
@@ -165,6 +282,7 @@ def create_trip():
         created_at=datetime.utcnow()
     )
     db.session.add(trip)
+    db.session.add_all(partners.trip_partner_rows(trip_id, data.get("partner_emails", []), data.get("partner_names", [])))
 
     for leg in data.get("legs", []):
         try:
@@ -179,59 +297,425 @@ def create_trip():
                 time=time_obj
             ))
         except ValueError:
-            print("❌ Invalid leg format:", leg)
+            current_app.logger.info("Trip rejected: invalid leg format %r", leg)
             return jsonify({"error": f"Invalid leg date/time format: {leg}"}), 400
 
     db.session.commit()
-    print("✅ Trip created successfully:", trip_id)
+    current_app.logger.info("Trip created: %s", trip_id)
     return jsonify({"status": "success", "id": trip_id}), 200
-@app.route('/trips', methods=['GET'])
+
+# === Bulk Trip Ingestion ===
+BULK_TRIPS_MAX_ITEMS = int(os.environ.get("BULK_TRIPS_MAX_ITEMS", 5000))
+
+@lru_cache(maxsize=4096)
+def parse_leg_date(value):
+    return datetime.strptime(value, "%m/%d/%Y").date()
+
+@lru_cache(maxsize=1440)
+def parse_leg_time(value):
+    return datetime.strptime(value, "%H:%M").time()
+
+def validation_errors(e):
+    return [{"loc": list(err["loc"]), "msg": err["msg"]} for err in e.errors()]
+
+@api.route('/trips/bulk', methods=['POST'])
+def create_trips_bulk():
+    data = request.get_json(silent=True) or {}
+    items = data.get("trips")
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "trips must be a non-empty list."}), 400
+    if len(items) > BULK_TRIPS_MAX_ITEMS:
+        return jsonify({"error": f"Bulk import is limited to {BULK_TRIPS_MAX_ITEMS} trips per request."}), 400
+
+    now = datetime.utcnow()
+    trip_rows, leg_rows, partner_rows, results = [], [], [], []
+
+    # Validate everything first so a bad item is reported without touching the database.
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results.append({"index": index, "errors": [{"loc": [], "msg": "Trip must be a JSON object."}]})
+            continue
+        try:
+            trip_input = TripInput(**item)
+            legs = [
+                (leg.from_, leg.to, parse_leg_date(leg.date), parse_leg_time(leg.time.strip()))
+                for leg in trip_input.legs
+            ]
+        except ValidationError as e:
+            results.append({"index": index, "errors": validation_errors(e)})
+            continue
+        except ValueError as e:
+            results.append({"index": index, "errors": [{"loc": ["legs"], "msg": str(e)}]})
+            continue
+
+        trip_id = str(uuid.uuid4())
+        trip_rows.append({
+            "id": trip_id,
+            "route": trip_input.route,
+            "departure_date": trip_input.departure_date,
+            "passenger_count": str(trip_input.passenger_count),
+            "size": item.get("size", ""),
+            "budget": trip_input.budget,
+            **trip_values.typed_values(trip_input.departure_date, trip_input.passenger_count, trip_input.budget),
+            "partner_names": json.dumps(trip_input.partner_names),
+            "partner_emails": json.dumps(trip_input.partner_emails),
+            "planner_name": trip_input.planner_name,
+            "planner_email": trip_input.planner_email,
+            "status": trip_input.status,
+            "created_at": now
+        })
+        for from_location, to_location, leg_date, leg_time in legs:
+            leg_rows.append({
+                "id": str(uuid.uuid4()),
+                "trip_id": trip_id,
+                "from_location": from_location,
+                "to_location": to_location,
+                "date": leg_date,
+                "time": leg_time
+            })
+        partner_rows.extend(
+            {"trip_id": p.trip_id, "email": p.email, "name": p.name}
+            for p in partners.trip_partner_rows(trip_id, trip_input.partner_emails, trip_input.partner_names)
+        )
+        results.append({"index": index, "id": trip_id})
+
+    # One transaction, one executemany per table.
+    if trip_rows:
+        try:
+            db.session.execute(insert(WingTrip), trip_rows)
+            if leg_rows:
+                db.session.execute(insert(TripLeg), leg_rows)
+            if partner_rows:
+                db.session.execute(insert(TripPartner), partner_rows)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.exception("Bulk trip insert failed")
+            return jsonify({"error": "Bulk insert failed", "details": str(e)}), 500
+
+    return jsonify({
+        "created": len(trip_rows),
+        "failed": len(items) - len(trip_rows),
+        "results": results
+    }), 200
+# === Trip Listing ===
+def _first(values):
+    return values[0] if values else ""
+
+# Projectable fields: name -> (columns needed, serializer). Partner lists are decoded once per row.
+TRIP_FIELDS = {
+    "id": (("id",), lambda r, p: r.id),
+    "route": (("route",), lambda r, p: r.route),
+    "departure_date": (("departure_date",), lambda r, p: r.departure_date),
+    "passenger_count": (("passenger_count",), lambda r, p: r.passenger_count),
+    "size": (("size",), lambda r, p: r.size),
+    "budget": (("budget",), lambda r, p: r.budget),
+    "departure_on": (("departure_on",), lambda r, p: r.departure_on.isoformat() if r.departure_on else None),
+    "passengers": (("passengers",), lambda r, p: r.passengers),
+    "budget_amount": (("budget_amount",), lambda r, p: r.budget_amount),
+    "partner_names": (("partner_names",), lambda r, p: p("partner_names")),
+    "partner_emails": (("partner_emails",), lambda r, p: p("partner_emails")),
+    "planner_name": (("planner_name",), lambda r, p: r.planner_name),
+    "planner_email": (("planner_email",), lambda r, p: r.planner_email),
+    "status": (("status",), lambda r, p: r.status),
+    "created_at": (("created_at",), lambda r, p: r.created_at.isoformat() if r.created_at else None),
+    "broker_name": (("partner_names",), lambda r, p: _first(p("partner_names"))),
+    "broker_email": (("partner_emails",), lambda r, p: _first(p("partner_emails")))
+}
+
+def serialize_trip_row(row, fields):
+    decoded = {}
+
+    def partners(column):
+        if column not in decoded:
+            decoded[column] = json.loads(getattr(row, column) or "[]")
+        return decoded[column]
+
+    return {field: TRIP_FIELDS[field][1](row, partners) for field in fields}
+
+def paged_trips_response(apply_filters):
+    try:
+        limit = pagination.parse_limit(request.args.get("limit"))
+        fields = pagination.parse_fields(request.args.get("fields"), TRIP_FIELDS)
+        cursor = request.args.get("cursor")
+        after = pagination.decode_cursor(cursor, datetime, str) if cursor else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Conditional GET: count + newest change over the filtered set decide the ETag before any rows load.
+    count, last_modified = db.session.execute(apply_filters(
+        select(func.count(WingTrip.id), func.max(func.coalesce(WingTrip.updated_at, WingTrip.created_at)))
+        .select_from(WingTrip)
+    )).one()
+    etag = responses.weak_etag(request.full_path, count, last_modified)
+    if responses.not_modified(request, etag, last_modified):
+        return responses.validators(Response(status=304), etag, last_modified)
+
+    # Only the projected columns are selected; id/created_at are always needed for the cursor.
+    column_names = {"id", "created_at"}
+    for field in fields:
+        column_names.update(TRIP_FIELDS[field][0])
+    columns = [getattr(WingTrip, name) for name in sorted(column_names)]
+
+    query = apply_filters(select(*columns))
+    if after:
+        query = query.where(tuple_(WingTrip.created_at, WingTrip.id) < after)
+    query = query.order_by(WingTrip.created_at.desc(), WingTrip.id.desc()).limit(limit + 1)
+
+    rows = db.session.execute(query).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    results = []
+    for row in rows:
+        try:
+            results.append(serialize_trip_row(row, fields))
+        except Exception as trip_err:
+            print(f"❌ Error processing trip {row.id}: {trip_err}")
+
+    resp = responses.json_response(results)
+    if has_more:
+        # The body stays a plain list for existing clients; the next page is advertised in headers.
+        next_cursor = pagination.encode_cursor(rows[-1].created_at, rows[-1].id)
+        resp.headers["X-Next-Cursor"] = next_cursor
+        resp.headers["Link"] = f'<{request.base_url}?{next_page_query(next_cursor)}>; rel="next"'
+    return responses.validators(resp, etag, last_modified), 200
+
+@api.route('/trips', methods=['GET'])
 def get_trips():
     try:
         status_filter = request.args.get("status")
         planner_email = request.args.get("planner_email")
 
-        query = WingTrip.query
-        if status_filter:
-            query = query.filter_by(status=status_filter)
-        if planner_email:
-            query = query.filter_by(planner_email=planner_email)
-
-        trips = query.all()
+        def apply_filters(query):
+            if status_filter:
+                query = query.where(WingTrip.status == status_filter)
+            if planner_email:
+                query = query.where(WingTrip.planner_email == planner_email)
+            return query
 
-        results = []
-        for t in trips:
-            try:
-                results.append({
-                    "id": t.id,
-                    "route": t.route,
-                    "departure_date": t.departure_date,
-                    "passenger_count": t.passenger_count,
-                    "size": t.size,
-                    "budget": t.budget,
-                    "partner_names": json.loads(t.partner_names or "[]"),
-                    "partner_emails": json.loads(t.partner_emails or "[]"),
-                    "planner_name": t.planner_name,
-                    "planner_email": t.planner_email,
-                    "status": t.status,
-                    "created_at": t.created_at.isoformat() if t.created_at else None,
-                    "broker_name": json.loads(t.partner_names or "[]")[0] if t.partner_names else "",
-                    "broker_email": json.loads(t.partner_emails or "[]")[0] if t.partner_emails else ""
-                })
-            except Exception as trip_err:
-                print(f"❌ Error processing trip {t.id}: {trip_err}")
-
-        return jsonify(results), 200
+        return paged_trips_response(apply_filters)
 
     except Exception as e:
         print(f"❌ Error in /trips GET route: {e}")
         return jsonify({"error": "Internal server error", "details": str(e)}), 500
 
+@api.route('/trips/invited', methods=['GET'])
+def get_invited_trips():
+    email = partners.normalize_email(request.args.get("email"))
+    if not email:
+        return jsonify({"error": "Email is required"}), 400
+    status_filter = request.args.get("status")
+
+    def apply_filters(query):
+        query = query.join(TripPartner, TripPartner.trip_id == WingTrip.id).where(TripPartner.email == email)
+        if status_filter:
+            query = query.where(WingTrip.status == status_filter)
+        return query
+
+    return paged_trips_response(apply_filters)
+
+def next_page_query(next_cursor):
+    args = request.args.to_dict()
+    args["cursor"] = next_cursor
+    return urlencode(args)
+
+# === Planner Dashboard ===
+# One request per board instead of GET /trips plus legs, chat and quotes per trip.
+# Five queries regardless of page size: the trip page, legs and chats (selectinload),
+# then the best quote and the latest message per trip, each ranked with a window function.
+def best_quotes_by_trip(trip_ids):
+    ranked = select(
+        Quote.trip_id,
+        Quote.id,
+        Quote.aircraft_type,
+        Quote.price_amount,
+        Quote.price_currency,
+        func.row_number().over(
+            partition_by=Quote.trip_id,
+            order_by=(Quote.price_amount.is_(None), Quote.price_amount, Quote.id)
+        ).label("rn"),
+        func.count().over(partition_by=Quote.trip_id).label("quote_count")
+    ).where(Quote.trip_id.in_(trip_ids)).subquery()
+    rows = db.session.execute(select(ranked).where(ranked.c.rn == 1)).all()
+    return {row.trip_id: row for row in rows}
+
+def latest_messages_by_chat(chat_ids):
+    ranked = select(
+        Message,
+        func.row_number().over(
+            partition_by=Message.chat_id,
+            order_by=(Message.timestamp.desc(), Message.id.desc())
+        ).label("rn")
+    ).where(Message.chat_id.in_(chat_ids)).subquery()
+    latest = aliased(Message, ranked)
+    return {m.chat_id: m for m in db.session.scalars(select(latest).where(ranked.c.rn == 1))}
+
+def serialize_dashboard_trip(trip, best, latest):
+    legs = sorted(trip.legs, key=lambda l: (l.date is None, l.date, l.time is None, l.time, l.id))
+    return dict(
+        serialize_trip_row(trip, TRIP_FIELDS),
+        legs=[{
+            "id": l.id,
+            "from": l.from_location,
+            "to": l.to_location,
+            "date": l.date.isoformat() if l.date else "",
+            "time": l.time.strftime("%H:%M") if l.time else ""
+        } for l in legs],
+        chat_id=trip.chat.id if trip.chat else None,
+        latest_message=serialize_message(latest) if latest else None,
+        quote_count=best.quote_count if best else 0,
+        best_quote={
+            "id": best.id,
+            "aircraft_type": best.aircraft_type,
+            "price_amount": best.price_amount,
+            "price_currency": best.price_currency
+        } if best and best.price_amount is not None else None
+    )
+
+@api.route('/trips/dashboard', methods=['GET'])
+def get_trip_dashboard():
+    try:
+        limit = pagination.parse_limit(request.args.get("limit"), default=50)
+        cursor = request.args.get("cursor")
+        after = pagination.decode_cursor(cursor, datetime, str) if cursor else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    query = select(WingTrip).options(selectinload(WingTrip.legs), selectinload(WingTrip.chat))
+    if request.args.get("status"):
+        query = query.where(WingTrip.status == request.args["status"])
+    if request.args.get("planner_email"):
+        query = query.where(WingTrip.planner_email == request.args["planner_email"])
+    if after:
+        query = query.where(tuple_(WingTrip.created_at, WingTrip.id) < after)
+    query = query.order_by(WingTrip.created_at.desc(), WingTrip.id.desc()).limit(limit + 1)
+
+    trips = db.session.scalars(query).all()
+    has_more = len(trips) > limit
+    trips = trips[:limit]
+
+    best_quotes = best_quotes_by_trip([t.id for t in trips]) if trips else {}
+    chat_ids = [t.chat.id for t in trips if t.chat]
+    latest = latest_messages_by_chat(chat_ids) if chat_ids else {}
+
+    resp = responses.json_response([
+        serialize_dashboard_trip(t, best_quotes.get(t.id), latest.get(t.chat.id) if t.chat else None)
+        for t in trips
+    ])
+    if has_more:
+        next_cursor = pagination.encode_cursor(trips[-1].created_at, trips[-1].id)
+        resp.headers["X-Next-Cursor"] = next_cursor
+        resp.headers["Link"] = f'<{request.base_url}?{next_page_query(next_cursor)}>; rel="next"'
+    return resp, 200
+
+# === Upcoming Departures ===
+UPCOMING_DEFAULT_STATUSES = ("pending", "booked")
+UPCOMING_MAX_DAYS = 366
+
+def parse_upcoming_window(args):
+    start = trip_values.parse_departure(args["from"]) if args.get("from") else datetime.utcnow().date()
+    if start is None:
+        raise ValueError("from must be a date (MM/DD/YYYY or YYYY-MM-DD).")
+    try:
+        days = int(args.get("days") or 7)
+    except ValueError:
+        raise ValueError("days must be an integer.")
+    if not 1 <= days <= UPCOMING_MAX_DAYS:
+        raise ValueError(f"days must be between 1 and {UPCOMING_MAX_DAYS}.")
+    return start, start + timedelta(days=days - 1)
+
+def legs_in_window(trip_ids, start, end):
+    legs = db.session.scalars(
+        select(TripLeg).where(TripLeg.trip_id.in_(trip_ids), TripLeg.date.between(start, end))
+        .order_by(TripLeg.trip_id, TripLeg.date, TripLeg.time.is_(None), TripLeg.time, TripLeg.id)
+    ).all()
+    by_trip = {}
+    for leg in legs:
+        by_trip.setdefault(leg.trip_id, []).append(leg)
+    return by_trip
+
+@api.route('/trips/upcoming', methods=['GET'])
+def get_upcoming_trips():
+    # ?days=7[&from=2025-06-20][&status=pending,booked][&min_budget=40000][&max_budget=][&planner_email=]
+    # Trips whose departure_on falls in the window, soonest first, each with its legs flying in the window.
+    try:
+        start, end = parse_upcoming_window(request.args)
+        min_budget = optional_float_arg("min_budget")
+        max_budget = optional_float_arg("max_budget")
+        limit = pagination.parse_limit(request.args.get("limit"), default=50)
+        fields = pagination.parse_fields(request.args.get("fields"), TRIP_FIELDS)
+        cursor = request.args.get("cursor")
+        after = pagination.decode_cursor(cursor, str, str) if cursor else None
+        if after:
+            after = (datetime.fromisoformat(after[0]).date(), after[1])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    statuses = [s.strip() for s in request.args.get("status", "").split(",") if s.strip()] or UPCOMING_DEFAULT_STATUSES
+    query = select(WingTrip).where(WingTrip.status.in_(statuses), WingTrip.departure_on.between(start, end))
+    if min_budget is not None:
+        query = query.where(WingTrip.budget_amount >= min_budget)
+    if max_budget is not None:
+        query = query.where(WingTrip.budget_amount <= max_budget)
+    if request.args.get("planner_email"):
+        query = query.where(WingTrip.planner_email == request.args["planner_email"])
+    if after:
+        query = query.where(tuple_(WingTrip.departure_on, WingTrip.id) > after)
+    trips = db.session.scalars(query.order_by(WingTrip.departure_on, WingTrip.id).limit(limit + 1)).all()
+    has_more = len(trips) > limit
+    trips = trips[:limit]
+
+    legs = legs_in_window([t.id for t in trips], start, end) if trips else {}
+    resp = responses.json_response([
+        dict(serialize_trip_row(t, fields), departures=[{
+            "id": l.id,
+            "from": l.from_location,
+            "to": l.to_location,
+            "date": l.date.isoformat(),
+            "time": l.time.strftime("%H:%M") if l.time else ""
+        } for l in legs.get(t.id, [])])
+        for t in trips
+    ])
+    if has_more:
+        next_cursor = pagination.encode_cursor(trips[-1].departure_on.isoformat(), trips[-1].id)
+        resp.headers["X-Next-Cursor"] = next_cursor
+        resp.headers["Link"] = f'<{request.base_url}?{next_page_query(next_cursor)}>; rel="next"'
+    return resp, 200
+
+# === Search ===
+@api.route('/search', methods=['GET'])
+def search_everything():
+    # ?q=g450 pets&email=<planner or partner>[&types=message,quote,trip][&limit=][&cursor=]
+    email = request.args.get("email")
+    if not email:
+        return jsonify({"error": "Email is required"}), 400
+    if not search.query_terms(request.args.get("q")):
+        return jsonify({"error": "Search query is required"}), 400
+    try:
+        limit = pagination.parse_limit(request.args.get("limit"), default=20, maximum=100)
+        doc_types = pagination.parse_fields(request.args.get("types"), search.DOC_TYPES)
+        cursor = request.args.get("cursor")
+        after = pagination.decode_cursor(cursor, float, str, str) if cursor else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    rows = search.search(request.args["q"], email, doc_types, limit, after)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    resp = responses.json_response([search.serialize_result(r) for r in rows])
+    if has_more:
+        next_cursor = pagination.encode_cursor(float(rows[-1].rank), rows[-1].doc_type, rows[-1].doc_id)
+        resp.headers["X-Next-Cursor"] = next_cursor
+        resp.headers["Link"] = f'<{request.base_url}?{next_page_query(next_cursor)}>; rel="next"'
+    return resp, 200
+
 # You can leave the rest of app.py (PATCH, DELETE, CHAT, etc.) unchanged unless you want to support updates to partner lists.
 
 # (Optional improvements: update PATCH endpoint to support editing partner_emails and partner_names)
 
-@app.route('/trips/<trip_id>', methods=['PATCH'])
+@api.route('/trips/<trip_id>', methods=['PATCH'])
 def update_trip(trip_id):
     trip = WingTrip.query.get(trip_id)
     if not trip:
@@ -240,7 +724,7 @@ def update_trip(trip_id):
     try:
         validated_data = TripUpdateInput(**request.get_json())
     except ValidationError as e:
-        return jsonify({"error": e.errors()}), 400
+        return jsonify({"error": validation_errors(e)}), 400
 
     if validated_data.route is not None:
         trip.route = validated_data.route
@@ -250,141 +734,309 @@ def update_trip(trip_id):
         trip.passenger_count = validated_data.passenger_count
     if validated_data.budget is not None:
         trip.budget = validated_data.budget
+    for column, value in trip_values.typed_values(trip.departure_date, trip.passenger_count, trip.budget).items():
+        setattr(trip, column, value)
     if validated_data.status is not None:
         trip.status = validated_data.status
 
     db.session.commit()
     return jsonify({"status": "updated"}), 200
     
-@app.route('/trips/mark-booked/<trip_id>', methods=['POST'])
+def set_trip_status(trip_id, status):
+    """UPDATE ... RETURNING in one round trip; returns False if the trip doesn't exist. Caller commits."""
+    row = db.session.execute(
+        update(WingTrip).where(WingTrip.id == trip_id).values(status=status).returning(WingTrip.id)
+    ).first()
+    if row is None:
+        db.session.rollback()
+        return False
+    return True
+
+@api.route('/trips/mark-booked/<trip_id>', methods=['POST'])
 def mark_trip_as_booked(trip_id):
-    trip = WingTrip.query.get(trip_id)
-    if not trip:
+    if not set_trip_status(trip_id, "booked"):
         return jsonify({"error": "Trip not found"}), 404
-    trip.status = "booked"
     db.session.commit()
     return jsonify({"message": f"Trip {trip_id} marked as booked"}), 200
 
-@app.route('/trips/<trip_id>/legs', methods=['GET'])
+@api.route('/trips/<trip_id>/legs', methods=['GET'])
 def get_trip_legs(trip_id):
-    legs = TripLeg.query.filter_by(trip_id=trip_id).all()
-    return jsonify([{
-        "id": l.id,
-        "from": l.from_location,
-        "to": l.to_location,
-        "date": l.date.isoformat() if l.date else "",
-        "time": l.time.strftime("%H:%M") if l.time else ""
-    } for l in legs]), 200
-
-@app.route('/trips/archive/<trip_id>', methods=['POST'])
+    # Legs are only ever inserted, so count + id range identifies the set.
+    count, min_id, max_id = db.session.execute(
+        select(func.count(TripLeg.id), func.min(TripLeg.id), func.max(TripLeg.id)).where(TripLeg.trip_id == trip_id)
+    ).one()
+    etag = responses.weak_etag("legs", trip_id, count, min_id, max_id)
+
+    def build_payload():
+        legs = TripLeg.query.filter_by(trip_id=trip_id).all()
+        return [{
+            "id": l.id,
+            "from": l.from_location,
+            "to": l.to_location,
+            "date": l.date.isoformat() if l.date else "",
+            "time": l.time.strftime("%H:%M") if l.time else ""
+        } for l in legs]
+
+    return responses.conditional_response(request, etag, None, build_payload)
+
+@api.route('/trips/archive/<trip_id>', methods=['POST'])
 def archive_trip(trip_id):
-    trip = WingTrip.query.get(trip_id)
-    if not trip:
+    if not set_trip_status(trip_id, "archived"):
         return jsonify({"error": "Trip not found"}), 404
-    trip.status = "archived"
     db.session.commit()
     return jsonify({"status": "archived"}), 200
 
-@app.route('/trips/restore/<trip_id>', methods=['POST'])
+@api.route('/trips/restore/<trip_id>', methods=['POST'])
 def restore_trip(trip_id):
-    trip = WingTrip.query.get(trip_id)
-    if not trip:
-        return jsonify({"error": "Trip not found"}), 404
-    trip.status = "pending"
+    rehydrated = False
+    if not set_trip_status(trip_id, "pending"):
+        # Old deleted/archived trips live in the cold archive tables; bring them back first.
+        try:
+            rehydrated = archive.rehydrate(trip_id)
+        except IntegrityError:
+            db.session.rollback()
+            if db.session.get(WingTrip, trip_id) is None:
+                raise
+            # A concurrent restore already brought it back.
+        if not set_trip_status(trip_id, "pending"):
+            return jsonify({"error": "Trip not found"}), 404
     db.session.commit()
-    return jsonify({"status": "restored"}), 200
+    return jsonify({"status": "restored", "rehydrated": rehydrated}), 200
 
-@app.route('/trips/<trip_id>', methods=['DELETE'])
+@api.route('/trips/<trip_id>', methods=['DELETE'])
 def delete_trip(trip_id):
-    trip = WingTrip.query.get(trip_id)
-    if not trip:
+    # Status change, chat and system message go out in one transaction.
+    if not set_trip_status(trip_id, "deleted"):
         return jsonify({"error": "Trip not found"}), 404
 
-    trip.status = "deleted"
+    chat_id, _ = upsert_chat(trip_id)
+    add_system_message(chat_id, "Planner has deleted this trip request.")
     db.session.commit()
+    message_bus.publish(chat_id)
 
-    # ✅ Create chat and system message
-    chat = Chat.query.filter_by(trip_id=trip_id).first()
-    if not chat:
-        chat = Chat(trip_id=trip_id)
-        db.session.add(chat)
-        db.session.commit()
+    return jsonify({"status": "deleted", "chat_id": chat_id}), 200
 
-    msg = Message(
-        chat_id=chat.id,
-        sender_email="system@wingstack.ai",
-        content="Planner has deleted this trip request."
-    )
-    db.session.add(msg)
-    db.session.commit()
-
-    return jsonify({"status": "deleted", "chat_id": chat.id}), 200
-
-@app.route('/submit-quote', methods=['POST'])
+@api.route('/submit-quote', methods=['POST'])
 def submit_quote():
     data = request.get_json()
     required = ["trip_id", "broker_name", "operator_name", "aircraft_type", "price"]
     if not all(k in data for k in required):
         return jsonify({"error": "Missing required fields"}), 400
 
+    price_amount, price_currency = prices.parse_price(data["price"])
     quote = Quote(
         id=str(uuid.uuid4()),
         trip_id=data["trip_id"],
         broker_name=data["broker_name"],
         operator_name=data["operator_name"],
         aircraft_type=data["aircraft_type"],
+        aircraft_category=data.get("aircraft_category"),
         price=data["price"],
+        price_amount=price_amount,
+        price_currency=price_currency,
         notes=data.get("notes", ""),
         submitted_by_email=data.get("submitted_by_email", ""),
         shared_with_emails=data.get("shared_with_emails", ""),
         created_at=datetime.utcnow()
     )
     db.session.add(quote)
+    db.session.add_all(partners.quote_share_rows(quote.id, quote.shared_with_emails))
     db.session.commit()
     return jsonify({"status": "success", "id": quote.id}), 200
 
-@app.route('/quotes/by-email', methods=['GET'])
-def get_quotes_by_email():
-    email = request.args.get("email")
-    if not email:
-        return jsonify({"error": "Email is required"}), 400
-
-    quotes = Quote.query.filter(
-        (Quote.submitted_by_email == email) |
-        (Quote.shared_with_emails.like(f"%{email}%"))
-    ).all()
-
-    return jsonify([{
+def serialize_quote(q):
+    return {
         "id": q.id,
         "trip_id": q.trip_id,
         "broker_name": q.broker_name,
         "operator_name": q.operator_name,
         "aircraft_type": q.aircraft_type,
+        "aircraft_category": q.aircraft_category,
         "price": q.price,
+        "price_amount": q.price_amount,
+        "price_currency": q.price_currency,
         "notes": q.notes,
         "submitted_by_email": q.submitted_by_email,
         "shared_with_emails": q.shared_with_emails,
         "created_at": q.created_at.isoformat()
-    } for q in quotes]), 200
+    }
 
-@app.route('/chat/<trip_id>', methods=['GET'])
-def get_or_create_chat(trip_id):
-    chat = Chat.query.filter_by(trip_id=trip_id).first()
-    if not chat:
-        chat = Chat(trip_id=trip_id)
-        db.session.add(chat)
-        db.session.commit()
+def shared_quote_ids(email):
+    return select(QuoteShare.quote_id).where(QuoteShare.email == partners.normalize_email(email))
+
+# === Quote Comparison ===
+QUOTE_SORTS = {
+    "price": (Quote.price_amount.is_(None), Quote.price_amount, Quote.id),
+    "-price": (Quote.price_amount.is_(None), Quote.price_amount.desc(), Quote.id),
+    "created_at": (Quote.created_at, Quote.id),
+    "-created_at": (Quote.created_at.desc(), Quote.id)
+}
+
+def optional_float_arg(name):
+    raw = request.args.get(name)
+    if raw in (None, ""):
+        return None
+    try:
+        value = float(raw)
+    except ValueError:
+        raise ValueError(f"{name} must be a number.")
+    if not math.isfinite(value):
+        raise ValueError(f"{name} must be a number.")
+    return value
+
+def quote_category_stats(conditions):
+    # Median per (category, currency) via window functions, so SQLite and Postgres share one query.
+    category_key = func.lower(Quote.aircraft_category)
+    partition = (category_key, Quote.price_currency)
+    ranked = select(
+        category_key.label("category_key"),
+        Quote.aircraft_category.label("category"),
+        Quote.price_currency.label("currency"),
+        Quote.price_amount.label("price"),
+        func.row_number().over(partition_by=partition, order_by=Quote.price_amount).label("rn"),
+        func.count().over(partition_by=partition).label("n")
+    ).where(*conditions, Quote.price_amount.isnot(None)).subquery()
+
+    middle = (ranked.c.rn == (ranked.c.n + 1) // 2) | (ranked.c.rn == (ranked.c.n + 2) // 2)
+    rows = db.session.execute(
+        select(
+            func.min(ranked.c.category),
+            ranked.c.currency,
+            func.count(),
+            func.min(ranked.c.price),
+            func.avg(case((middle, ranked.c.price)))
+        ).group_by(ranked.c.category_key, ranked.c.currency).order_by(func.min(ranked.c.price))
+    ).all()
+    return [{
+        "aircraft_category": category,
+        "currency": currency,
+        "count": count,
+        "min_price": float(min_price),
+        "median_price": round(float(median), 2)
+    } for category, currency, count, min_price, median in rows]
+
+@api.route('/trips/<trip_id>/quotes', methods=['GET'])
+def compare_trip_quotes(trip_id):
+    sort = request.args.get("sort", "price")
+    if sort not in QUOTE_SORTS:
+        return jsonify({"error": f"sort must be one of {', '.join(QUOTE_SORTS)}"}), 400
+    try:
+        min_price = optional_float_arg("min_price")
+        max_price = optional_float_arg("max_price")
+        limit = pagination.parse_limit(request.args.get("limit"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    conditions = [Quote.trip_id == trip_id]
+    if min_price is not None:
+        conditions.append(Quote.price_amount >= min_price)
+    if max_price is not None:
+        conditions.append(Quote.price_amount <= max_price)
+    categories = [c.strip().lower() for c in (request.args.get("category") or "").split(",") if c.strip()]
+    if categories:
+        conditions.append(func.lower(Quote.aircraft_category).in_(categories))
+    if request.args.get("aircraft"):
+        conditions.append(Quote.aircraft_type.ilike(f"%{request.args['aircraft']}%"))
+    if request.args.get("currency"):
+        conditions.append(Quote.price_currency == request.args["currency"].upper())
+
+    # Quotes are insert-only, so count + newest created_at identifies the filtered set.
+    count, priced, last_modified = db.session.execute(
+        select(func.count(Quote.id), func.count(Quote.price_amount), func.max(Quote.created_at)).where(*conditions)
+    ).one()
+    etag = responses.weak_etag(request.full_path, count, last_modified)
+
+    def build_payload():
+        quotes = Quote.query.filter(*conditions).order_by(*QUOTE_SORTS[sort]).limit(limit).all()
+        return {
+            "trip_id": trip_id,
+            "quotes": [serialize_quote(q) for q in quotes],
+            "aggregates": {
+                "count": count,
+                "unpriced_count": count - priced,
+                "by_category": quote_category_stats(conditions)
+            }
+        }
+
+    return responses.conditional_response(request, etag, last_modified, build_payload)
+
+@api.route('/quotes/by-email', methods=['GET'])
+def get_quotes_by_email():
+    email = request.args.get("email")
+    if not email:
+        return jsonify({"error": "Email is required"}), 400
+
+    condition = (Quote.submitted_by_email == email) | (Quote.id.in_(shared_quote_ids(email)))
+    count, last_modified = db.session.execute(
+        select(func.count(Quote.id), func.max(Quote.created_at)).where(condition)
+    ).one()
+    etag = responses.weak_etag("quotes", email, count, last_modified)
 
+    def build_payload():
+        return [serialize_quote(q) for q in Quote.query.filter(condition).all()]
+
+    return responses.conditional_response(request, etag, last_modified, build_payload)
+
+@api.route('/quotes/shared-with-me', methods=['GET'])
+def get_quotes_shared_with_me():
+    email = request.args.get("email")
+    if not email:
+        return jsonify({"error": "Email is required"}), 400
+
+    quotes = Quote.query.join(QuoteShare, QuoteShare.quote_id == Quote.id).filter(
+        QuoteShare.email == partners.normalize_email(email)
+    ).order_by(Quote.created_at.desc()).all()
+
+    return jsonify([serialize_quote(q) for q in quotes]), 200
+
+def dialect_insert(model):
+    """INSERT supporting on_conflict_do_nothing() for Postgres and SQLite."""
+    if db.engine.dialect.name == "postgresql":
+        return postgresql_insert(model)
+    return sqlite_insert(model)
+
+def upsert_chat(trip_id):
+    """Returns (chat_id, created), or (None, False) if the trip isn't in the hot tables. Caller commits.
+
+    Concurrent callers for one trip all get the same chat. Trips moved to the cold
+    archive get no new chat; restoring them brings their own back.
+    """
+    # Almost every call finds the chat already there: read it first, so that case
+    # doesn't take the write lock (on SQLite) for an INSERT that does nothing.
+    chat_id = db.session.execute(select(Chat.id).where(Chat.trip_id == trip_id)).scalar()
+    if chat_id:
+        return chat_id, False
+
+    trip_exists = select(WingTrip.id).where(WingTrip.id == trip_id).exists()
+    new_chat = select(
+        literal(str(uuid.uuid4())), literal(trip_id), literal(datetime.utcnow(), db.DateTime)
+    ).where(trip_exists)
+    chat_id = db.session.execute(
+        dialect_insert(Chat).from_select(["id", "trip_id", "created_at"], new_chat)
+        .on_conflict_do_nothing(index_elements=["trip_id"])
+        .returning(Chat.id)
+    ).scalar()
+    if chat_id:
+        return chat_id, True
+    return db.session.execute(select(Chat.id).where(Chat.trip_id == trip_id)).scalar(), False
+
+def add_system_message(chat_id, content):
+    db.session.add(Message(chat_id=chat_id, sender_email="system@wingstack.ai", content=content))
+
+@api.route('/chat/<trip_id>', methods=['GET'])
+def get_or_create_chat(trip_id):
+    chat_id, created = upsert_chat(trip_id)
+    if chat_id is None:
+        db.session.rollback()
+        return jsonify({"error": "Trip not found"}), 404
+    if created:
         # Optional: preload a "deleted" message when chat is first created
         # You can move this elsewhere if you want more control
-        deletion_msg = Message(
-            chat_id=chat.id,
-            sender_email="system@wingstack.ai",
-            content="Planner has deleted this trip request.",
-        )
-        db.session.add(deletion_msg)
+        add_system_message(chat_id, "Planner has deleted this trip request.")
         db.session.commit()
+        message_bus.publish(chat_id)
 
+    chat = db.session.get(Chat, chat_id)
     return jsonify({
         "chat_id": chat.id,
         "trip_id": chat.trip_id,
@@ -392,17 +1044,101 @@ def get_or_create_chat(trip_id):
         "created_at": chat.created_at.isoformat()
     })
     
-@app.route('/messages/<chat_id>', methods=['GET'])
-def get_messages(chat_id):
-    messages = Message.query.filter_by(chat_id=chat_id).order_by(Message.timestamp).all()
-    return jsonify([{
+def serialize_message(m):
+    return {
         "id": m.id,
         "sender_email": m.sender_email,
         "content": m.content,
         "timestamp": m.timestamp.isoformat()
-    } for m in messages]), 200
+    }
+
+def fetch_messages(chat_id, after=None, limit=None):
+    query = Message.query.filter_by(chat_id=chat_id)
+    if after:
+        query = query.filter(tuple_(Message.timestamp, Message.id) > after)
+    query = query.order_by(Message.timestamp, Message.id)
+    if limit:
+        query = query.limit(limit)
+    return query.all()
+
+def message_cursor(messages, raw_after=None):
+    if messages:
+        return pagination.encode_cursor(messages[-1].timestamp, messages[-1].id)
+    return raw_after or ""
+
+@api.route('/messages/<chat_id>', methods=['GET'])
+def get_messages(chat_id):
+    # ?after=<cursor> returns only newer messages; adding ?wait=<seconds> long-polls until one arrives.
+    # The cursor to pass next time is returned in X-Message-Cursor.
+    raw_after = request.args.get("after")
+    try:
+        after = pagination.decode_cursor(raw_after, datetime, str) if raw_after else None
+        limit = pagination.parse_limit(request.args.get("limit"), default=None)
+        wait = float(request.args.get("wait") or 0)
+        if not math.isfinite(wait) or wait < 0:
+            raise ValueError("wait must be a non-negative number of seconds.")
+        wait = min(wait, message_bus.MESSAGE_LONG_POLL_MAX_SECONDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if not wait:
+        count_query = select(func.count(Message.id), func.max(Message.timestamp)).where(Message.chat_id == chat_id)
+        if after:
+            count_query = count_query.where(tuple_(Message.timestamp, Message.id) > after)
+        count, last_modified = db.session.execute(count_query).one()
+        etag = responses.weak_etag("messages", chat_id, raw_after, limit, count, last_modified)
+        if responses.not_modified(request, etag, last_modified):
+            return responses.validators(Response(status=304), etag, last_modified)
+
+    deadline = time.monotonic() + wait
+    while True:
+        seen_version = message_bus.version(chat_id)
+        messages = fetch_messages(chat_id, after, limit)
+        remaining = deadline - time.monotonic()
+        if messages or remaining <= 0:
+            break
+        # Give the pooled connection back while we wait.
+        db.session.close()
+        message_bus.wait_for_update(chat_id, seen_version, min(remaining, message_bus.MESSAGE_POLL_INTERVAL_SECONDS))
+
+    resp = responses.json_response([serialize_message(m) for m in messages])
+    resp.headers["X-Message-Cursor"] = message_cursor(messages, raw_after=raw_after)
+    if not wait:
+        responses.validators(resp, etag, last_modified)
+    return resp, 200
+
+@api.route('/messages/<chat_id>/stream', methods=['GET'])
+def stream_messages(chat_id):
+    # Server-Sent Events. Reconnecting clients resume from Last-Event-ID (or ?after=).
+    raw_after = request.headers.get("Last-Event-ID") or request.args.get("after")
+    try:
+        after = pagination.decode_cursor(raw_after, datetime, str) if raw_after else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    def events(after):
+        deadline = time.monotonic() + message_bus.MESSAGE_STREAM_MAX_SECONDS
+        yield f"retry: {int(message_bus.MESSAGE_POLL_INTERVAL_SECONDS * 1000)}\n\n"
+        while time.monotonic() < deadline:
+            seen_version = message_bus.version(chat_id)
+            messages = fetch_messages(chat_id, after, pagination.MAX_PAGE_SIZE)
+            db.session.close()
+            for m in messages:
+                cursor = pagination.encode_cursor(m.timestamp, m.id)
+                yield f"id: {cursor}\nevent: message\ndata: {json.dumps(serialize_message(m))}\n\n"
+            if messages:
+                after = (messages[-1].timestamp, messages[-1].id)
+                continue
+            if not message_bus.wait_for_update(chat_id, seen_version, message_bus.MESSAGE_POLL_INTERVAL_SECONDS):
+                yield ": keepalive\n\n"
+
+    return Response(
+        stream_with_context(events(after)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
-@app.route('/messages', methods=['POST'])
+@api.route('/messages', methods=['POST'])
 def post_message():
     data = request.get_json()
     required = ["chat_id", "sender_email", "content"]
@@ -417,58 +1153,121 @@ def post_message():
     )
     db.session.add(msg)
     db.session.commit()
+    message_bus.publish(msg.chat_id)
     return jsonify({"message": "Message posted", "id": msg.id}), 200
 
-@app.route('/summarize-chat/<chat_id>', methods=['POST'])
+@api.route('/summarize-chat/<chat_id>', methods=['POST'])
 def summarize_chat(chat_id):
+    if jobs.wants_async(request):
+        if not db.session.get(Chat, chat_id):
+            return jsonify({"error": "Chat not found"}), 404
+        return submit_ai_job("summarize_chat", {"chat_id": chat_id})
+    return ai_response(*do_summarize_chat(chat_id))
+
+SUMMARY_TRANSCRIPT_TOKEN_BUDGET = int(os.environ.get("SUMMARY_TRANSCRIPT_TOKEN_BUDGET", 3000))
+SUMMARY_MAX_FOLDS_PER_REQUEST = int(os.environ.get("SUMMARY_MAX_FOLDS_PER_REQUEST", 4))
+
+def summary_chunks(messages, budget):
+    """Splits messages into transcripts of at most `budget` estimated tokens each."""
+    chunk, used = [], 0
+    for m in messages:
+        line = tokens.truncate_to_tokens(f"{m.sender_email}: {m.content}", budget)
+        cost = tokens.estimate_tokens(line) + 1
+        if chunk and used + cost > budget:
+            yield chunk
+            chunk, used = [], 0
+        chunk.append(((m.id, m.timestamp), line))
+        used += cost
+    if chunk:
+        yield chunk
+
+def summarize_response(chat, cached, new_messages):
+    return {
+        "summary": chat.summary,
+        "summarized_through": chat.summary_message_id,
+        "new_messages": new_messages,
+        "cached": cached
+    }
+
+def do_summarize_chat(chat_id):
     chat = Chat.query.get(chat_id)
     if not chat:
-        return jsonify({"error": "Chat not found"}), 404
+        return {"error": "Chat not found"}, 404
 
-    messages = Message.query.filter_by(chat_id=chat_id).order_by(Message.timestamp).all()
-    if not messages:
-        return jsonify({"error": "No messages found"}), 400
+    # Only messages after the watermark are sent; they're folded into the stored summary.
+    after = None
+    if chat.summary and chat.summary_message_id and chat.summary_message_timestamp:
+        after = (chat.summary_message_timestamp, chat.summary_message_id)
+    messages = fetch_messages(chat_id, after)
 
-    content = "\n".join([f"{m.sender_email}: {m.content}" for m in messages])
-    prompt = f"Summarize this private jet trip conversation:\n\n{content}\n\nSummary:"
+    if not messages:
+        if chat.summary:
+            return summarize_response(chat, True, 0), 200
+        return {"error": "No messages found"}, 400
+
+    # Chunks and the running summary are plain values, and the read transaction ends
+    # here, so no pooled connection is held while OpenAI writes each fold.
+    chunks = list(summary_chunks(messages, SUMMARY_TRANSCRIPT_TOKEN_BUDGET))[:SUMMARY_MAX_FOLDS_PER_REQUEST]
+    summary = chat.summary
+    db.session.commit()
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You summarize jet charter trip logs."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.5,
-            max_tokens=100
-        )
-        chat.summary = response.choices[0].message.content.strip()
-        db.session.commit()
-        return jsonify({"summary": chat.summary}), 200
+        folded = 0
+        # Anything past SUMMARY_MAX_FOLDS_PER_REQUEST is left for the next call, which
+        # picks up from the advanced watermark.
+        for chunk in chunks:
+            content = "\n".join(line for _, line in chunk)
+            if summary:
+                prompt = (
+                    f"Current summary of this private jet trip conversation:\n\n{summary}\n\n"
+                    f"New messages:\n\n{content}\n\nUpdated summary:"
+                )
+            else:
+                prompt = f"Summarize this private jet trip conversation:\n\n{content}\n\nSummary:"
+
+            response = llm.create_completion(
+                "summary",
+                model="gpt-3.5-turbo",
+                messages=[
+                    {"role": "system", "content": "You summarize jet charter trip logs."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.5,
+                max_tokens=100
+            )
+            last_id, last_timestamp = chunk[-1][0]
+            summary = response.choices[0].message.content.strip()
+            chat = db.session.get(Chat, chat_id)
+            if chat is None:
+                return {"error": "Chat not found"}, 404
+            chat.summary = summary
+            chat.summary_message_id = last_id
+            chat.summary_message_timestamp = last_timestamp
+            chat.summary_updated_at = datetime.utcnow()
+            db.session.commit()
+            folded += len(chunk)
+
+        return summarize_response(chat, False, folded), 200
+    except upstream.UpstreamUnavailable as e:
+        db.session.rollback()
+        return upstream_unavailable_body(e), 503
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        db.session.rollback()
+        return {"error": str(e)}, 500
 
-@app.route('/parse-email-quote', methods=['POST'])
-def parse_email_quote():
-    if not verify_ai_auth(request):
-        return jsonify({"error": "Unauthorized"}), 401
-
-    data = request.get_json()
-    email_body = data.get("email_body", "").strip()
+jobs.register("summarize_chat", lambda p: do_summarize_chat(p["chat_id"]), requires_ai_auth=False)
 
-    if not email_body:
-        return jsonify({"error": "No email body provided."}), 400
+# === AI Quote Parsing Endpoints ===
+EMAIL_QUOTE_SYSTEM_PROMPT = (
+    "You are an expert assistant for parsing private jet charter quotes. "
+    "Extract structured information from this email body. "
+    "Always respond in JSON. Fields: aircraft, price, category (e.g., Light, Mid, Heavy), broker name, "
+    "cancellation policy, Wi-Fi availability, year of make (YOM), year of refurbishment (if available), notes."
+)
 
-    system_prompt = (
-        "You are an expert assistant for parsing private jet charter quotes. "
-        "Extract structured information from this email body. "
-        "Always respond in JSON. Fields: aircraft, price, category (e.g., Light, Mid, Heavy), broker name, "
-        "cancellation policy, Wi-Fi availability, year of make (YOM), year of refurbishment (if available), notes."
-    )
-
-    user_prompt = f"""
+EMAIL_QUOTE_USER_PROMPT = """
 Email Body:
-\"\"\"{email_body}\"\"\"
+\"\"\"{input_text}\"\"\"
 
 Return JSON in this format:
 {{
@@ -484,57 +1283,16 @@ Return JSON in this format:
 }}
 """
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.2,
-            max_tokens=800
-        )
-        content = response.choices[0].message.content.strip()
-        parsed = json.loads(content)
-        return jsonify(parsed), 200
+PDF_QUOTE_SYSTEM_PROMPT = (
+    "You are an expert assistant for private jet charter brokers. "
+    "Extract structured quote details from this PDF text. Return clean JSON only. "
+    "Fields: aircraft, price, category (e.g., Light, Mid, Heavy), broker name, "
+    "cancellation policy, Wi-Fi, YOM, refurbished year, and notes."
+)
 
-    except Exception as e:
-        print("❌ Failed to parse email quote:", str(e))
-        return jsonify({"error": str(e)}), 500
-        
-@app.route('/parse-quote-pdf', methods=['POST'])
-def parse_quote_pdf():
-    if not verify_ai_auth(request):
-        return jsonify({"error": "Unauthorized"}), 401
-
-    data = request.get_json()
-    b64pdf = data.get("base64_pdf", "").strip()
-
-    if not b64pdf:
-        return jsonify({"error": "Missing PDF content"}), 400
-
-    try:
-        # Decode PDF and extract text
-        pdf_bytes = base64.b64decode(b64pdf)
-        pdf_file = io.BytesIO(pdf_bytes)
-
-        with pdfplumber.open(pdf_file) as pdf:
-            extracted_text = "\n".join([page.extract_text() or "" for page in pdf.pages])
-
-        if not extracted_text.strip():
-            return jsonify({"error": "PDF parsing returned empty content."}), 400
-
-        # Prompt AI with extracted text
-        system_prompt = (
-            "You are an expert assistant for private jet charter brokers. "
-            "Extract structured quote details from this PDF text. Return clean JSON only. "
-            "Fields: aircraft, price, category (e.g., Light, Mid, Heavy), broker name, "
-            "cancellation policy, Wi-Fi, YOM, refurbished year, and notes."
-        )
-
-        user_prompt = f"""
+PDF_QUOTE_USER_PROMPT = """
 Quote PDF text:
-\"\"\"{extracted_text}\"\"\"
+\"\"\"{input_text}\"\"\"
 
 Return JSON in this format:
 {{
@@ -550,24 +1308,265 @@ Return JSON in this format:
 }}
 """
 
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.2,
-            max_tokens=800
+@api.route('/parse-email-quote', methods=['POST'])
+def parse_email_quote():
+    if not verify_ai_auth(request):
+        return jsonify({"error": "Unauthorized"}), 401
+
+    data = request.get_json()
+    email_body = data.get("email_body", "").strip()
+
+    if not email_body:
+        return jsonify({"error": "No email body provided."}), 400
+
+    bypass_cache = parse_cache.cache_bypassed(request)
+    if jobs.wants_async(request):
+        return submit_ai_job("parse_email_quote", {"email_body": email_body, "no_cache": bypass_cache}, coalesce_on=[email_body, bypass_cache])
+    return ai_response(*do_parse_email_quote(email_body, bypass_cache))
+
+def compact_prompt_input(kind, text, compact):
+    compacted, report = compact(text)
+    if not compacted:
+        # Everything looked like boilerplate; send the original rather than nothing.
+        compacted, report["tokens_after"] = text, report["tokens_before"]
+    metrics.prompt_tokens.inc(report["tokens_before"], kind=kind, stage="raw")
+    metrics.prompt_tokens.inc(report["tokens_after"], kind=kind, stage="compacted")
+    return compacted, report
+
+def template_parse(kind, text, bypass_cache):
+    """Known broker layouts are read off their labels; returns None to go to the LLM."""
+    if bypass_cache:
+        return None
+    return quote_templates.extract(kind, text)
+
+def learn_quote_template(kind, text, parsed, cache_status):
+    if cache_status == "hit":
+        return  # already learned from when this exact text was parsed
+    try:
+        quote_templates.learn(kind, text, parsed)
+    except Exception as e:
+        db.session.rollback()
+        print(f"⚠️ Could not learn {kind} template:", str(e))
+
+def do_parse_email_quote(email_body, bypass_cache=False):
+    try:
+        templated = template_parse("email_quote", email_body, bypass_cache)
+        if templated:
+            return dict(templated, tier="template"), 200, None
+
+        compacted, report = compact_prompt_input("email_quote", email_body, compaction.compact_email)
+        parsed, cache_status = run_llm_parse(
+            "email_quote", compacted, EMAIL_QUOTE_SYSTEM_PROMPT, EMAIL_QUOTE_USER_PROMPT,
+            bypass_cache=bypass_cache
+        )
+        learn_quote_template("email_quote", email_body, parsed, cache_status)
+        return dict(parsed, tier="llm", compaction=report), 200, cache_status
+
+    except upstream.UpstreamUnavailable as e:
+        return upstream_unavailable_body(e), 503, None
+
+    except Exception as e:
+        print("❌ Failed to parse email quote:", str(e))
+        return {"error": str(e)}, 500, None
+
+jobs.register("parse_email_quote", lambda p: do_parse_email_quote(p["email_body"], p.get("no_cache"))[:2])
+
+@api.route('/parse-quote-pdf', methods=['POST'])
+def parse_quote_pdf():
+    if not verify_ai_auth(request):
+        return jsonify({"error": "Unauthorized"}), 401
+
+    # Accepts multipart (`file`), a raw application/pdf body, or the legacy {"base64_pdf": ...} JSON.
+    try:
+        pdf_path = pdf_extract.spool_upload(request)
+    except pdf_extract.PdfTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if not pdf_path:
+        return jsonify({"error": "Missing PDF content"}), 400
+
+    bypass_cache = parse_cache.cache_bypassed(request)
+    if jobs.wants_async(request):
+        # The spooled file is handed to the job, which deletes it when done.
+        try:
+            pdf_digest = pdf_extract.file_sha256(pdf_path)
+            resp = submit_ai_job("parse_quote_pdf", {"pdf_path": pdf_path, "no_cache": bypass_cache}, coalesce_on=[pdf_digest, bypass_cache])
+        except Exception:
+            os.unlink(pdf_path)
+            raise
+        if resp[0].get_json()["coalesced"]:
+            os.unlink(pdf_path)
+        return resp
+    return ai_response(*do_parse_quote_pdf(pdf_path, bypass_cache))
+
+def do_parse_quote_pdf(pdf_path, bypass_cache=False):
+    if not os.path.exists(pdf_path):
+        return {"error": "Spooled PDF is no longer available; please re-upload."}, 410, None
+
+    try:
+        extracted_text = pdf_extract.extract_text(pdf_path)
+
+        if not extracted_text.strip():
+            return {"error": "PDF parsing returned empty content."}, 400, None
+
+        templated = template_parse("pdf_quote", extracted_text, bypass_cache)
+        if templated:
+            return dict(templated, tier="template"), 200, None
+
+        # Prompt AI with the compacted text: repeated headers/footers and boilerplate removed, pricing first.
+        compacted, report = compact_prompt_input("pdf_quote", extracted_text, compaction.compact_pdf)
+        parsed, cache_status = run_llm_parse(
+            "pdf_quote", compacted, PDF_QUOTE_SYSTEM_PROMPT, PDF_QUOTE_USER_PROMPT,
+            bypass_cache=bypass_cache
         )
+        learn_quote_template("pdf_quote", extracted_text, parsed, cache_status)
+        return dict(parsed, tier="llm", compaction=report), 200, cache_status
 
-        content = response.choices[0].message.content.strip()
-        parsed = json.loads(content)
-        return jsonify(parsed), 200
+    except upstream.UpstreamUnavailable as e:
+        return upstream_unavailable_body(e), 503, None
 
     except Exception as e:
         print("❌ PDF parsing or AI failed:", str(e))
-        return jsonify({"error": str(e)}), 500
+        return {"error": str(e)}, 500, None
+
+    finally:
+        os.unlink(pdf_path)
+
+jobs.register("parse_quote_pdf", lambda p: do_parse_quote_pdf(p["pdf_path"], p.get("no_cache"))[:2])
+
+# === Batch Quote Parsing ===
+BATCH_PARSE_MAX_ITEMS = int(os.environ.get("BATCH_PARSE_MAX_ITEMS", 100))
+BATCH_PARSE_CONCURRENCY = serving.batch_parse_concurrency()
+
+def run_batch(items, keys, parse_fn):
+    """Parses each distinct key once, fanning out across threads, and returns results in input order."""
+    first_index = {}
+    for i, key in enumerate(keys):
+        first_index.setdefault(key, i)
+    unique = [(i, items[i]) for i in sorted(first_index.values())]
+
+    app = current_app._get_current_object()
+
+    def work(item):
+        # Items queue for an upstream slot instead of failing when other requests hold them.
+        with app.app_context(), upstream.queued():
+            try:
+                return parse_fn(item)
+            except Exception as e:
+                return {"error": str(e)}, 500, None
+            finally:
+                db.session.remove()
+
+    outcomes = {}
+    if unique:
+        with ThreadPoolExecutor(max_workers=min(BATCH_PARSE_CONCURRENCY, len(unique))) as pool:
+            for (i, _), outcome in zip(unique, pool.map(work, [item for _, item in unique])):
+                outcomes[i] = outcome
+
+    results = []
+    for i, key in enumerate(keys):
+        source = first_index[key]
+        body, status_code, cache_status = outcomes[source]
+        entry = {"index": i, "status_code": status_code}
+        if status_code < 400:
+            entry["result"] = body
+        else:
+            entry["error"] = body.get("error", "Parse failed")
+        if cache_status:
+            entry["cache"] = cache_status
+        if source != i:
+            entry["duplicate_of"] = source
+        results.append(entry)
+    return results
+
+def batch_response(results):
+    failed = sum(1 for r in results if r["status_code"] >= 400)
+    return jsonify({
+        "count": len(results),
+        "unique": sum(1 for r in results if "duplicate_of" not in r),
+        "failed": failed,
+        "results": results
+    }), 200
+
+@api.route('/parse-email-quote/batch', methods=['POST'])
+def parse_email_quote_batch():
+    if not verify_ai_auth(request):
+        return jsonify({"error": "Unauthorized"}), 401
+
+    data = request.get_json()
+    email_bodies = data.get("email_bodies")
+    if not isinstance(email_bodies, list) or not email_bodies:
+        return jsonify({"error": "email_bodies must be a non-empty list."}), 400
+    if len(email_bodies) > BATCH_PARSE_MAX_ITEMS:
+        return jsonify({"error": f"Batch is limited to {BATCH_PARSE_MAX_ITEMS} items."}), 400
+
+    email_bodies = [(body or "").strip() if isinstance(body, str) else "" for body in email_bodies]
+    bypass_cache = parse_cache.cache_bypassed(request)
+
+    def parse_one(email_body):
+        if not email_body:
+            return {"error": "No email body provided."}, 400, None
+        return do_parse_email_quote(email_body, bypass_cache)
+
+    return batch_response(run_batch(email_bodies, email_bodies, parse_one))
+
+@api.route('/parse-quote-pdf/batch', methods=['POST'])
+def parse_quote_pdf_batch():
+    if not verify_ai_auth(request):
+        return jsonify({"error": "Unauthorized"}), 401
+
+    # Accepts multipart with repeated `files` fields, or {"base64_pdfs": [...]} JSON.
+    paths = []
+    try:
+        if request.mimetype == "multipart/form-data":
+            uploads = request.files.getlist("files")
+            if len(uploads) > BATCH_PARSE_MAX_ITEMS:
+                return jsonify({"error": f"Batch is limited to {BATCH_PARSE_MAX_ITEMS} items."}), 400
+            for upload in uploads:
+                paths.append(pdf_extract.spool_stream(upload.stream))
+        else:
+            b64pdfs = (request.get_json(silent=True) or {}).get("base64_pdfs")
+            if not isinstance(b64pdfs, list):
+                return jsonify({"error": "base64_pdfs must be a non-empty list."}), 400
+            if len(b64pdfs) > BATCH_PARSE_MAX_ITEMS:
+                return jsonify({"error": f"Batch is limited to {BATCH_PARSE_MAX_ITEMS} items."}), 400
+            for b64pdf in b64pdfs:
+                b64pdf = (b64pdf or "").strip() if isinstance(b64pdf, str) else ""
+                paths.append(pdf_extract.spool_base64(b64pdf) if b64pdf else None)
+    except pdf_extract.PdfTooLarge as e:
+        for path in filter(None, paths):
+            os.unlink(path)
+        return jsonify({"error": str(e)}), 413
+    except ValueError as e:
+        for path in filter(None, paths):
+            os.unlink(path)
+        return jsonify({"error": str(e)}), 400
+
+    if not paths:
+        return jsonify({"error": "No PDFs provided."}), 400
+
+    digests = [pdf_extract.file_sha256(path) if path else f"missing-{i}" for i, path in enumerate(paths)]
+    bypass_cache = parse_cache.cache_bypassed(request)
+
+    def parse_one(pdf_path):
+        if not pdf_path:
+            return {"error": "Missing PDF content"}, 400, None
+        return do_parse_quote_pdf(pdf_path, bypass_cache)
+
+    try:
+        return batch_response(run_batch(paths, digests, parse_one))
+    finally:
+        # do_parse_quote_pdf removes the files it parsed; duplicates were never parsed.
+        for path in filter(None, paths):
+            if os.path.exists(path):
+                os.unlink(path)
 
 # ✅ Keep this at the bottom of your file
 if __name__ == "__main__":
+    # Local development: bring the schema up to date, then serve.
+    app = create_app()
+    with app.app_context():
+        migrations.run_migrations()
     app.run(host="0.0.0.0", port=8000)
@@ -0,0 +1,205 @@
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import delete, func, insert, literal, select, tuple_
+
+from models import db, ARCHIVE_TABLES, Chat, Message, Quote, QuoteShare, TripLeg, TripPartner, WingTrip
+
+# === Hot/Cold Trip Archival ===
+# Deleted and archived trips older than ARCHIVE_AFTER_DAYS are moved out of the
+# hot tables, with their legs, partners, quotes, quote shares, chat and
+# messages, into *_archive tables (models.ARCHIVE_TABLES). That way /trips,
+# /quotes/by-email and message queries only scan live data. Rows move in
+# batches of ARCHIVE_BATCH_SIZE trips, one transaction per batch (INSERT ...
+# SELECT into the archive, then DELETE of exactly the copied rows).
+#
+# Each worker process runs a background pass every ARCHIVE_INTERVAL_SECONDS
+# (0 turns it off). `flask archive-trips` runs a pass from cron instead. On
+# Postgres, candidate trips are locked with SKIP LOCKED, so concurrent passes
+# never pick the same trip and a concurrent restore waits for the batch.
+# restore_trip calls rehydrate() when a trip is no longer in the hot tables.
+
+ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", 90))
+ARCHIVE_BATCH_SIZE = int(os.environ.get("ARCHIVE_BATCH_SIZE", 200))
+ARCHIVE_MAX_BATCHES_PER_PASS = int(os.environ.get("ARCHIVE_MAX_BATCHES_PER_PASS", 50))
+ARCHIVE_INTERVAL_SECONDS = int(os.environ.get("ARCHIVE_INTERVAL_SECONDS", 3600))
+
+ARCHIVE_STATUSES = ("deleted", "archived")
+
+# (model, expression giving the row's trip id, (foreign key, parent key) when the
+# trip id lives on a parent row). Parents come first; deletes run in reverse.
+SCOPES = (
+    (WingTrip, WingTrip.id, None),
+    (TripLeg, TripLeg.trip_id, None),
+    (TripPartner, TripPartner.trip_id, None),
+    (Quote, Quote.trip_id, None),
+    (QuoteShare, Quote.trip_id, (QuoteShare.quote_id, Quote.id)),
+    (Chat, Chat.trip_id, None),
+    (Message, Chat.trip_id, (Message.chat_id, Chat.id)),
+)
+
+_app = None
+_started = False
+_start_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {"passes": 0, "errors": 0, "trips_archived": 0, "rows_archived": 0, "trips_rehydrated": 0}
+
+
+def _count(stat, amount=1):
+    with _stats_lock:
+        _stats[stat] += amount
+
+
+def stats():
+    with _stats_lock:
+        return dict(_stats)
+
+
+def _hot_columns(model):
+    return [c.name for c in model.__table__.columns]
+
+
+def archive_batch(cutoff, batch_size=ARCHIVE_BATCH_SIZE):
+    """Moves up to batch_size eligible trips to the archive tables and commits; returns the number moved."""
+    trip_ids = db.session.scalars(
+        select(WingTrip.id).where(
+            WingTrip.status.in_(ARCHIVE_STATUSES),
+            func.coalesce(WingTrip.updated_at, WingTrip.created_at) < cutoff
+        ).order_by(WingTrip.id).limit(batch_size).with_for_update(skip_locked=True)
+    ).all()
+    if not trip_ids:
+        db.session.rollback()
+        return 0
+
+    now = datetime.utcnow()
+    rows = 0
+    for model, trip_id, link in SCOPES:
+        hot = model.__table__
+        query = select(*hot.columns, trip_id, literal(now, db.DateTime))
+        if link:
+            query = query.select_from(hot.join(link[1].table, link[0] == link[1]))
+        result = db.session.execute(
+            insert(ARCHIVE_TABLES[hot.name]).from_select(
+                _hot_columns(model) + ["archive_trip_id", "archived_at"], query.where(trip_id.in_(trip_ids))
+            )
+        )
+        rows += max(result.rowcount or 0, 0)
+    # Delete exactly the rows that were copied: a message or quote committed after its
+    # INSERT ... SELECT stays in the hot tables rather than being lost. (A child row
+    # left behind under a foreign key fails the batch, which the next pass retries.)
+    for model, _, _ in reversed(SCOPES):
+        hot = model.__table__
+        cold = ARCHIVE_TABLES[hot.name]
+        key = [c.name for c in hot.primary_key.columns]
+        copied = select(*[cold.c[name] for name in key]).where(cold.c.archive_trip_id.in_(trip_ids))
+        hot_key = hot.c[key[0]] if len(key) == 1 else tuple_(*[hot.c[name] for name in key])
+        db.session.execute(delete(hot).where(hot_key.in_(copied)))
+    db.session.commit()
+
+    _count("trips_archived", len(trip_ids))
+    _count("rows_archived", rows)
+    return len(trip_ids)
+
+
+def run_pass(after_days=None, max_batches=ARCHIVE_MAX_BATCHES_PER_PASS):
+    """Archives eligible trips in batches; returns the number of trips moved."""
+    after_days = ARCHIVE_AFTER_DAYS if after_days is None else after_days
+    cutoff = datetime.utcnow() - timedelta(days=after_days)
+    moved = 0
+    try:
+        for _ in range(max_batches):
+            batch = archive_batch(cutoff)
+            moved += batch
+            if batch < ARCHIVE_BATCH_SIZE:
+                break
+    except Exception:
+        db.session.rollback()
+        _count("errors")
+        raise
+    finally:
+        _count("passes")
+    return moved
+
+
+def rehydrate(trip_id):
+    """Moves an archived trip and its rows back into the hot tables; the caller commits.
+
+    Returns False if the trip isn't in the archive.
+    """
+    archived_trips = ARCHIVE_TABLES[WingTrip.__tablename__]
+    found = db.session.execute(
+        select(archived_trips.c.id).where(archived_trips.c.archive_trip_id == trip_id)
+    ).first()
+    if found is None:
+        return False
+
+    # Chats opened while the trip was archived (possible before upsert_chat required a
+    # live trip) keep their place; the archived messages are folded into them.
+    hot_chat_id = db.session.execute(select(Chat.id).where(Chat.trip_id == trip_id)).scalar()
+    for model, _, _ in SCOPES:
+        cold = ARCHIVE_TABLES[model.__tablename__]
+        columns = _hot_columns(model)
+        if model is Chat and hot_chat_id:
+            continue
+        values = [cold.c[name] for name in columns]
+        if model is Message and hot_chat_id:
+            values = [literal(hot_chat_id).label("chat_id") if name == "chat_id" else cold.c[name] for name in columns]
+        db.session.execute(insert(model.__table__).from_select(
+            columns, select(*values).where(cold.c.archive_trip_id == trip_id)
+        ))
+    for model, _, _ in reversed(SCOPES):
+        cold = ARCHIVE_TABLES[model.__tablename__]
+        db.session.execute(delete(cold).where(cold.c.archive_trip_id == trip_id))
+    _count("trips_rehydrated")
+    return True
+
+
+# --- Background passes ---
+def init_app(app):
+    global _app
+    _app = app
+    app.cli.add_command(archive_trips_command)
+    if ARCHIVE_INTERVAL_SECONDS > 0:
+        # Started from the first request so it runs in each gunicorn worker, not the master.
+        app.before_request(_start_once)
+
+
+def _start_once():
+    global _started
+    if _started:
+        return
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+    threading.Thread(target=_archive_loop, name="trip-archiver", daemon=True).start()
+
+
+def _archive_loop():
+    # Jittered so workers started together don't all run their pass at once.
+    time.sleep(random.uniform(0.5, 1.0) * ARCHIVE_INTERVAL_SECONDS)
+    while True:
+        with _app.app_context():
+            try:
+                moved = run_pass()
+                if moved:
+                    print(f"✅ Archived {moved} trips older than {ARCHIVE_AFTER_DAYS} days")
+            except Exception as e:
+                print("❌ Trip archival pass failed:", str(e))
+            finally:
+                db.session.remove()
+        time.sleep(ARCHIVE_INTERVAL_SECONDS)
+
+
+@click.command("archive-trips")
+@click.option("--older-than-days", type=int, default=None, help="Defaults to ARCHIVE_AFTER_DAYS.")
+@with_appcontext
+def archive_trips_command(older_than_days):
+    """Move old deleted/archived trips and their rows into the archive tables."""
+    moved = run_pass(older_than_days, max_batches=1_000_000)
+    click.echo(f"✅ Archived {moved} trips.")
@@ -0,0 +1,282 @@
+"""Offline per-endpoint benchmark and regression gate.
+
+Boots the app in-process against a throwaway SQLite database, seeds it with
+deterministic trips, legs, partners, quotes, chats and messages, and swaps the
+OpenAI client for fake_openai.FakeOpenAI. No network or credentials are needed.
+Every endpoint is driven for a fixed number of requests, and req/s plus
+p50/p95/p99 latency are reported for each.
+
+Usage:
+    python bench_endpoints.py [--trips 1000] [--quotes-per-trip 3] [--messages-per-chat 20]
+                              [--requests 200] [--concurrency 1] [--only "GET /trips,..."]
+                              [--upstream-latency 0.05] [--failure-rate 0.0] [--seed 42]
+                              [--json results.json]
+                              [--baseline baseline.json] [--tolerance 0.25]
+
+With --baseline the run exits with status 1 when any endpoint's p95 grows, or
+its req/s drops, by more than --tolerance relative to the baseline. p95 changes
+smaller than --min-delta-ms are ignored as noise.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time as dtime, timedelta
+
+AI_TOKEN = "bench-token"
+AI_HEADERS = {"X-Wingstack-AI-Key": AI_TOKEN}
+
+STATUSES = ("pending", "pending", "pending", "booked", "archived")
+AIRPORTS = ("KTEB", "KOAK", "KVNY", "KLAS", "KASE", "KPBI", "KMIA", "KSDL", "KBED", "MMSD")
+AIRCRAFT = (("Citation XLS", "Mid"), ("Phenom 300", "Light"), ("Challenger 350", "Super Mid"),
+            ("Gulfstream G450", "Heavy"), ("King Air 350", "Turbo"))
+
+SHORTHAND_INPUTS = ["TEB-OAK 06/20/2025 5 pax $50k", "VNY to LAS 07/04/2025 9:30am 8 passengers $30k"]
+FREEFORM_INPUTS = ["need a jet from teterboro to oakland sometime next month for the family",
+                   "looking at cabo over the holidays, maybe six of us, budget flexible"]
+EMAIL_BODIES = ["Hi team, we can offer a Citation XLS for 23,000 USD all-in. Wi-Fi onboard, YOM 2018.",
+                "Quote: Challenger 350, $41,500, 25% nonrefundable within 7 days. Refurbished 2021."]
+
+
+def seed_database(db, models, args):
+    rng = random.Random(args.seed)
+    now = datetime.utcnow()
+    planners = [f"planner{i}@example.com" for i in range(max(1, args.trips // 50))]
+    brokers = [f"broker{i}@example.com" for i in range(max(2, args.trips // 20))]
+
+    trips, partners, legs, quotes, shares, chats, messages = [], [], [], [], [], [], []
+    for i in range(args.trips):
+        trip_id = str(uuid.uuid4())
+        created = now - timedelta(minutes=i)
+        invited = rng.sample(brokers, min(3, len(brokers)))
+        origin, dest = rng.sample(AIRPORTS, 2)
+        depart = date.today() + timedelta(days=rng.randint(1, 180))
+        passengers, budget = rng.randint(1, 12), rng.randrange(10000, 150000, 500)
+        trips.append({
+            "id": trip_id, "route": f"{origin}-{dest}", "departure_date": depart.strftime("%m/%d/%Y"),
+            "passenger_count": str(passengers), "budget": str(budget),
+            "departure_on": depart, "passengers": passengers, "budget_amount": budget,
+            "partner_names": json.dumps([e.split("@")[0] for e in invited]), "partner_emails": json.dumps(invited),
+            "planner_name": "Planner", "planner_email": rng.choice(planners), "status": rng.choice(STATUSES),
+            "created_at": created, "updated_at": created
+        })
+        partners.extend({"trip_id": trip_id, "email": e, "name": e.split("@")[0]} for e in invited)
+        for leg in range(args.legs_per_trip):
+            legs.append({"id": str(uuid.uuid4()), "trip_id": trip_id, "from_location": origin if leg == 0 else dest,
+                         "to_location": dest if leg == 0 else origin, "date": depart + timedelta(days=leg * 3),
+                         "time": dtime(rng.randint(6, 20), rng.choice((0, 30)))})
+        for _ in range(args.quotes_per_trip):
+            quote_id = str(uuid.uuid4())
+            aircraft, category = rng.choice(AIRCRAFT)
+            broker = rng.choice(invited)
+            shared = [e for e in invited if e != broker]
+            price = rng.randrange(8000, 120000, 250)
+            quotes.append({"id": quote_id, "trip_id": trip_id, "broker_name": broker.split("@")[0],
+                           "operator_name": "Operator", "aircraft_type": aircraft, "aircraft_category": category,
+                           "price": f"${price:,}", "price_amount": price, "price_currency": "USD",
+                           "notes": "Catering included",
+                           "submitted_by_email": broker, "shared_with_emails": ", ".join(shared),
+                           "created_at": created + timedelta(seconds=rng.randint(1, 3600))})
+            shares.extend({"quote_id": quote_id, "email": e} for e in shared)
+        chat_id = str(uuid.uuid4())
+        chats.append({"id": chat_id, "trip_id": trip_id, "created_at": created})
+        for m in range(args.messages_per_chat):
+            messages.append({"id": str(uuid.uuid4()), "chat_id": chat_id,
+                             "sender_email": rng.choice(invited + [trips[-1]["planner_email"]]),
+                             "content": f"Message {m} about {origin}-{dest}: tail number and catering TBD.",
+                             "timestamp": created + timedelta(seconds=m * 30)})
+
+    for model, rows in ((models.WingTrip, trips), (models.TripPartner, partners), (models.TripLeg, legs),
+                        (models.Quote, quotes), (models.QuoteShare, shares), (models.Chat, chats),
+                        (models.Message, messages)):
+        for start in range(0, len(rows), 5000):
+            db.session.execute(db.insert(model), rows[start:start + 5000])
+    db.session.commit()
+
+    return {
+        "trip_ids": [t["id"] for t in trips],
+        "chat_ids": [c["id"] for c in chats],
+        "planners": planners,
+        "brokers": brokers,
+        "counts": {"trips": len(trips), "legs": len(legs), "quotes": len(quotes), "messages": len(messages)}
+    }
+
+
+def endpoints(data):
+    """name -> fn(client, rng) returning the response."""
+    return {
+        "GET /trips": lambda c, r: c.get("/trips?limit=50"),
+        "GET /trips?planner_email": lambda c, r: c.get(
+            f"/trips?limit=50&status=pending&planner_email={r.choice(data['planners'])}"),
+        "GET /trips/dashboard": lambda c, r: c.get(
+            f"/trips/dashboard?limit=50&planner_email={r.choice(data['planners'])}"),
+        "GET /trips/upcoming": lambda c, r: c.get("/trips/upcoming?days=14&min_budget=40000&limit=50"),
+        "GET /trips/invited": lambda c, r: c.get(f"/trips/invited?limit=50&email={r.choice(data['brokers'])}"),
+        "GET /trips/<id>/legs": lambda c, r: c.get(f"/trips/{r.choice(data['trip_ids'])}/legs"),
+        "GET /trips/<id>/quotes": lambda c, r: c.get(f"/trips/{r.choice(data['trip_ids'])}/quotes?sort=price"),
+        "GET /quotes/by-email": lambda c, r: c.get(f"/quotes/by-email?email={r.choice(data['brokers'])}"),
+        "GET /quotes/shared-with-me": lambda c, r: c.get(f"/quotes/shared-with-me?email={r.choice(data['brokers'])}"),
+        "GET /chat/<trip_id>": lambda c, r: c.get(f"/chat/{r.choice(data['trip_ids'])}"),
+        "GET /messages/<chat_id>": lambda c, r: c.get(f"/messages/{r.choice(data['chat_ids'])}"),
+        "POST /messages": lambda c, r: c.post("/messages", json={
+            "chat_id": r.choice(data["chat_ids"]), "sender_email": r.choice(data["brokers"]),
+            "content": "Bench message"}),
+        "POST /parse-trip-input (shorthand)": lambda c, r: c.post("/parse-trip-input", headers=AI_HEADERS, json={
+            "input_text": r.choice(SHORTHAND_INPUTS), "no_cache": True}),
+        "POST /parse-trip-input (llm)": lambda c, r: c.post("/parse-trip-input", headers=AI_HEADERS, json={
+            "input_text": r.choice(FREEFORM_INPUTS), "no_cache": True}),
+        "POST /parse-email-quote": lambda c, r: c.post("/parse-email-quote", headers=AI_HEADERS, json={
+            "email_body": r.choice(EMAIL_BODIES), "no_cache": True}),
+        "POST /summarize-chat/<chat_id>": lambda c, r: c.post(f"/summarize-chat/{r.choice(data['chat_ids'])}"),
+    }
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def run_endpoint(app, fn, requests, concurrency, seed):
+    local = threading.local()
+    counter = iter(range(requests))
+    counter_lock = threading.Lock()
+    samples, errors = [], [0]
+    lock = threading.Lock()
+
+    def worker(worker_id):
+        local.client = app.test_client()
+        rng = random.Random(seed * 1000 + worker_id)
+        while True:
+            with counter_lock:
+                if next(counter, None) is None:
+                    return
+            start = time.perf_counter()
+            resp = fn(local.client, rng)
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                if resp.status_code < 400:
+                    samples.append(elapsed)
+                else:
+                    errors[0] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    wall = time.perf_counter() - started
+
+    return {
+        "requests": len(samples),
+        "errors": errors[0],
+        "rps": round(len(samples) / wall, 1) if wall else 0.0,
+        "p50_ms": round(percentile(samples, 50), 2),
+        "p95_ms": round(percentile(samples, 95), 2),
+        "p99_ms": round(percentile(samples, 99), 2),
+        "mean_ms": round(statistics.fmean(samples), 2) if samples else 0.0
+    }
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    regressions = []
+    for name, r in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if r["p95_ms"] > base["p95_ms"] * (1 + tolerance) and r["p95_ms"] - base["p95_ms"] >= min_delta_ms:
+            regressions.append(f"{name}: p95 {base['p95_ms']}ms -> {r['p95_ms']}ms")
+        if base["rps"] and r["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: req/s {base['rps']} -> {r['rps']}")
+        if r["errors"] > base.get("errors", 0):
+            regressions.append(f"{name}: errors {base.get('errors', 0)} -> {r['errors']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trips", type=int, default=1000)
+    parser.add_argument("--legs-per-trip", type=int, default=2)
+    parser.add_argument("--quotes-per-trip", type=int, default=3)
+    parser.add_argument("--messages-per-chat", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--only", help="comma-separated endpoint names to run")
+    parser.add_argument("--upstream-latency", type=float, default=0.05)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--baseline", help="results JSON from a previous run to gate against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--min-delta-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore")
+    tmpdir = tempfile.mkdtemp(prefix="wingstack-bench-")
+    os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    os.environ["AI_AUTH_TOKEN"] = AI_TOKEN
+    os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+    import fake_openai
+    import llm
+    import migrations
+    import models
+    from app import create_app
+
+    fake = fake_openai.FakeOpenAI(latency=args.upstream_latency, failure_rate=args.failure_rate, seed=args.seed)
+    llm.set_client(fake)
+
+    results = {}
+    try:
+        app = create_app()
+        with app.app_context():
+            migrations.run_migrations()
+            started = time.perf_counter()
+            data = seed_database(models.db, models, args)
+            print(f"seeded {data['counts']} in {time.perf_counter() - started:.1f}s", flush=True)
+
+        selected = endpoints(data)
+        if args.only:
+            wanted = [name.strip() for name in args.only.split(",") if name.strip()]
+            unknown = [name for name in wanted if name not in selected]
+            if unknown:
+                parser.error(f"unknown endpoints: {', '.join(unknown)}")
+            selected = {name: selected[name] for name in wanted}
+
+        for name, fn in selected.items():
+            run_endpoint(app, fn, max(1, args.requests // 10), args.concurrency, args.seed)  # warm-up
+            results[name] = run_endpoint(app, fn, args.requests, args.concurrency, args.seed)
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    print(f"\n{'endpoint':<36}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'errors':>8}")
+    for name, r in results.items():
+        print(f"{name:<36}{r['rps']:>9}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}{r['errors']:>8}")
+    print(f"\nfake upstream: {fake.calls} calls, {fake.failures} injected failures")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.min_delta_ms)
+        if regressions:
+            print("\nregressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nno regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
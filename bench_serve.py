@@ -0,0 +1,236 @@
+"""Local load benchmark comparing gunicorn worker modes (see serving.py).
+
+For each mode it boots `gunicorn -c gunicorn.conf.py wsgi:app` and points the
+OpenAI client at a local stand-in server with fixed latency (OPENAI_BASE_URL).
+It then drives a mix of cheap CRUD reads and OpenAI-bound parses, and reports
+req/s plus p50/p95/p99 latency per route.
+
+Usage:
+    python bench_serve.py [--modes sync,threaded,gevent] [--workers 2] [--concurrency 32]
+                          [--duration 10] [--upstream-latency 0.5] [--parse-ratio 0.3]
+                          [--database-uri postgresql+psycopg2://...]
+
+Without --database-uri a throwaway SQLite database is created and seeded.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+AI_TOKEN = "bench-token"
+
+SEED = """
+import json, uuid
+from datetime import datetime, timedelta
+import migrations
+from app import create_app
+from models import db, WingTrip
+app = create_app()
+with app.app_context():
+    migrations.run_migrations()
+    now = datetime.utcnow()
+    db.session.execute(db.insert(WingTrip), [{
+        "id": str(uuid.uuid4()), "route": "TEB-OAK", "departure_date": "06/20/2025",
+        "passenger_count": "5", "budget": "50000", "partner_names": json.dumps(["Broker"]),
+        "partner_emails": json.dumps(["broker@example.com"]), "planner_name": "Planner",
+        "planner_email": "planner@example.com", "status": "pending",
+        "created_at": now - timedelta(minutes=i)
+    } for i in range(500)])
+    db.session.commit()
+"""
+
+QUOTE_JSON = json.dumps({
+    "aircraft": "Citation XLS", "price": "23000", "category": "Mid", "broker_name": "JetLux",
+    "cancellation_policy": "25% nonrefundable", "wifi": "Yes", "yom": "2018",
+    "refurbished_year": "2022", "notes": "Seats 8"
+})
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_upstream(latency):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            time.sleep(latency)
+            body = json.dumps({
+                "id": "chatcmpl-bench", "object": "chat.completion", "created": int(time.time()),
+                "model": "gpt-4",
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": QUOTE_JSON}}],
+                "usage": {"prompt_tokens": 200, "completion_tokens": 60, "total_tokens": 260}
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", free_port()), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def wait_ready(base_url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(base_url + "/", timeout=1).read()
+            return
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            time.sleep(0.2)
+    raise RuntimeError(f"server at {base_url} did not start")
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def run_load(base_url, concurrency, duration, parse_ratio):
+    samples = {"GET /trips": [], "POST /parse-email-quote": []}
+    errors = {name: 0 for name in samples}
+    lock = threading.Lock()
+    deadline = time.time() + duration
+
+    def client(worker_id):
+        rng = random.Random(worker_id)
+        n = 0
+        while time.time() < deadline:
+            n += 1
+            if rng.random() < parse_ratio:
+                name = "POST /parse-email-quote"
+                payload = json.dumps({"email_body": f"quote {worker_id}-{n}", "no_cache": True}).encode()
+                req = urllib.request.Request(base_url + "/parse-email-quote", data=payload, headers={
+                    "Content-Type": "application/json", "X-Wingstack-AI-Key": AI_TOKEN
+                })
+            else:
+                name = "GET /trips"
+                req = urllib.request.Request(base_url + "/trips?limit=50&planner_email=planner@example.com")
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(req, timeout=60) as resp:
+                    resp.read()
+                    ok = resp.status < 400
+            except (urllib.error.URLError, ConnectionError, socket.timeout):
+                ok = False
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                if ok:
+                    samples[name].append(elapsed)
+                else:
+                    errors[name] += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    return {
+        name: {
+            "requests": len(values),
+            "errors": errors[name],
+            "rps": round(len(values) / duration, 1),
+            "p50_ms": round(percentile(values, 50), 1),
+            "p95_ms": round(percentile(values, 95), 1),
+            "p99_ms": round(percentile(values, 99), 1),
+            "mean_ms": round(statistics.fmean(values), 1) if values else 0.0
+        }
+        for name, values in samples.items()
+    }
+
+
+def bench_mode(mode, args, env):
+    port = free_port()
+    env = dict(env, WORKER_MODE=mode, PORT=str(port), WEB_CONCURRENCY=str(args.workers))
+    proc = subprocess.Popen(
+        ["gunicorn", "-c", os.path.join(HERE, "gunicorn.conf.py"), "--access-logfile", "/dev/null", "wsgi:app"],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        wait_ready(base_url)
+        run_load(base_url, args.concurrency, min(2, args.duration), args.parse_ratio)  # warm-up
+        return run_load(base_url, args.concurrency, args.duration, args.parse_ratio)
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default="sync,threaded,gevent")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--upstream-latency", type=float, default=0.5)
+    parser.add_argument("--parse-ratio", type=float, default=0.3)
+    parser.add_argument("--database-uri")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    upstream = start_upstream(args.upstream_latency)
+    tmpdir = tempfile.mkdtemp(prefix="wingstack-bench-")
+    env = dict(
+        os.environ,
+        SQLALCHEMY_DATABASE_URI=args.database_uri or f"sqlite:///{os.path.join(tmpdir, 'bench.db')}",
+        OPENAI_API_KEY="bench",
+        OPENAI_BASE_URL=f"http://127.0.0.1:{upstream.server_address[1]}/v1",
+        AI_AUTH_TOKEN=AI_TOKEN,
+        PYTHONWARNINGS="ignore"
+    )
+
+    results = {}
+    try:
+        if not args.database_uri:
+            subprocess.run([sys.executable, "-c", SEED], cwd=HERE, env=env, check=True, capture_output=True)
+
+        for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+            if mode == "gevent":
+                import importlib.util
+                if importlib.util.find_spec("gevent") is None:
+                    print("skipping gevent: not installed")
+                    continue
+            print(f"benchmarking {mode} workers...", flush=True)
+            results[mode] = bench_mode(mode, args, env)
+    finally:
+        upstream.shutdown()
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    print(f"\n{'mode':<10}{'route':<26}{'req/s':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'errors':>8}")
+    for mode, routes in results.items():
+        for route, r in routes.items():
+            print(f"{mode:<10}{route:<26}{r['rps']:>8}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}{r['errors']:>8}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Cold-start benchmark for wsgi.app.
+
+Each run starts a fresh interpreter and records:
+- import_ms: time to import wsgi, which builds the app
+- first_request_ms: time to serve GET /
+- first_db_request_ms: time to serve GET /trips, which opens the first database connection
+
+Usage:
+    python bench_startup.py [--runs 10] [--json results.json]
+
+SQLALCHEMY_DATABASE_URI defaults to a throwaway SQLite file, which is bootstrapped once before timing.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+PROBE = """
+import json, time
+t0 = time.perf_counter()
+import wsgi
+t1 = time.perf_counter()
+client = wsgi.app.test_client()
+assert client.get("/").status_code == 200
+t2 = time.perf_counter()
+status = client.get("/trips?limit=1").status_code
+t3 = time.perf_counter()
+print(json.dumps({
+    "import_ms": (t1 - t0) * 1000,
+    "first_request_ms": (t2 - t1) * 1000,
+    "first_db_request_ms": (t3 - t2) * 1000,
+    "trips_status": status,
+    "openai_imported": "openai" in __import__("sys").modules,
+    "pdfplumber_imported": "pdfplumber" in __import__("sys").modules
+}))
+"""
+
+BOOTSTRAP = """
+import migrations
+from app import create_app
+app = create_app()
+with app.app_context():
+    migrations.run_migrations()
+"""
+
+
+def run_probe(env):
+    out = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", PROBE],
+        cwd=HERE, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def summarize(samples, key):
+    values = sorted(s[key] for s in samples)
+    return {
+        "median": round(statistics.median(values), 2),
+        "min": round(values[0], 2),
+        "max": round(values[-1], 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    tmpdir = None
+    if not env.get("SQLALCHEMY_DATABASE_URI"):
+        tmpdir = tempfile.mkdtemp(prefix="wingstack-bench-")
+        env["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+        subprocess.run([sys.executable, "-W", "ignore", "-c", BOOTSTRAP], cwd=HERE, env=env,
+                       check=True, capture_output=True)
+
+    try:
+        samples = [run_probe(env) for _ in range(args.runs)]
+    finally:
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+    results = {
+        "runs": args.runs,
+        "python": sys.version.split()[0],
+        "import_ms": summarize(samples, "import_ms"),
+        "first_request_ms": summarize(samples, "first_request_ms"),
+        "first_db_request_ms": summarize(samples, "first_db_request_ms"),
+        "openai_imported_at_startup": any(s["openai_imported"] for s in samples),
+        "pdfplumber_imported_at_startup": any(s["pdfplumber_imported"] for s in samples)
+    }
+
+    for key in ("import_ms", "first_request_ms", "first_db_request_ms"):
+        r = results[key]
+        print(f"{key:<22} median {r['median']:>8.1f}   min {r['min']:>8.1f}   max {r['max']:>8.1f}")
+    print(f"openai imported at startup:     {results['openai_imported_at_startup']}")
+    print(f"pdfplumber imported at startup: {results['pdfplumber_imported_at_startup']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
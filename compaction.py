@@ -0,0 +1,218 @@
+import os
+import re
+from collections import Counter
+
+import tokens
+from pdf_extract import PAGE_BREAK
+
+# === Prompt Compaction ===
+# Quote emails and PDFs are trimmed before they go into a GPT-4 prompt. The
+# steps are:
+# - Drop reply chains with no pricing or aircraft content (or, over budget,
+#   ones the new message doesn't need), signatures and legal disclaimers.
+# - Drop page headers and footers that repeat across PDF pages.
+# - Collapse whitespace.
+# If the text is still over the token budget, paragraphs are kept by
+# priority (pricing, then aircraft, then trip details) in their original
+# order. Each call returns a report with the before/after token counts.
+
+PROMPT_TOKEN_BUDGET_EMAIL = int(os.environ.get("PROMPT_TOKEN_BUDGET_EMAIL", 1500))
+PROMPT_TOKEN_BUDGET_PDF = int(os.environ.get("PROMPT_TOKEN_BUDGET_PDF", 3000))
+
+# Forwarded messages ("---------- Forwarded message ----------") are the normal
+# way quotes arrive, so they are never treated as reply chains.
+REPLY_MARKER_RE = re.compile(
+    r"^(?:On .{0,200}wrote:\s*$"
+    r"|-{2,}\s*Original Message\s*-{2,}"
+    r"|From:\s.+$(?:\n(?:Sent|Date|To|Cc|Subject):.*$){1,4})",
+    re.IGNORECASE | re.MULTILINE
+)
+SIGNATURE_RE = re.compile(r"^(?:-- ?|Sent from my \w+.*|Get Outlook for \w+.*)$", re.IGNORECASE | re.MULTILINE)
+DISCLAIMER_RE = re.compile(
+    r"confidential|intended (?:solely|only) for|received this (?:e-?mail|message|communication) in error"
+    r"|unsubscribe|privileged|do not (?:copy|distribute|disseminate)|all rights reserved",
+    re.IGNORECASE
+)
+PAGE_NUMBER_RE = re.compile(r"\d+")
+
+PRICE_RE = re.compile(
+    r"[$€£]|\b(?:usd|eur|gbp|price|pricing|total|rate|fee|fees|tax|taxes|fet|quote|quoted|cost|charter|"
+    r"deposit|cancell?ation|nonrefundable|non-refundable|subtotal|per hour|hourly)\b",
+    re.IGNORECASE
+)
+AIRCRAFT_RE = re.compile(
+    r"\b(?:aircraft|tail|yom|year of (?:make|manufacture)|refurb\w*|seats?|wi-?fi|category|"
+    r"light|midsize|mid|super mid|heavy|turbo|citation|phenom|challenger|gulfstream|global|falcon|"
+    r"learjet|hawker|king air|pilatus|embraer|legacy|praetor|g\d{3,4}|operator|broker)\b",
+    re.IGNORECASE
+)
+TRIP_RE = re.compile(r"\b(?:[A-Z]{3,4}\s*(?:-|to|→)\s*[A-Z]{3,4}|depart\w*|arriv\w*|pax|passengers?|\d{1,2}/\d{1,2}/\d{2,4})\b")
+
+
+def _collapse_whitespace(text):
+    lines = [re.sub(r"[ \t\u00a0]+", " ", line).strip() for line in text.splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def _has_quote_content(text):
+    return bool(PRICE_RE.search(text) or AIRCRAFT_RE.search(text))
+
+
+def _droppable_reply(head, tail, over_budget):
+    # A reply chain carrying pricing or aircraft details may be the quote itself;
+    # it only goes when the text is over budget and the new part has its own quote.
+    if not tail.strip():
+        return False
+    if not _has_quote_content(tail):
+        return True
+    return over_budget and _has_quote_content(head)
+
+
+def _strip_quoted_replies(text, report, budget):
+    over_budget = tokens.estimate_tokens(text) > budget
+    match = REPLY_MARKER_RE.search(text)
+    if match and len(text[:match.start()].strip()) >= 40:
+        head, tail = text[:match.start()], text[match.start():]
+        if _droppable_reply(head, tail, over_budget):
+            report["quoted_reply_chars"] += len(tail)
+            text = head
+    lines = text.splitlines()
+    quoted = [line for line in lines if line.lstrip().startswith(">")]
+    unquoted = [line for line in lines if not line.lstrip().startswith(">")]
+    if quoted and _droppable_reply("\n".join(unquoted), "\n".join(quoted), over_budget):
+        report["quoted_reply_chars"] += sum(len(line) + 1 for line in quoted)
+        return "\n".join(unquoted)
+    return text
+
+
+def _strip_signature(text, report):
+    match = SIGNATURE_RE.search(text)
+    if match and len(text[:match.start()].strip()) >= 40:
+        report["signature_chars"] += len(text) - match.start()
+        return text[:match.start()]
+    return text
+
+
+def _strip_disclaimers(paragraphs, report):
+    kept = []
+    for paragraph in paragraphs:
+        # Only long boilerplate paragraphs; a short "Confidential quote" line may carry the price.
+        if len(paragraph) >= 120 and DISCLAIMER_RE.search(paragraph) and not PRICE_RE.search(paragraph[:80]):
+            report["disclaimer_chars"] += len(paragraph)
+            continue
+        kept.append(paragraph)
+    return kept
+
+
+def _strip_repeated_page_lines(pages, report, edge_lines=3):
+    if len(pages) < 2:
+        return pages
+
+    def key(line):
+        # Headers and footers are short; long repeated lines are left to the budget step.
+        line = line.strip()
+        return PAGE_NUMBER_RE.sub("#", line.lower()) if len(line) <= 120 else None
+
+    counts = Counter()
+    for page in pages:
+        lines = [l for l in page.splitlines() if l.strip()]
+        counts.update({key(l) for l in lines[:edge_lines] + lines[-edge_lines:]})
+    threshold = max(2, (len(pages) + 1) // 2)
+    repeated = {k for k, n in counts.items() if k is not None and n >= threshold}
+
+    cleaned = []
+    for page in pages:
+        lines = page.splitlines()
+        nonblank = [i for i, l in enumerate(lines) if l.strip()]
+        edges = set(nonblank[:edge_lines] + nonblank[-edge_lines:])
+        kept = []
+        for i, line in enumerate(lines):
+            if i in edges and key(line) is not None and key(line) in repeated:
+                report["header_footer_lines"] += 1
+                continue
+            kept.append(line)
+        cleaned.append("\n".join(kept))
+    return cleaned
+
+
+def _split_large(paragraph, max_tokens=200):
+    # PDF text often has no blank lines, so a whole page would be one paragraph.
+    if tokens.estimate_tokens(paragraph) <= max_tokens:
+        return [paragraph]
+    blocks, block, used = [], [], 0
+    for line in paragraph.splitlines():
+        cost = tokens.estimate_tokens(line) + 1
+        if block and used + cost > max_tokens:
+            blocks.append("\n".join(block))
+            block, used = [], 0
+        block.append(line)
+        used += cost
+    if block:
+        blocks.append("\n".join(block))
+    return blocks
+
+
+def _priority(paragraph):
+    if PRICE_RE.search(paragraph):
+        return 3
+    if AIRCRAFT_RE.search(paragraph):
+        return 2
+    if TRIP_RE.search(paragraph):
+        return 1
+    return 0
+
+
+def _fit_budget(paragraphs, budget, report):
+    costs = [tokens.estimate_tokens(p) + 1 for p in paragraphs]
+    if sum(costs) <= budget:
+        return paragraphs
+
+    order = sorted(range(len(paragraphs)), key=lambda i: (-_priority(paragraphs[i]), i))
+    kept, used = {}, 0
+    for i in order:
+        if used + costs[i] <= budget:
+            kept[i] = paragraphs[i]
+            used += costs[i]
+        elif budget - used > 20:
+            kept[i] = tokens.truncate_to_tokens(paragraphs[i], budget - used - 1)
+            used = budget
+    report["paragraphs_dropped"] = len(paragraphs) - len(kept)
+    return [kept[i] for i in sorted(kept)]
+
+
+def _new_report(text, budget):
+    return {
+        "tokens_before": tokens.estimate_tokens(text),
+        "tokens_after": 0,
+        "budget": budget,
+        "quoted_reply_chars": 0,
+        "signature_chars": 0,
+        "disclaimer_chars": 0,
+        "header_footer_lines": 0,
+        "paragraphs_dropped": 0
+    }
+
+
+def _finish(paragraphs, budget, report):
+    paragraphs = [b for p in paragraphs for b in _split_large(_collapse_whitespace(p)) if b]
+    paragraphs = _strip_disclaimers(paragraphs, report)
+    text = "\n\n".join(_fit_budget(paragraphs, budget, report))
+    report["tokens_after"] = tokens.estimate_tokens(text)
+    return text, report
+
+
+def compact_email(text, budget=PROMPT_TOKEN_BUDGET_EMAIL):
+    """Returns (compacted_text, report) for an email body."""
+    report = _new_report(text, budget)
+    body = text.replace("\r\n", "\n")
+    body = _strip_quoted_replies(body, report, budget)
+    body = _strip_signature(body, report)
+    return _finish(re.split(r"\n\s*\n", body), budget, report)
+
+
+def compact_pdf(text, budget=PROMPT_TOKEN_BUDGET_PDF):
+    """Returns (compacted_text, report) for PDF text with pages separated by PAGE_BREAK."""
+    report = _new_report(text, budget)
+    pages = _strip_repeated_page_lines(text.replace("\r\n", "\n").split(PAGE_BREAK), report)
+    paragraphs = [p for page in pages for p in re.split(r"\n\s*\n", page)]
+    return _finish(paragraphs, budget, report)
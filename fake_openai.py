@@ -0,0 +1,100 @@
+import json
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+# === Local OpenAI Stand-in ===
+# A deterministic drop-in for the chat completions client, for benchmarks and
+# local runs without credentials:
+#
+#     import fake_openai, llm
+#     llm.set_client(fake_openai.FakeOpenAI(latency=0.2, failure_rate=0.05))
+#
+# Responses are picked from the system prompt (trip, quote or summary), latency
+# gets a small seeded jitter, and failures are drawn from a seeded RNG, so two
+# runs with the same seed and call order behave identically. A per-call
+# `timeout` shorter than the latency raises FakeOpenAITimeout after `timeout`.
+
+TRIP_RESULT = {
+    "legs": [{"from": "KTEB", "to": "KOAK", "date": "06/20/2025", "time": "09:00"}],
+    "passenger_count": "5",
+    "budget": "50000"
+}
+
+QUOTE_RESULT = {
+    "aircraft": "Citation XLS",
+    "price": "23000",
+    "category": "Mid",
+    "broker_name": "JetLux",
+    "cancellation_policy": "25% nonrefundable",
+    "wifi": "Yes",
+    "yom": "2018",
+    "refurbished_year": "2022",
+    "notes": "Seats 8"
+}
+
+SUMMARY_RESULT = "Planner and broker agreed on a Citation XLS for TEB-OAK; awaiting final confirmation."
+
+
+class FakeOpenAIError(RuntimeError):
+    status_code = 500  # counts against the circuit breaker like a real 5xx
+
+
+class FakeOpenAITimeout(TimeoutError):
+    pass
+
+
+class _Completions:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def create(self, model=None, messages=None, timeout=None, **kwargs):
+        return self._owner._complete(model, messages or [], timeout)
+
+
+class FakeOpenAI:
+    def __init__(self, latency=0.0, jitter=0.1, failure_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self.failures = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=_Completions(self))
+
+    def _complete(self, model, messages, timeout=None):
+        with self._lock:
+            self.calls += 1
+            fail = self._rng.random() < self.failure_rate
+            delay = self.latency * (1 + self._rng.uniform(-self.jitter, self.jitter))
+            if fail:
+                self.failures += 1
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise FakeOpenAITimeout(f"fake upstream exceeded {timeout:.2f}s timeout")
+        if delay > 0:
+            time.sleep(delay)
+        if fail:
+            raise FakeOpenAIError("fake upstream failure")
+
+        system = next((m["content"] for m in messages if m["role"] == "system"), "").lower()
+        prompt = "".join(m["content"] for m in messages)
+        if "summarize" in system:
+            content = SUMMARY_RESULT
+        elif "quote" in system:
+            content = json.dumps(QUOTE_RESULT)
+        else:
+            content = json.dumps(TRIP_RESULT)
+
+        prompt_tokens = max(1, len(prompt) // 4)
+        completion_tokens = max(1, len(content) // 4)
+        return SimpleNamespace(
+            id=f"chatcmpl-fake-{self.calls}",
+            model=model,
+            choices=[SimpleNamespace(index=0, finish_reason="stop",
+                                     message=SimpleNamespace(role="assistant", content=content))],
+            usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                  total_tokens=prompt_tokens + completion_tokens)
+        )
@@ -0,0 +1,45 @@
+import os
+
+import serving
+
+# === Gunicorn Configuration ===
+# Start with `python serve.py` (or `gunicorn -c gunicorn.conf.py wsgi:app`).
+# Tune with WORKER_MODE, WEB_CONCURRENCY, GUNICORN_THREADS, GUNICORN_WORKER_CONNECTIONS,
+# GUNICORN_TIMEOUT and GUNICORN_PRELOAD; see serving.py.
+
+_mode = serving.worker_mode()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = serving.worker_count()
+worker_class = serving.WORKER_CLASSES[_mode]
+threads = serving.threads_per_worker() if _mode == "threaded" else 1
+worker_connections = serving.worker_connections()
+
+# GPT-4 parses can legitimately take tens of seconds; SSE streams end on their own
+# after MESSAGE_STREAM_MAX_SECONDS, so this only has to cover the slowest upstream call.
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+
+# Preloading shares the imported app between workers (faster boot, less memory). gevent has
+# to monkeypatch before the app is imported, so it never preloads.
+preload_app = _mode != "gevent" and os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = max_requests // 10 if max_requests else 0
+
+accesslog = "-"
+errorlog = "-"
+
+
+def post_fork(server, worker):
+    # Connections opened in the master before fork must not be shared with workers.
+    if preload_app:
+        from models import db
+        wsgi_app = server.app.wsgi()
+        with wsgi_app.app_context():
+            db.engine.dispose(close=False)
+
+
+def worker_exit(server, worker):
+    serving.shutdown_background_work(wait=True)
@@ -0,0 +1,238 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy.exc import IntegrityError
+
+from models import db, AIJob
+import upstream
+
+# === Async AI Jobs ===
+# Opt-in async mode for the AI routes: the request persists an AIJob row and
+# returns its id right away, and a small thread pool runs the handler so slow
+# OpenAI round trips don't hold the sync workers that serve /trips and /messages.
+# Rows are claimed with a conditional UPDATE, so every gunicorn worker can
+# resume leftover jobs after a restart without running any of them twice.
+# Identical submissions share one job; a partial unique index on input_hash
+# over queued/running rows keeps that true across worker processes. Finished
+# jobs are deleted after AI_JOB_RETENTION_SECONDS (on each worker's start,
+# by init-db, or by `flask purge-ai-jobs`).
+
+AI_JOB_WORKERS = int(os.environ.get("AI_JOB_WORKERS", 4))
+AI_JOB_STALE_SECONDS = int(os.environ.get("AI_JOB_STALE_SECONDS", 600))
+AI_JOB_RETENTION_SECONDS = int(os.environ.get("AI_JOB_RETENTION_SECONDS", 7 * 24 * 3600))
+
+ACTIVE_STATUSES = ("queued", "running")
+FINISHED_STATUSES = ("succeeded", "failed")
+
+_app = None
+_resumed = False
+_handlers = {}
+_public_kinds = set()  # kinds whose routes don't need the AI key, so polling them doesn't either
+_executor = None
+_executor_lock = threading.Lock()
+_submit_lock = threading.Lock()
+
+
+def init_app(app):
+    global _app
+    _app = app
+    # Leftover jobs are picked up after the first request rather than at import,
+    # keeping startup free of database round trips.
+    app.before_request(_resume_once)
+
+
+def _resume_once():
+    global _resumed
+    if _resumed:
+        return
+    with _executor_lock:
+        if _resumed:
+            return
+        _resumed = True
+    _get_executor().submit(_resume_in_background)
+
+
+def _resume_in_background():
+    with _app.app_context():
+        try:
+            resumed = resume_pending()
+            if resumed:
+                print(f"✅ Resumed {resumed} pending AI jobs")
+            purged = purge_finished()
+            if purged:
+                print(f"✅ Purged {purged} finished AI jobs")
+        except Exception as e:
+            print("❌ Failed to resume pending AI jobs:", str(e))
+        finally:
+            db.session.remove()
+
+
+def register(kind, handler, requires_ai_auth=True):
+    """handler(payload) -> (body, status_code), run inside an app context."""
+    _handlers[kind] = handler
+    if requires_ai_auth:
+        _public_kinds.discard(kind)
+    else:
+        _public_kinds.add(kind)
+
+
+def requires_ai_auth(kind):
+    return kind not in _public_kinds
+
+
+def wants_async(request):
+    if request.args.get("async") in ("1", "true"):
+        return True
+    return "respond-async" in (request.headers.get("Prefer") or "").lower()
+
+
+def input_hash(kind, coalesce_on):
+    encoded = json.dumps([kind, coalesce_on], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=AI_JOB_WORKERS, thread_name_prefix="ai-job")
+        return _executor
+
+
+def _active_job(digest):
+    return AIJob.query.filter(
+        AIJob.input_hash == digest,
+        AIJob.status.in_(ACTIVE_STATUSES)
+    ).order_by(AIJob.created_at.desc()).first()
+
+
+def submit(kind, payload, coalesce_on=None):
+    """Queues a job, or returns the queued/running job with identical input. Returns (job, coalesced)."""
+    digest = input_hash(kind, payload if coalesce_on is None else coalesce_on)
+
+    with _submit_lock:
+        existing = _active_job(digest)
+        if existing:
+            return existing, True
+
+        job = AIJob(kind=kind, input_hash=digest, payload=json.dumps(payload), status="queued")
+        db.session.add(job)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another worker process queued the same input first.
+            db.session.rollback()
+            existing = _active_job(digest)
+            if existing is None:
+                raise
+            return existing, True
+
+    _get_executor().submit(_run, job.id)
+    return job, False
+
+
+def _claim(job_id):
+    claimed = AIJob.query.filter_by(id=job_id, status="queued").update(
+        {"status": "running", "started_at": datetime.utcnow()},
+        synchronize_session=False
+    )
+    db.session.commit()
+    return claimed == 1
+
+
+def _finish(job, status, result=None, status_code=None, error=None):
+    job.status = status
+    job.result = json.dumps(result) if result is not None else None
+    job.status_code = status_code
+    job.error = error
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+
+
+def _run(job_id):
+    with _app.app_context():
+        try:
+            if not _claim(job_id):
+                return
+            job = db.session.get(AIJob, job_id)
+            handler = _handlers.get(job.kind)
+            if handler is None:
+                _finish(job, "failed", error=f"No handler registered for job kind '{job.kind}'")
+                return
+
+            try:
+                with upstream.queued():
+                    body, status_code = handler(json.loads(job.payload))
+            except Exception as e:
+                print(f"❌ AI job {job_id} ({job.kind}) failed:", str(e))
+                db.session.rollback()
+                _finish(job, "failed", status_code=500, error=str(e))
+                return
+
+            status = "succeeded" if status_code < 400 else "failed"
+            error = body.get("error") if status == "failed" and isinstance(body, dict) else None
+            _finish(job, status, result=body, status_code=status_code, error=error)
+        finally:
+            db.session.remove()
+
+
+def shutdown(wait=True):
+    # Jobs that don't get to run stay queued in the database and are resumed on the next start.
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def resume_pending():
+    """Requeues jobs orphaned by a restart and schedules everything still queued."""
+    stale_before = datetime.utcnow() - timedelta(seconds=AI_JOB_STALE_SECONDS)
+    AIJob.query.filter(
+        AIJob.status == "running",
+        AIJob.started_at < stale_before
+    ).update({"status": "queued", "started_at": None}, synchronize_session=False)
+    db.session.commit()
+
+    pending = [row.id for row in db.session.query(AIJob.id).filter_by(status="queued").all()]
+    for job_id in pending:
+        _get_executor().submit(_run, job_id)
+    return len(pending)
+
+
+def purge_finished(retention_seconds=None):
+    retention_seconds = AI_JOB_RETENTION_SECONDS if retention_seconds is None else retention_seconds
+    deleted = AIJob.query.filter(
+        AIJob.status.in_(FINISHED_STATUSES),
+        AIJob.finished_at < datetime.utcnow() - timedelta(seconds=retention_seconds)
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+
+@click.command("purge-ai-jobs")
+@with_appcontext
+def purge_ai_jobs_command():
+    """Delete finished AI jobs older than AI_JOB_RETENTION_SECONDS."""
+    deleted = purge_finished()
+    click.echo(f"✅ Purged {deleted} finished AI jobs.")
+
+
+def serialize(job):
+    return {
+        "job_id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "status_code": job.status_code,
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None
+    }
@@ -0,0 +1,56 @@
+import os
+import threading
+import time
+
+# === OpenAI Client ===
+# The openai package is heavy to import, so the client is built on first use
+# rather than at import time. Serverless cold starts and CRUD-only requests
+# never pay for it. A missing OPENAI_API_KEY surfaces as an error on the first
+# AI call instead of crashing the import.
+#
+# Every completion goes through create_completion(), which applies the
+# upstream guards (see upstream.py) and records latency, token usage and
+# outcome in metrics. Retries are handled there, so the client's own are off.
+
+_client = None
+_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                import openai
+
+                api_key = os.environ.get("OPENAI_API_KEY")
+                if not api_key:
+                    raise ValueError("Missing OPENAI_API_KEY environment variable.")
+                _client = openai.OpenAI(api_key=api_key, max_retries=0)
+    return _client
+
+
+def set_client(client):
+    """Swaps in a different completions client (benchmarks, local stand-ins)."""
+    global _client
+    with _lock:
+        _client = client
+
+
+def create_completion(kind, **kwargs):
+    import metrics
+    import upstream
+
+    model = kwargs.get("model", "")
+    start = time.perf_counter()
+    try:
+        response = upstream.call(kind, lambda timeout: get_client().chat.completions.create(timeout=timeout, **kwargs))
+    except upstream.UpstreamUnavailable:
+        metrics.llm_calls.inc(kind=kind, model=model, outcome="rejected")
+        raise
+    except Exception as e:
+        outcome = "timeout" if upstream.is_timeout(e) else "error"
+        metrics.observe_llm_call(kind, model, time.perf_counter() - start, outcome)
+        raise
+    metrics.observe_llm_call(kind, model, time.perf_counter() - start, "ok", getattr(response, "usage", None))
+    return response
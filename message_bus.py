@@ -0,0 +1,39 @@
+import os
+import threading
+import time
+
+# === Chat Message Notifications ===
+# post_message bumps a per-chat version after it commits, waking long-poll and
+# SSE readers in this process immediately. Readers also re-check the database
+# every MESSAGE_POLL_INTERVAL_SECONDS, which picks up messages committed by
+# other gunicorn workers.
+
+MESSAGE_POLL_INTERVAL_SECONDS = float(os.environ.get("MESSAGE_POLL_INTERVAL_SECONDS", 2))
+MESSAGE_LONG_POLL_MAX_SECONDS = float(os.environ.get("MESSAGE_LONG_POLL_MAX_SECONDS", 30))
+MESSAGE_STREAM_MAX_SECONDS = float(os.environ.get("MESSAGE_STREAM_MAX_SECONDS", 300))
+
+_cond = threading.Condition()
+_versions = {}
+
+
+def version(chat_id):
+    with _cond:
+        return _versions.get(chat_id, 0)
+
+
+def publish(chat_id):
+    with _cond:
+        _versions[chat_id] = _versions.get(chat_id, 0) + 1
+        _cond.notify_all()
+
+
+def wait_for_update(chat_id, seen_version, timeout):
+    """Blocks until chat_id is published past seen_version or timeout elapses; returns True if it was."""
+    deadline = time.monotonic() + timeout
+    with _cond:
+        while _versions.get(chat_id, 0) == seen_version:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            _cond.wait(remaining)
+        return True
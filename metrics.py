@@ -0,0 +1,220 @@
+import os
+import threading
+import time
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+
+# === Metrics ===
+# In-process counters and histograms rendered in Prometheus text format at
+# /metrics: per-route latency, SQL statements and time per request (from
+# SQLAlchemy cursor events), and OpenAI call latency, token usage and
+# outcomes. Values are per worker process; scrape each worker (or run one)
+# for exact totals. Requests slower than SLOW_REQUEST_LOG_MS are also logged.
+
+SLOW_REQUEST_LOG_MS = float(os.environ.get("SLOW_REQUEST_LOG_MS", 0))
+METRICS_AUTH_TOKEN = os.environ.get("METRICS_AUTH_TOKEN")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+_lock = threading.Lock()
+_registry = []
+_collectors = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self._values = {}
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple((n, labels.get(n, "")) for n in self.labelnames)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def lines(self):
+        with _lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(key)} {_format_value(value)}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets, labelnames=()):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}  # label key -> [bucket counts..., sum, count]
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple((n, labels.get(n, "")) for n in self.labelnames)
+        with _lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def lines(self):
+        with _lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+        for key, state in items:
+            for i, bound in enumerate(self.buckets):
+                yield f"{self.name}_bucket{_format_labels(key + (('le', _format_value(float(bound))),))} {state[i]}"
+            yield f"{self.name}_bucket{_format_labels(key + (('le', '+Inf'),))} {state[-1]}"
+            yield f"{self.name}_sum{_format_labels(key)} {_format_value(state[-2])}"
+            yield f"{self.name}_count{_format_labels(key)} {state[-1]}"
+
+
+def register_collector(fn):
+    """fn() -> iterable of (name, type, help, [(labels_dict, value), ...]) evaluated at scrape time."""
+    _collectors.append(fn)
+
+
+def register_stats(name, help_text, stats_fn):
+    """Exposes a module's stats() dict as one gauge labelled by stat name."""
+    def collect():
+        samples = [({"stat": k}, v) for k, v in stats_fn().items() if isinstance(v, (int, float))]
+        yield name, "gauge", help_text, samples
+    register_collector(collect)
+
+
+def render():
+    out = []
+    for metric in _registry:
+        out.append(f"# HELP {metric.name} {metric.help}")
+        out.append(f"# TYPE {metric.name} {metric.kind}")
+        out.extend(metric.lines())
+    for collector in _collectors:
+        for name, kind, help_text, samples in collector():
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                out.append(f"{name}{_format_labels(tuple(sorted(labels.items())))} {_format_value(value)}")
+    return "\n".join(out) + "\n"
+
+
+# --- HTTP ---
+http_requests = Counter("wingstack_http_requests_total", "HTTP requests served.", ("route", "method", "status"))
+http_latency = Histogram("wingstack_http_request_duration_seconds", "HTTP request latency.", LATENCY_BUCKETS, ("route", "method"))
+http_sql_statements = Histogram("wingstack_http_sql_statements", "SQL statements executed per request.", COUNT_BUCKETS, ("route",))
+http_sql_time = Histogram("wingstack_http_sql_duration_seconds", "Time spent in SQL per request.", LATENCY_BUCKETS, ("route",))
+
+# --- SQL ---
+sql_statements = Counter("wingstack_sql_statements_total", "SQL statements executed (requests and background jobs).")
+sql_time = Counter("wingstack_sql_duration_seconds_total", "Total time spent executing SQL.")
+
+# --- OpenAI ---
+llm_calls = Counter("wingstack_llm_calls_total", "Upstream LLM calls by outcome.", ("kind", "model", "outcome"))
+llm_latency = Histogram("wingstack_llm_call_duration_seconds", "Upstream LLM call latency.", LATENCY_BUCKETS, ("kind", "model"))
+llm_tokens = Counter("wingstack_llm_tokens_total", "Tokens reported by the upstream LLM.", ("kind", "model", "type"))
+prompt_tokens = Counter("wingstack_prompt_input_tokens_total", "Estimated input tokens before and after compaction.", ("kind", "stage"))
+parse_fallbacks = Counter("wingstack_parse_fallbacks_total", "Parses answered by a fallback instead of the LLM.", ("kind", "reason"))
+
+
+def observe_llm_call(kind, model, seconds, outcome, usage=None):
+    llm_calls.inc(kind=kind, model=model, outcome=outcome)
+    llm_latency.observe(seconds, kind=kind, model=model)
+    if usage is not None:
+        for token_type in ("prompt_tokens", "completion_tokens"):
+            count = getattr(usage, token_type, None)
+            if count:
+                llm_tokens.inc(count, kind=kind, model=model, type=token_type.replace("_tokens", ""))
+    if has_request_context():
+        g.metrics_llm_seconds = g.get("metrics_llm_seconds", 0.0) + seconds
+
+
+def _route_label():
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+
+def _before_request():
+    g.metrics_start = time.perf_counter()
+    g.metrics_sql_count = 0
+    g.metrics_sql_seconds = 0.0
+
+
+def _after_request(response):
+    start = g.get("metrics_start")
+    if start is None:
+        return response
+    elapsed = time.perf_counter() - start
+    route = _route_label()
+    sql_count = g.get("metrics_sql_count", 0)
+    sql_seconds = g.get("metrics_sql_seconds", 0.0)
+    llm_seconds = g.get("metrics_llm_seconds", 0.0)
+
+    http_requests.inc(route=route, method=request.method, status=str(response.status_code))
+    http_latency.observe(elapsed, route=route, method=request.method)
+    http_sql_statements.observe(sql_count, route=route)
+    http_sql_time.observe(sql_seconds, route=route)
+
+    response.headers["Server-Timing"] = (
+        f"total;dur={elapsed * 1000:.1f}, db;dur={sql_seconds * 1000:.1f};desc=\"{sql_count} queries\", "
+        f"llm;dur={llm_seconds * 1000:.1f}"
+    )
+    if SLOW_REQUEST_LOG_MS and elapsed * 1000 >= SLOW_REQUEST_LOG_MS:
+        print(
+            f"🐢 Slow request {request.method} {route} status={response.status_code} "
+            f"total_ms={elapsed * 1000:.1f} sql_count={sql_count} sql_ms={sql_seconds * 1000:.1f} "
+            f"llm_ms={llm_seconds * 1000:.1f}"
+        )
+    return response
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("metrics_query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    sql_statements.inc()
+    sql_time.inc(elapsed)
+    if has_request_context() and "metrics_sql_count" in g:
+        g.metrics_sql_count += 1
+        g.metrics_sql_seconds += elapsed
+
+
+def metrics_view():
+    if METRICS_AUTH_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_AUTH_TOKEN}":
+        return Response("Unauthorized\n", status=401, mimetype="text/plain")
+    return Response(render(), mimetype="text/plain; version=0.0.4")
+
+
+def init_app(app, db):
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.add_url_rule("/metrics", "metrics", metrics_view, methods=["GET"])
+    with app.app_context():
+        engine = db.engine
+        if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+            event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", _after_cursor_execute)
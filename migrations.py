@@ -0,0 +1,186 @@
+import json
+from datetime import datetime
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, inspect, select, text, update
+from sqlalchemy.exc import IntegrityError
+
+from models import db, AIJob, WingTrip, Quote, TripPartner, QuoteShare, SchemaMigration
+import jobs
+import parse_cache
+import partners
+import prices
+import search
+import trip_values
+
+# === Schema Migrations ===
+# db.create_all() only creates missing tables. These steps bring existing
+# databases up to date with the models and are safe to run repeatedly; data
+# backfills are recorded in schema_migrations so they only run once.
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def ensure_indexes():
+    inspector = inspect(db.engine)
+    created = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(db.engine)
+                created.append(index.name)
+    return created
+
+
+def ensure_columns():
+    # Adds nullable columns that were added to existing models. Anything needing a
+    # default or a type change gets its own run_once migration instead.
+    inspector = inspect(db.engine)
+    added = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {col["name"] for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            with db.engine.begin() as conn:
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            added.append(f"{table.name}.{column.name}")
+    return added
+
+
+def run_once(name, fn):
+    if db.session.get(SchemaMigration, name):
+        return False
+    try:
+        fn()
+        db.session.add(SchemaMigration(name=name, applied_at=datetime.utcnow()))
+        db.session.commit()
+    except IntegrityError:
+        # Another process applied it concurrently; its transaction wins.
+        db.session.rollback()
+        return False
+    print(f"✅ Applied migration {name}")
+    return True
+
+
+def _batched(query, key_column):
+    # Keyset walk over the primary key so large tables are read in bounded chunks.
+    last_key = None
+    while True:
+        batch_query = query
+        if last_key is not None:
+            batch_query = batch_query.where(key_column > last_key)
+        rows = db.session.execute(batch_query.order_by(key_column).limit(BACKFILL_BATCH_SIZE)).all()
+        if not rows:
+            return
+        yield rows
+        last_key = rows[-1][0]
+
+
+def backfill_trip_partners():
+    db.session.query(TripPartner).delete()
+    query = select(WingTrip.id, WingTrip.partner_emails, WingTrip.partner_names)
+    for rows in _batched(query, WingTrip.id):
+        for trip_id, partner_emails, partner_names in rows:
+            try:
+                emails = json.loads(partner_emails or "[]")
+                names = json.loads(partner_names or "[]")
+            except ValueError:
+                emails, names = partners.split_emails(partner_emails), []
+            db.session.add_all(partners.trip_partner_rows(trip_id, emails, names))
+        db.session.flush()
+
+
+def backfill_quote_shares():
+    db.session.query(QuoteShare).delete()
+    query = select(Quote.id, Quote.shared_with_emails).where(Quote.shared_with_emails.isnot(None))
+    for rows in _batched(query, Quote.id):
+        for quote_id, shared_with_emails in rows:
+            db.session.add_all(partners.quote_share_rows(quote_id, shared_with_emails))
+        db.session.flush()
+
+
+def backfill_quote_prices():
+    query = select(Quote.id, Quote.price).where(Quote.price_amount.is_(None))
+    for rows in _batched(query, Quote.id):
+        updates = []
+        for quote_id, price in rows:
+            amount, currency = prices.parse_price(price)
+            if amount is not None:
+                updates.append({"id": quote_id, "price_amount": amount, "price_currency": currency})
+        if updates:
+            db.session.execute(update(Quote), updates)
+        db.session.flush()
+
+
+def backfill_trip_typed_values():
+    # Commits per batch so a large table isn't held in one long transaction
+    # while the app keeps writing; trips written meanwhile already carry typed values.
+    query = select(WingTrip.id, WingTrip.departure_date, WingTrip.passenger_count, WingTrip.budget).where(
+        WingTrip.departure_on.is_(None), WingTrip.passengers.is_(None), WingTrip.budget_amount.is_(None)
+    )
+    for rows in _batched(query, WingTrip.id):
+        updates = []
+        for trip_id, departure_date, passenger_count, budget in rows:
+            values = trip_values.typed_values(departure_date, passenger_count, budget)
+            if any(v is not None for v in values.values()):
+                updates.append(dict(values, id=trip_id))
+        if updates:
+            db.session.execute(update(WingTrip), updates)
+        db.session.commit()
+
+
+def detach_duplicate_active_jobs():
+    # Before ux_ai_jobs_active_input exists, two workers could queue the same input.
+    # The newest job keeps the hash (submit() coalesced onto it); the others still
+    # run and stay pollable, they just stop being coalescing targets.
+    duplicated = select(AIJob.input_hash).where(AIJob.status.in_(jobs.ACTIVE_STATUSES)).group_by(
+        AIJob.input_hash
+    ).having(func.count() > 1)
+    for digest in db.session.scalars(duplicated).all():
+        rows = AIJob.query.filter(
+            AIJob.input_hash == digest, AIJob.status.in_(jobs.ACTIVE_STATUSES)
+        ).order_by(AIJob.created_at.desc()).all()
+        for job in rows[1:]:
+            job.input_hash = job.id
+    db.session.flush()
+
+
+def run_migrations():
+    db.create_all()
+    added = ensure_columns()
+    if added:
+        print("✅ Added columns:", ", ".join(added))
+    run_once("0005_detach_duplicate_active_jobs", detach_duplicate_active_jobs)
+    created = ensure_indexes()
+    if created:
+        print("✅ Created indexes:", ", ".join(created))
+    created = search.install()
+    if created:
+        print("✅ Created search indexes:", ", ".join(created))
+
+    run_once("0001_backfill_trip_partners", backfill_trip_partners)
+    run_once("0002_backfill_quote_shares", backfill_quote_shares)
+    run_once("0003_backfill_quote_prices", backfill_quote_prices)
+    run_once("0004_backfill_trip_typed_values", backfill_trip_typed_values)
+
+
+@click.command("init-db")
+@with_appcontext
+def init_db_command():
+    """Create tables, add new columns/indexes and apply pending data migrations."""
+    run_migrations()
+    purged = parse_cache.purge_expired()
+    if purged:
+        print(f"✅ Purged {purged} expired parse cache entries")
+    purged = jobs.purge_finished()
+    if purged:
+        print(f"✅ Purged {purged} finished AI jobs")
+    click.echo("✅ Database is up to date.")
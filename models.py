@@ -26,12 +26,21 @@ class Quote(db.Model):
     operator_name = db.Column(db.String, nullable=False)
     aircraft_type = db.Column(db.String, nullable=False)
     aircraft_category = db.Column(db.String, nullable=True)  # e.g., turbo, light, super mid, etc.
-    price = db.Column(db.String, nullable=False)
+    price = db.Column(db.String, nullable=False)  # broker's free text, shown as-is
+    price_amount = db.Column(db.Numeric(12, 2, asdecimal=False), nullable=True)  # parsed from price; NULL if unparseable
+    price_currency = db.Column(db.String(3), nullable=True)
     notes = db.Column(db.String, nullable=True)
-    submitted_by_email = db.Column(db.String, nullable=True)
-    shared_with_emails = db.Column(db.String, nullable=True)
+    submitted_by_email = db.Column(db.String, nullable=True, index=True)
+    shared_with_emails = db.Column(db.String, nullable=True)  # legacy free-form list; quote_shares is the indexed copy
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    shares = db.relationship("QuoteShare", backref="quote", cascade="all, delete-orphan")
+
+    # GET /trips/<trip_id>/quotes filters and sorts a trip's quotes by price.
+    __table_args__ = (
+        db.Index('ix_quotes_trip_price', 'trip_id', 'price_amount'),
+    )
+
 # === WINGTRIP MODEL ===
 class WingTrip(db.Model):
     __tablename__ = 'wingtrips'
@@ -41,14 +50,31 @@ class WingTrip(db.Model):
     passenger_count = db.Column(db.String, nullable=True)
     size = db.Column(db.String, nullable=True)
     budget = db.Column(db.String, nullable=True)
+    # Typed copies of departure_date / passenger_count / budget (see trip_values.py); NULL if unparseable.
+    departure_on = db.Column(db.Date, nullable=True)
+    passengers = db.Column(db.Integer, nullable=True)
+    budget_amount = db.Column(db.Numeric(12, 2, asdecimal=False), nullable=True)
     partner_names = db.Column(db.Text, nullable=True)   # JSON-encoded list of names
-    partner_emails = db.Column(db.Text, nullable=True)  # JSON-encoded list of emails
+    partner_emails = db.Column(db.Text, nullable=True)  # JSON-encoded list of emails; trip_partners is the indexed copy
     planner_name = db.Column(db.String, nullable=True)
     planner_email = db.Column(db.String, nullable=True)
     status = db.Column(db.String, nullable=False, default="pending")
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow)  # NULL on pre-existing rows
 
     chat = db.relationship("Chat", backref="trip", uselist=False, cascade="all, delete-orphan")
+    partners = db.relationship("TripPartner", backref="trip", cascade="all, delete-orphan")
+
+    # GET /trips pages newest-first on (created_at, id), optionally filtered by planner and/or status.
+    __table_args__ = (
+        db.Index('ix_wingtrips_created', 'created_at', 'id'),
+        db.Index('ix_wingtrips_status_created', 'status', 'created_at', 'id'),
+        db.Index('ix_wingtrips_planner_created', 'planner_email', 'created_at', 'id'),
+        db.Index('ix_wingtrips_planner_status_created', 'planner_email', 'status', 'created_at', 'id'),
+        # GET /trips/upcoming: departure windows and budget bands within a status.
+        db.Index('ix_wingtrips_status_departure', 'status', 'departure_on', 'id'),
+        db.Index('ix_wingtrips_status_budget', 'status', 'budget_amount', 'id'),
+    )
 
 # === CHAT MODEL ===
 class Chat(db.Model):
@@ -56,6 +82,10 @@ class Chat(db.Model):
     id = db.Column(db.String, primary_key=True, default=generate_uuid)
     trip_id = db.Column(db.String, db.ForeignKey('wingtrips.id'), nullable=False, unique=True)
     summary = db.Column(db.Text, nullable=True)
+    # Summary watermark: the last message already folded into `summary`.
+    summary_message_id = db.Column(db.String, nullable=True)
+    summary_message_timestamp = db.Column(db.DateTime, nullable=True)
+    summary_updated_at = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     messages = db.relationship("Message", backref="chat", cascade="all, delete-orphan")
@@ -69,14 +99,113 @@ class Message(db.Model):
     content = db.Column(db.Text, nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Chat reads and incremental sync walk a chat's messages in (timestamp, id) order.
+    __table_args__ = (
+        db.Index('ix_messages_chat_timestamp', 'chat_id', 'timestamp', 'id'),
+    )
+
 # === TRIP LEG MODEL ===
 class TripLeg(db.Model):
     __tablename__ = 'triplegs'
     id = db.Column(db.String, primary_key=True, default=generate_uuid)
-    trip_id = db.Column(db.String, db.ForeignKey('wingtrips.id'), nullable=False)
+    trip_id = db.Column(db.String, db.ForeignKey('wingtrips.id'), nullable=False, index=True)
     from_location = db.Column(db.String, nullable=False)
     to_location = db.Column(db.String, nullable=False)
     date = db.Column(db.Date, nullable=True)
     time = db.Column(db.Time, nullable=True)
 
     trip = db.relationship("WingTrip", backref=db.backref("legs", cascade="all, delete-orphan"))
+
+    __table_args__ = (
+        db.Index('ix_triplegs_trip_date_time', 'trip_id', 'date', 'time'),
+    )
+
+# === PARSE CACHE MODEL (persistent tier of the OpenAI parse cache) ===
+class ParseCacheEntry(db.Model):
+    __tablename__ = 'parse_cache'
+    key = db.Column(db.String(64), primary_key=True)  # sha256 of normalized input + model + prompt + temperature
+    kind = db.Column(db.String, nullable=False)  # 'trip', 'email_quote', 'pdf_quote'
+    model = db.Column(db.String, nullable=False)
+    result = db.Column(db.Text, nullable=False)  # JSON-encoded parse result
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+# === QUOTE TEMPLATE MODEL (learned per-layout field extraction for broker quotes) ===
+class QuoteTemplate(db.Model):
+    __tablename__ = 'quote_templates'
+    fingerprint = db.Column(db.String(64), primary_key=True)  # sha256 of kind + the document's label skeleton
+    kind = db.Column(db.String, nullable=False)  # 'email_quote', 'pdf_quote'
+    fields = db.Column(db.Text, nullable=False)  # JSON: field -> {"label", "transform"} / {"constant"} / {"lookup"}
+    label_count = db.Column(db.Integer, nullable=False)
+    confirmations = db.Column(db.Integer, nullable=False, default=1)  # LLM parses that produced this same mapping
+    hits = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, nullable=True)
+
+# === AI JOB MODEL (async parse / summarize jobs) ===
+class AIJob(db.Model):
+    __tablename__ = 'ai_jobs'
+    id = db.Column(db.String, primary_key=True, default=generate_uuid)
+    kind = db.Column(db.String, nullable=False)  # 'parse_trip', 'parse_email_quote', 'parse_quote_pdf', 'summarize_chat'
+    input_hash = db.Column(db.String(64), nullable=False, index=True)  # used to coalesce identical submissions
+    payload = db.Column(db.Text, nullable=False)  # JSON-encoded handler arguments
+    status = db.Column(db.String, nullable=False, default="queued")  # queued, running, succeeded, failed
+    result = db.Column(db.Text, nullable=True)  # JSON-encoded response body
+    status_code = db.Column(db.Integer, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        # At most one active job per input, across every worker process (see jobs.submit).
+        db.Index('ux_ai_jobs_active_input', 'input_hash', unique=True,
+                 postgresql_where=db.text("status IN ('queued', 'running')"),
+                 sqlite_where=db.text("status IN ('queued', 'running')")),
+        db.Index('ix_ai_jobs_status_finished', 'status', 'finished_at'),
+    )
+
+# === TRIP PARTNER MODEL (indexed copy of WingTrip.partner_emails) ===
+class TripPartner(db.Model):
+    __tablename__ = 'trip_partners'
+    trip_id = db.Column(db.String, db.ForeignKey('wingtrips.id'), primary_key=True)
+    email = db.Column(db.String, primary_key=True)  # lowercased
+    name = db.Column(db.String, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_trip_partners_email', 'email', 'trip_id'),
+    )
+
+# === QUOTE SHARE MODEL (indexed copy of Quote.shared_with_emails) ===
+class QuoteShare(db.Model):
+    __tablename__ = 'quote_shares'
+    quote_id = db.Column(db.String, db.ForeignKey('quotes.id'), primary_key=True)
+    email = db.Column(db.String, primary_key=True)  # lowercased
+
+    __table_args__ = (
+        db.Index('ix_quote_shares_email', 'email', 'quote_id'),
+    )
+
+# === SCHEMA MIGRATION MODEL (one-time data migrations already applied) ===
+class SchemaMigration(db.Model):
+    __tablename__ = 'schema_migrations'
+    name = db.Column(db.String, primary_key=True)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# === COLD ARCHIVE TABLES (old deleted/archived trips and their rows; see archive.py) ===
+# Same columns as the hot table, without foreign keys or secondary indexes, plus the
+# owning trip (for rehydration) and when the row was moved.
+def _archive_table(model):
+    source = model.__table__
+    return db.Table(
+        f"{source.name}_archive",
+        *[db.Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable) for c in source.columns],
+        db.Column("archive_trip_id", db.String, nullable=False, index=True),
+        db.Column("archived_at", db.DateTime, nullable=False)
+    )
+
+ARCHIVE_TABLES = {
+    model.__tablename__: _archive_table(model)
+    for model in (WingTrip, TripLeg, TripPartner, Quote, QuoteShare, Chat, Message)
+}
@@ -0,0 +1,59 @@
+import base64
+import json
+import os
+from datetime import datetime
+
+# === Keyset Pagination Helpers ===
+# Cursors are opaque, URL-safe encodings of the sort key of the last row served
+# (e.g. created_at + id), so the next page is an index range scan rather than
+# an OFFSET that gets slower the deeper a planner pages into their history.
+
+DEFAULT_PAGE_SIZE = int(os.environ.get("DEFAULT_PAGE_SIZE", 100))
+MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE", 500))
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(*values):
+    encoded = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(encoded).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, *types):
+    """Decodes a cursor into a tuple, converting each value with the matching type (datetime or str)."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("cursor shape")
+        return tuple(
+            datetime.fromisoformat(v) if t is datetime else t(v)
+            for v, t in zip(values, types)
+        )
+    except (ValueError, TypeError, UnicodeError):
+        raise InvalidCursor("Invalid cursor.")
+
+
+def parse_limit(raw, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    if raw in (None, ""):
+        return default
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise ValueError("limit must be an integer.")
+    if limit < 1:
+        raise ValueError("limit must be positive.")
+    return min(limit, maximum)
+
+
+def parse_fields(raw, allowed):
+    """Parses a `fields=a,b,c` projection; returns all allowed fields when absent."""
+    if not raw:
+        return list(allowed)
+    fields = [f.strip() for f in raw.split(",") if f.strip()]
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import db, ParseCacheEntry
+
+# === Parse Result Cache ===
+# Two tiers: a bounded in-process LRU in front of the parse_cache table, so
+# identical quote emails/PDFs forwarded to several planners (and frontend
+# retries) are answered without another OpenAI round trip.
+
+CACHE_TTL_SECONDS = int(os.environ.get("PARSE_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+CACHE_MAX_ENTRIES = int(os.environ.get("PARSE_CACHE_MAX_ENTRIES", 1024))
+
+_whitespace_re = re.compile(r"[ \t\f\v]+")
+_blank_lines_re = re.compile(r"\n{3,}")
+
+_lock = threading.Lock()
+_memory = OrderedDict()  # key -> (expires_at, JSON-encoded result); decoded per hit so callers get their own copy
+_stats = {"memory_hits": 0, "db_hits": 0, "misses": 0, "bypassed": 0, "stores": 0, "evictions": 0}
+
+
+def normalize_input(text):
+    text = (text or "").replace("\r\n", "\n").replace("\r", "\n")
+    lines = [_whitespace_re.sub(" ", line).strip() for line in text.split("\n")]
+    return _blank_lines_re.sub("\n\n", "\n".join(lines)).strip()
+
+
+def cache_key(kind, text, model, system_prompt, user_prompt_template, temperature, max_tokens):
+    payload = json.dumps(
+        [kind, normalize_input(text), model, system_prompt, user_prompt_template, temperature, max_tokens],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def cache_bypassed(request):
+    # Callers can force a fresh parse with `Cache-Control: no-cache`, `?no_cache=1` or
+    # `"no_cache": true` in a JSON body. The fresh result still replaces whatever was cached.
+    if "no-cache" in (request.headers.get("Cache-Control") or "").lower():
+        return True
+    if request.args.get("no_cache") in ("1", "true"):
+        return True
+    data = request.get_json(silent=True) if request.is_json else None
+    return bool((data or {}).get("no_cache"))
+
+
+def _bump(stat):
+    with _lock:
+        _stats[stat] += 1
+
+
+def record_bypass():
+    _bump("bypassed")
+
+
+def _remember(key, expires_at, encoded):
+    with _lock:
+        _memory[key] = (expires_at, encoded)
+        _memory.move_to_end(key)
+        while len(_memory) > CACHE_MAX_ENTRIES:
+            _memory.popitem(last=False)
+            _stats["evictions"] += 1
+
+
+def get(key):
+    now = datetime.utcnow()
+    with _lock:
+        entry = _memory.get(key)
+        if entry is not None:
+            expires_at, encoded = entry
+            if expires_at > now:
+                _memory.move_to_end(key)
+                _stats["memory_hits"] += 1
+                return json.loads(encoded)
+            del _memory[key]
+
+    try:
+        row = db.session.get(ParseCacheEntry, key)
+    except SQLAlchemyError as e:
+        print("❌ Parse cache lookup failed:", str(e))
+        db.session.rollback()
+        row = None
+
+    if row is not None and row.expires_at > now:
+        _remember(key, row.expires_at, row.result)
+        _bump("db_hits")
+        return json.loads(row.result)
+    if row is not None:
+        _delete_expired_row(key, now)
+
+    _bump("misses")
+    return None
+
+
+def put(key, kind, model, result):
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=CACHE_TTL_SECONDS)
+    encoded = json.dumps(result)
+    _remember(key, expires_at, encoded)
+    _bump("stores")
+
+    try:
+        db.session.merge(ParseCacheEntry(
+            key=key,
+            kind=kind,
+            model=model,
+            result=encoded,
+            created_at=now,
+            expires_at=expires_at
+        ))
+        db.session.commit()
+    except SQLAlchemyError as e:
+        # Another worker may have stored the same key first; the memory tier still has it.
+        print("❌ Parse cache store failed:", str(e))
+        db.session.rollback()
+
+
+def _delete_expired_row(key, now):
+    # Re-checks expires_at so a fresh entry another worker just stored survives.
+    try:
+        ParseCacheEntry.query.filter(
+            ParseCacheEntry.key == key, ParseCacheEntry.expires_at <= now
+        ).delete(synchronize_session=False)
+        db.session.commit()
+    except SQLAlchemyError as e:
+        print("❌ Parse cache cleanup failed:", str(e))
+        db.session.rollback()
+
+
+def purge_expired():
+    deleted = ParseCacheEntry.query.filter(ParseCacheEntry.expires_at <= datetime.utcnow()).delete()
+    db.session.commit()
+    return deleted
+
+
+@click.command("purge-parse-cache")
+@with_appcontext
+def purge_parse_cache_command():
+    """Delete expired parse cache rows (entries nobody looked up again)."""
+    deleted = purge_expired()
+    click.echo(f"✅ Purged {deleted} expired parse cache entries.")
+
+
+def stats():
+    with _lock:
+        snapshot = dict(_stats)
+        snapshot["memory_entries"] = len(_memory)
+    lookups = snapshot["memory_hits"] + snapshot["db_hits"] + snapshot["misses"]
+    snapshot["hit_rate"] = round((snapshot["memory_hits"] + snapshot["db_hits"]) / lookups, 4) if lookups else 0.0
+    snapshot["max_entries"] = CACHE_MAX_ENTRIES
+    snapshot["ttl_seconds"] = CACHE_TTL_SECONDS
+    return snapshot
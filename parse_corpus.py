@@ -0,0 +1,143 @@
+import atexit
+import fcntl
+import json
+import os
+import queue
+import random
+import threading
+from datetime import datetime
+
+# === Parse Corpus ===
+# Failed parses (and an optional sample of successful ones) are appended as
+# JSONL records for replay_parses.py. The request thread only does a
+# non-blocking queue put. A single writer thread batches records, flushes
+# once per batch and rotates the file by size (parse_corpus.jsonl.1, .2, ...).
+# Every gunicorn worker has its own writer on the same file, so the size check,
+# rotation and append happen under an exclusive flock on <path>.lock.
+# When the queue is full, records are dropped and counted rather than
+# slowing down requests.
+
+PARSE_CORPUS_PATH = os.environ.get("PARSE_CORPUS_PATH", "logs/parse_corpus.jsonl")
+PARSE_CORPUS_SAMPLE_RATE = float(os.environ.get("PARSE_CORPUS_SAMPLE_RATE", 0.0))
+PARSE_CORPUS_MAX_BYTES = int(os.environ.get("PARSE_CORPUS_MAX_BYTES", 10 * 1024 * 1024))
+PARSE_CORPUS_BACKUPS = int(os.environ.get("PARSE_CORPUS_BACKUPS", 5))
+PARSE_CORPUS_QUEUE_SIZE = int(os.environ.get("PARSE_CORPUS_QUEUE_SIZE", 10000))
+PARSE_CORPUS_FLUSH_SECONDS = float(os.environ.get("PARSE_CORPUS_FLUSH_SECONDS", 1.0))
+
+_queue = queue.Queue(maxsize=PARSE_CORPUS_QUEUE_SIZE)
+_lock = threading.Lock()
+_writer = None
+_stats = {"written": 0, "dropped": 0, "rotations": 0}
+
+
+def record(kind, event, input_text, tier=None, result=None, error=None, confidence=None):
+    """Queues one corpus record; event is 'failure' or 'sample'."""
+    entry = {
+        "ts": datetime.utcnow().isoformat(),
+        "kind": kind,
+        "event": event,
+        "tier": tier,
+        "input": input_text,
+        "result": result,
+        "error": error,
+        "confidence": confidence
+    }
+    _ensure_writer()
+    try:
+        _queue.put_nowait(entry)
+    except queue.Full:
+        with _lock:
+            _stats["dropped"] += 1
+
+
+def maybe_sample(kind, input_text, tier, result, confidence=None):
+    if PARSE_CORPUS_SAMPLE_RATE > 0 and random.random() < PARSE_CORPUS_SAMPLE_RATE:
+        record(kind, "sample", input_text, tier=tier, result=result, confidence=confidence)
+
+
+def stats():
+    with _lock:
+        snapshot = dict(_stats)
+    snapshot["queued"] = _queue.qsize()
+    return snapshot
+
+
+def _ensure_writer():
+    global _writer
+    if _writer is not None:
+        return
+    with _lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_write_loop, name="parse-corpus", daemon=True)
+            _writer.start()
+
+
+def _rotate():
+    for i in range(PARSE_CORPUS_BACKUPS - 1, 0, -1):
+        src = f"{PARSE_CORPUS_PATH}.{i}"
+        if os.path.exists(src):
+            os.replace(src, f"{PARSE_CORPUS_PATH}.{i + 1}")
+    if PARSE_CORPUS_BACKUPS > 0:
+        os.replace(PARSE_CORPUS_PATH, f"{PARSE_CORPUS_PATH}.1")
+    else:
+        os.remove(PARSE_CORPUS_PATH)
+    with _lock:
+        _stats["rotations"] += 1
+
+
+def _write_batch(batch):
+    directory = os.path.dirname(PARSE_CORPUS_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    lines = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in batch)
+    with open(f"{PARSE_CORPUS_PATH}.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)  # released when the lock file is closed
+        if os.path.exists(PARSE_CORPUS_PATH) and os.path.getsize(PARSE_CORPUS_PATH) >= PARSE_CORPUS_MAX_BYTES:
+            _rotate()
+        with open(PARSE_CORPUS_PATH, "a", encoding="utf-8") as f:
+            f.write(lines)
+    with _lock:
+        _stats["written"] += len(batch)
+
+
+def _drain(first):
+    batch = [first]
+    while len(batch) < 500:
+        try:
+            batch.append(_queue.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+
+def _write_loop():
+    while True:
+        try:
+            first = _queue.get(timeout=PARSE_CORPUS_FLUSH_SECONDS)
+        except queue.Empty:
+            continue
+        batch = _drain(first)
+        try:
+            _write_batch(batch)
+        except Exception as e:
+            print("❌ Failed to write parse corpus:", str(e))
+        finally:
+            for _ in batch:
+                _queue.task_done()
+
+
+def flush(timeout=5.0):
+    """Blocks until queued records are on disk (or timeout); used at shutdown."""
+    if _writer is None:
+        return
+    done = threading.Event()
+
+    def wait():
+        _queue.join()
+        done.set()
+
+    threading.Thread(target=wait, daemon=True).start()
+    done.wait(timeout)
+
+
+atexit.register(flush)
@@ -0,0 +1,52 @@
+import json
+import re
+
+from models import TripPartner, QuoteShare
+
+# === Partner / Share Email Helpers ===
+# WingTrip.partner_emails and Quote.shared_with_emails are kept for existing
+# readers, but lookups go through the indexed trip_partners / quote_shares rows
+# built here, so "shared with me" is an index seek on an exact address.
+
+_email_split_re = re.compile(r"[,;\s]+")
+
+
+def normalize_email(email):
+    return (email or "").strip().lower()
+
+
+def split_emails(raw):
+    """Parses a free-form or JSON-encoded email list into unique, lowercased addresses."""
+    if isinstance(raw, str):
+        stripped = raw.strip()
+        if stripped.startswith("["):
+            try:
+                raw = json.loads(stripped)
+            except ValueError:
+                pass
+    items = raw if isinstance(raw, list) else _email_split_re.split(raw or "")
+
+    emails = []
+    for item in items:
+        email = normalize_email(item if isinstance(item, str) else "")
+        if "@" in email and email not in emails:
+            emails.append(email)
+    return emails
+
+
+def trip_partner_rows(trip_id, partner_emails, partner_names=None):
+    names = partner_names if isinstance(partner_names, list) else []
+    rows = []
+    seen = set()
+    for i, raw_email in enumerate(partner_emails if isinstance(partner_emails, list) else []):
+        email = normalize_email(raw_email if isinstance(raw_email, str) else "")
+        if "@" not in email or email in seen:
+            continue
+        seen.add(email)
+        name = names[i] if i < len(names) and isinstance(names[i], str) else None
+        rows.append(TripPartner(trip_id=trip_id, email=email, name=name))
+    return rows
+
+
+def quote_share_rows(quote_id, shared_with_emails):
+    return [QuoteShare(quote_id=quote_id, email=email) for email in split_emails(shared_with_emails)]
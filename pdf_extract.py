@@ -0,0 +1,199 @@
+import base64
+import binascii
+import hashlib
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import Future, InvalidStateError, TimeoutError
+
+# === PDF Upload Spooling & Off-Thread Text Extraction ===
+# Uploads are streamed to a temp file instead of being held in memory, and
+# pdfplumber runs in a small process pool so a large brochure doesn't pin the
+# request thread (or the GIL) for seconds. An extraction that overruns its
+# timeout terminates the pool (multiprocessing.Pool.terminate() stops running
+# tasks, which Future.cancel() can't); the next call starts a fresh one. This
+# module is imported by the pool workers, so keep it free of Flask/app imports.
+
+PDF_MAX_BYTES = int(os.environ.get("PDF_MAX_BYTES", 25 * 1024 * 1024))
+PDF_MAX_PAGES = int(os.environ.get("PDF_MAX_PAGES", 30))
+PDF_MAX_TEXT_CHARS = int(os.environ.get("PDF_MAX_TEXT_CHARS", 40000))
+PDF_EXTRACT_WORKERS = int(os.environ.get("PDF_EXTRACT_WORKERS", 2))
+PDF_EXTRACT_TIMEOUT_SECONDS = float(os.environ.get("PDF_EXTRACT_TIMEOUT_SECONDS", 30))
+
+CHUNK_SIZE = 1024 * 1024
+PAGE_BREAK = "\f"  # between pages in extract_text() output, so repeated headers/footers can be found
+
+
+class PdfTooLarge(ValueError):
+    pass
+
+
+class PdfExtractionAborted(RuntimeError):
+    pass
+
+
+_pool = None
+_pending = {}  # Future -> the pool running it
+_pool_lock = threading.Lock()
+
+
+def _submit(path, max_pages, max_chars):
+    global _pool
+    future = Future()
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: gunicorn workers are threaded and forking them mid-request is unsafe.
+            _pool = multiprocessing.get_context("spawn").Pool(processes=PDF_EXTRACT_WORKERS)
+        pool = _pool
+        _pending[future] = pool
+        pool.apply_async(
+            _extract_pages, (path, max_pages, max_chars),
+            callback=lambda text: _settle(future, result=text),
+            error_callback=lambda error: _settle(future, error=error)
+        )
+    return pool, future
+
+
+def _settle(future, result=None, error=None):
+    # Runs on the pool's result thread.
+    with _pool_lock:
+        _pending.pop(future, None)
+    try:
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass  # already aborted by _reset_pool()
+
+
+def shutdown(wait=True):
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+        if wait:
+            pool.join()
+        else:
+            pool.terminate()
+
+
+def _reset_pool(pool):
+    """Terminates `pool`, failing its other in-flight extractions; the next call starts a fresh pool."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+        aborted = [future for future, owner in _pending.items() if owner is pool]
+        for future in aborted:
+            del _pending[future]
+    pool.terminate()
+    for future in aborted:
+        try:
+            future.set_exception(PdfExtractionAborted("PDF extraction was interrupted; please retry."))
+        except InvalidStateError:
+            pass
+
+
+def _new_spool_file():
+    return tempfile.NamedTemporaryFile(prefix="wingstack-quote-", suffix=".pdf", delete=False)
+
+
+def _copy_capped(src, dst, max_bytes):
+    total = 0
+    while True:
+        chunk = src.read(CHUNK_SIZE)
+        if not chunk:
+            return total
+        total += len(chunk)
+        if total > max_bytes:
+            raise PdfTooLarge(f"PDF exceeds the {max_bytes} byte upload limit.")
+        dst.write(chunk)
+
+
+def spool_stream(stream, max_bytes=PDF_MAX_BYTES):
+    """Copies a file-like upload to a temp file and returns its path, or None if it was empty."""
+    spool = _new_spool_file()
+    try:
+        with spool:
+            written = _copy_capped(stream, spool, max_bytes)
+    except Exception:
+        os.unlink(spool.name)
+        raise
+    if not written:
+        os.unlink(spool.name)
+        return None
+    return spool.name
+
+
+def spool_base64(b64pdf, max_bytes=PDF_MAX_BYTES):
+    # Legacy JSON contract: {"base64_pdf": "..."}. Decoded size is ~3/4 of the encoded length.
+    if len(b64pdf) * 3 // 4 > max_bytes:
+        raise PdfTooLarge(f"PDF exceeds the {max_bytes} byte upload limit.")
+    try:
+        pdf_bytes = base64.b64decode(b64pdf)
+    except (binascii.Error, ValueError):
+        raise ValueError("Invalid base64 PDF content.")
+    if not pdf_bytes:
+        return None
+
+    spool = _new_spool_file()
+    with spool:
+        spool.write(pdf_bytes)
+    return spool.name
+
+
+def spool_upload(request, max_bytes=PDF_MAX_BYTES):
+    """Spools a multipart (`file` field), raw (application/pdf) or base64 JSON upload to disk."""
+    if request.content_length and request.content_length > max_bytes * 4 // 3 + CHUNK_SIZE:
+        raise PdfTooLarge(f"PDF exceeds the {max_bytes} byte upload limit.")
+
+    if request.mimetype == "multipart/form-data":
+        upload = request.files.get("file")
+        return spool_stream(upload.stream, max_bytes) if upload else None
+
+    if request.mimetype in ("application/pdf", "application/octet-stream"):
+        return spool_stream(request.stream, max_bytes)
+
+    data = request.get_json(silent=True) or {}
+    b64pdf = (data.get("base64_pdf") or "").strip()
+    return spool_base64(b64pdf, max_bytes) if b64pdf else None
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _extract_pages(path, max_pages, max_chars):
+    # Runs inside a pool worker.
+    import pdfplumber
+
+    parts = []
+    collected = 0
+    with pdfplumber.open(path) as pdf:
+        for page in pdf.pages[:max_pages]:
+            text = page.extract_text() or ""
+            page.close()
+            parts.append(text)
+            collected += len(text)
+            if collected >= max_chars:
+                break
+    return PAGE_BREAK.join(parts)[:max_chars]
+
+
+def extract_text(path, max_pages=PDF_MAX_PAGES, max_chars=PDF_MAX_TEXT_CHARS,
+                 timeout=PDF_EXTRACT_TIMEOUT_SECONDS):
+    # A worker that dies mid-task (e.g. OOM-killed) is replaced by the pool but its
+    # task never completes, so that also ends up here as a timeout.
+    pool, future = _submit(path, max_pages, max_chars)
+    try:
+        return future.result(timeout=timeout)
+    except TimeoutError:
+        _reset_pool(pool)
+        raise TimeoutError(f"PDF text extraction took longer than {timeout:g}s.")
@@ -0,0 +1,83 @@
+import re
+
+from trip_parser import BUDGET_MULTIPLIERS
+
+# === Quote Price Normalization ===
+# Quote.price stays the broker's free text ("$23,000", "23k", "23000 USD",
+# "EUR 18.5k + tax", "23.000 €"); price_amount/price_currency hold the parsed
+# value so quotes can be filtered, sorted and aggregated in SQL. Text with no
+# number, or an amount too large for the Numeric(12, 2) columns, parses to
+# (None, None) and sorts after priced quotes.
+#
+# Thousands may be grouped with ",", "." or a space ("23,000", "23.000",
+# "23 000"); a single separator followed by 1-2 digits is a decimal point
+# ("23,50 €"), and so is one before a k/m suffix ("1,5m", "18.5k").
+
+DEFAULT_CURRENCY = "USD"
+CURRENCY_SYMBOLS = {"$": "USD", "€": "EUR", "£": "GBP"}
+CURRENCY_CODES = ("USD", "EUR", "GBP", "CAD", "CHF", "AUD", "MXN")
+MAX_AMOUNT = 10 ** 10  # Numeric(12, 2)
+
+AMOUNT_RE = re.compile(
+    r"(?P<amount>\d{1,3}(?:,\d{3})+(?:\.\d+)?"
+    r"|\d{1,3}(?:\.\d{3})+(?:,\d+)?"
+    r"|\d{1,3}(?: \d{3})+(?:[.,]\d+)?"
+    r"|\d+(?:[.,]\d+)?)"
+    r"\s*(?P<suffix>k|m|thousand|million)?\b",
+    re.IGNORECASE
+)
+SEPARATOR_RE = re.compile(r"[., ]")
+CURRENCY_CODE_RE = re.compile(r"\b(" + "|".join(CURRENCY_CODES) + r")\b", re.IGNORECASE)
+
+
+def _looks_like_money(text, match):
+    before = text[:match.start()].rstrip().upper()
+    after = text[match.end():].lstrip().upper()
+    return bool(
+        match.group("suffix")
+        or (before and before[-1] in CURRENCY_SYMBOLS)
+        or before.endswith(CURRENCY_CODES)
+        or after.startswith(CURRENCY_CODES)
+    )
+
+
+def _number(match):
+    amount = match.group("amount")
+    separators = SEPARATOR_RE.findall(amount)
+    if len(separators) == 1 and separators[0] != " " and match.group("suffix"):
+        return float(amount.replace(",", "."))  # "1,5m", "1.250k"
+    if separators and separators[-1] != " " and len(amount) - amount.rindex(separators[-1]) - 1 != 3:
+        # The last separator is the decimal point; anything before it groups thousands.
+        whole, fraction = amount[:amount.rindex(separators[-1])], amount[amount.rindex(separators[-1]) + 1:]
+        return float(SEPARATOR_RE.sub("", whole) + "." + fraction)
+    return float(SEPARATOR_RE.sub("", amount))
+
+
+def parse_price(raw):
+    """Returns (amount, currency) for the amount in `raw`, or (None, None).
+
+    An amount next to a currency marker or with a k/m suffix wins over bare
+    numbers ("Citation XLS 2018, $23,000" is 23000); otherwise the largest
+    number is taken.
+    """
+    if raw is None:
+        return None, None
+    text = str(raw).strip()
+    matches = list(AMOUNT_RE.finditer(text))
+    if not matches:
+        return None, None
+    match = next((m for m in matches if _looks_like_money(text, m)), None)
+    if match is None:
+        match = max(matches, key=_number)
+
+    suffix = (match.group("suffix") or "").lower()
+    amount = round(_number(match) * BUDGET_MULTIPLIERS.get(suffix, 1), 2)
+    if amount >= MAX_AMOUNT:
+        return None, None
+
+    code = CURRENCY_CODE_RE.search(text)
+    if code:
+        currency = code.group(1).upper()
+    else:
+        currency = next((c for symbol, c in CURRENCY_SYMBOLS.items() if symbol in text), DEFAULT_CURRENCY)
+    return amount, currency
@@ -0,0 +1,240 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+
+import prices
+from models import db, QuoteTemplate
+
+# === Broker Quote Templates ===
+# Most quotes come from a couple dozen brokers whose emails and PDFs use the
+# same layout every time. A layout is fingerprinted by the ordered sequence of
+# "Label: value" labels in the text (digits masked, repeated rows collapsed).
+# When GPT-4 parses a document, the field -> label mapping implied by its
+# answer is stored for that fingerprint. Once the same mapping has been seen
+# TEMPLATE_MIN_CONFIRMATIONS times, later documents with the fingerprint are
+# extracted from their labels directly, without calling OpenAI.
+#
+# Fields the document doesn't label are handled in one of two ways:
+# - Text present in every document of the layout (e.g. the broker name in the
+#   letterhead) is kept as a constant.
+# - Category, which the LLM infers from the aircraft, is looked up by aircraft.
+#   An aircraft the template hasn't seen yet sends the document to the LLM,
+#   which extends the lookup.
+# Any other field that can't be read this way makes the layout unlearnable, so
+# those documents always go to the LLM.
+
+TEMPLATE_MIN_LABELS = int(os.environ.get("TEMPLATE_MIN_LABELS", 3))
+TEMPLATE_MIN_CONFIRMATIONS = int(os.environ.get("TEMPLATE_MIN_CONFIRMATIONS", 2))
+
+QUOTE_FIELDS = ("aircraft", "price", "category", "broker_name", "cancellation_policy",
+                "wifi", "yom", "refurbished_year", "notes")
+LABELLED_FIELDS = ("aircraft", "price")  # must come from a label for a template to be usable
+LOOKUP_FIELDS = ("category",)  # inferred by the LLM from the aircraft, so safe to remember per aircraft
+
+LABEL_RE = re.compile(r"^\s*([A-Za-z][A-Za-z0-9 /&().#'-]{0,40}?)\s*:\s*(.*?)\s*$")
+DIGITS_RE = re.compile(r"\d+")
+NON_ALNUM_RE = re.compile(r"[^a-z0-9]")
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "unfingerprinted": 0, "learned": 0, "confirmed": 0, "relearned": 0}
+
+
+def _count(stat):
+    with _lock:
+        _stats[stat] += 1
+
+
+def stats():
+    with _lock:
+        return dict(_stats)
+
+
+def _norm(value):
+    return NON_ALNUM_RE.sub("", str(value or "").lower())
+
+
+def _amount(value):
+    amount, _ = prices.parse_price(value)
+    if amount is None:
+        return None
+    return str(int(amount)) if float(amount).is_integer() else str(amount)
+
+
+TRANSFORMS = {"raw": lambda value: value, "amount": _amount}
+
+
+def labelled_lines(text):
+    """[(label_key, value)] for every 'Label: value' line, in document order."""
+    lines = []
+    for line in (text or "").splitlines():
+        match = LABEL_RE.match(line)
+        if not match or match.group(2).startswith("//"):  # skip URLs
+            continue
+        label = DIGITS_RE.sub("#", " ".join(match.group(1).lower().split()))
+        lines.append((label, match.group(2)))
+    return lines
+
+
+def fingerprint(kind, text, lines=None):
+    lines = labelled_lines(text) if lines is None else lines
+    skeleton = []
+    for label, _ in lines:
+        if not skeleton or skeleton[-1] != label:  # a 3-leg and a 2-leg quote share a layout
+            skeleton.append(label)
+    if len(set(skeleton)) < TEMPLATE_MIN_LABELS:
+        return None
+    return hashlib.sha256("\n".join([kind] + skeleton).encode("utf-8")).hexdigest()
+
+
+def _values(lines):
+    values = {}
+    for label, value in lines:
+        values.setdefault(label, value)
+    return values
+
+
+def derive_mapping(text, lines, parsed):
+    """Field specs that reproduce `parsed` from this document, or None if the layout can't."""
+    values = _values(lines)
+    text_norm = _norm(text)
+    aircraft = None
+    mapping = {}
+    for field in QUOTE_FIELDS:
+        target = str(parsed.get(field) or "").strip()
+        if not target:
+            mapping[field] = {"constant": ""}
+            continue
+        spec = None
+        for label, value in values.items():
+            if field == "price":
+                # Always normalized, so template and LLM results have the same shape.
+                if _amount(value) is not None and _amount(value) == _amount(target):
+                    spec = {"label": label, "transform": "amount"}
+                    break
+            elif value.strip() == target or _norm(value) == _norm(target):
+                spec = {"label": label, "transform": "raw"}
+                break
+        if spec is None and field in LABELLED_FIELDS:
+            return None
+        if spec is None and len(_norm(target)) >= 3 and _norm(target) in text_norm:
+            spec = {"constant": target}
+        if spec is None and field in LOOKUP_FIELDS:
+            spec = {"lookup": {}}
+        if spec is None:
+            # Per-quote details (cancellation terms, wifi, notes) that aren't labelled
+            # can't be read reliably from later documents; leave those to the LLM.
+            return None
+        if field == "aircraft":
+            aircraft = _norm(target)
+        if "lookup" in spec:
+            spec["lookup"][aircraft] = target
+        mapping[field] = spec
+    return mapping
+
+
+def _shape(mapping):
+    return {field: {k: v for k, v in spec.items() if k != "lookup"} for field, spec in mapping.items()}
+
+
+def _merge_lookups(old, new):
+    for field, spec in new.items():
+        if "lookup" in spec:
+            spec["lookup"] = dict(old[field].get("lookup", {}), **spec["lookup"])
+    return new
+
+
+def apply_template(mapping, text, lines):
+    values = _values(lines)
+    text_norm = _norm(text)
+    result = {}
+    for field in QUOTE_FIELDS:
+        spec = mapping.get(field, {"constant": ""})
+        if field == "price" and spec.get("transform") != "amount":
+            return None  # learned before price was always normalized
+        if "label" in spec:
+            value = values.get(spec["label"])
+            if value is None:
+                return None
+            result[field] = TRANSFORMS[spec.get("transform", "raw")](value)
+        elif "constant" in spec:
+            if spec["constant"] and _norm(spec["constant"]) not in text_norm:
+                return None
+            result[field] = spec["constant"]
+        elif field in LOOKUP_FIELDS:
+            value = spec["lookup"].get(_norm(result.get("aircraft")))
+            if value is None:
+                return None
+            result[field] = value
+        else:
+            return None  # per-aircraft lookups of other fields came from older templates
+    if not all(result.get(field) for field in LABELLED_FIELDS):
+        return None
+    return result
+
+
+def extract(kind, text):
+    """Returns the parsed quote for a known, confirmed layout, or None."""
+    lines = labelled_lines(text)
+    digest = fingerprint(kind, text, lines)
+    if digest is None:
+        _count("unfingerprinted")
+        return None
+    template = db.session.get(QuoteTemplate, digest)
+    if template is None or template.confirmations < TEMPLATE_MIN_CONFIRMATIONS:
+        _count("misses")
+        return None
+
+    result = apply_template(json.loads(template.fields), text, lines)
+    if result is None:
+        _count("misses")
+        return None
+
+    QuoteTemplate.query.filter_by(fingerprint=digest).update(
+        {"hits": QuoteTemplate.hits + 1, "last_used_at": datetime.utcnow()},
+        synchronize_session=False
+    )
+    db.session.commit()
+    _count("hits")
+    return result
+
+
+def learn(kind, text, parsed):
+    """Records the mapping implied by an LLM parse of `text`; safe to call on every LLM result."""
+    if not isinstance(parsed, dict):
+        return None
+    lines = labelled_lines(text)
+    digest = fingerprint(kind, text, lines)
+    if digest is None:
+        return None
+    mapping = derive_mapping(text, lines, parsed)
+    if mapping is None:
+        return None
+
+    try:
+        template = db.session.get(QuoteTemplate, digest)
+        if template is None:
+            template = QuoteTemplate(fingerprint=digest, kind=kind, fields=json.dumps(mapping),
+                                     label_count=len(_values(lines)), confirmations=1)
+            db.session.add(template)
+            _count("learned")
+        else:
+            old = json.loads(template.fields)
+            if _shape(old) == _shape(mapping):
+                template.fields = json.dumps(_merge_lookups(old, mapping))
+                template.confirmations += 1
+                _count("confirmed")
+            else:
+                # The layout's labels mean something else than we thought; start over.
+                template.fields = json.dumps(mapping)
+                template.confirmations = 1
+                _count("relearned")
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return None
+    return digest
@@ -0,0 +1,231 @@
+"""Replays a parse corpus through the trip parser tiers.
+
+Reads JSONL records written by parse_corpus.py (failures and samples from
+/parse-trip-input) and runs each input through:
+- deterministic: trip_parser.parse_deterministic (also the regex fallback)
+- llm: the GPT-4 prompt via llm.create_completion, against fake_openai.FakeOpenAI
+  by default or the real client with --live
+- tiered: what /parse-trip-input would do (deterministic when confident, else llm)
+
+For each tier it reports latency percentiles, throughput and field-level
+agreement (legs, passenger_count, budget) with a reference. The reference is the
+record's hand-labelled "expected" result if present, otherwise its stored LLM
+result. With --reference llm, this run's llm output is used instead.
+
+Usage:
+    python replay_parses.py logs/parse_corpus.jsonl* [--tiers deterministic,llm,tiered]
+                            [--repeat 1] [--upstream-latency 0.0] [--live]
+                            [--reference corpus|llm] [--min-agreement 0.9] [--json results.json]
+
+With --min-agreement the run exits with status 1 when any field agreement of
+the deterministic tier falls below the threshold.
+"""
+import argparse
+import json
+import re
+import statistics
+import sys
+import time
+import warnings
+
+TIERS = ("deterministic", "llm", "tiered")
+FIELDS = ("legs", "passenger_count", "budget")
+DIGITS_RE = re.compile(r"\d+")
+
+
+def load_corpus(paths):
+    records = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                entry = json.loads(line)
+                if entry.get("kind", "trip") == "trip" and entry.get("input"):
+                    records.append(entry)
+    return records
+
+
+def corpus_reference(entry):
+    if entry.get("expected"):
+        return entry["expected"]
+    if entry.get("tier") == "llm" and entry.get("result"):
+        return entry["result"]
+    return None
+
+
+def _airport(code):
+    code = (code or "").strip().upper()
+    # KTEB and TEB name the same airport; the LLM tends to answer in ICAO.
+    return code[1:] if len(code) == 4 and code.startswith("K") else code
+
+
+def _date(value):
+    parts = DIGITS_RE.findall(value or "")
+    if len(parts) != 3:
+        return (value or "").strip()
+    month, day, year = (int(p) for p in parts)
+    return f"{month:02d}/{day:02d}/{year + 2000 if year < 100 else year}"
+
+
+def normalize_field(field, result):
+    value = (result or {}).get(field)
+    if field == "legs":
+        return tuple(
+            (_airport(leg.get("from")), _airport(leg.get("to")), _date(leg.get("date")))
+            for leg in value or [] if isinstance(leg, dict)
+        )
+    return "".join(DIGITS_RE.findall(str(value or "")))
+
+
+def make_llm_parser(live, latency, seed):
+    import app
+    import llm
+
+    if not live:
+        import fake_openai
+        llm.set_client(fake_openai.FakeOpenAI(latency=latency, jitter=0.0, seed=seed))
+
+    def parse(text):
+        response = llm.create_completion(
+            "trip",
+            model="gpt-4",
+            messages=[
+                {"role": "system", "content": app.TRIP_SYSTEM_PROMPT},
+                {"role": "user", "content": app.TRIP_USER_PROMPT.format(input_text=text)}
+            ],
+            temperature=0.2,
+            max_tokens=600
+        )
+        parsed = json.loads(response.choices[0].message.content.strip())
+        app.validate_trip_parse(parsed)
+        return parsed
+
+    return parse
+
+
+def timed(fn, text):
+    start = time.perf_counter()
+    try:
+        result, error = fn(text), None
+    except Exception as e:
+        result, error = None, str(e)
+    return result, error, (time.perf_counter() - start) * 1000
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(runs, references):
+    latencies = [r["ms"] for r in runs]
+    total_seconds = sum(latencies) / 1000
+    agreement = {}
+    for field in FIELDS + ("all",):
+        compared = matched = 0
+        for run, reference in zip(runs, references):
+            if reference is None or run["result"] is None:
+                continue
+            compared += 1
+            fields = FIELDS if field == "all" else (field,)
+            if all(normalize_field(f, run["result"]) == normalize_field(f, reference) for f in fields):
+                matched += 1
+        agreement[field] = {"compared": compared, "rate": round(matched / compared, 4) if compared else None}
+    return {
+        "records": len(runs),
+        "errors": sum(1 for r in runs if r["error"]),
+        "throughput_per_s": round(len(runs) / total_seconds, 1) if total_seconds else None,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "mean_ms": round(statistics.fmean(latencies), 3) if latencies else 0.0,
+        "agreement": agreement
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", nargs="+", help="parse_corpus JSONL files (rotated files included)")
+    parser.add_argument("--tiers", default=",".join(TIERS))
+    parser.add_argument("--repeat", type=int, default=1, help="replay the corpus this many times for timing")
+    parser.add_argument("--upstream-latency", type=float, default=0.0)
+    parser.add_argument("--live", action="store_true", help="call OpenAI instead of the local stand-in")
+    parser.add_argument("--reference", choices=("corpus", "llm"), default="corpus")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-agreement", type=float)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore")
+    import trip_parser
+
+    tiers = [t.strip() for t in args.tiers.split(",") if t.strip()]
+    unknown = [t for t in tiers if t not in TIERS]
+    if unknown:
+        parser.error(f"unknown tiers: {', '.join(unknown)}")
+    records = load_corpus(args.corpus)
+    if not records:
+        parser.error("corpus is empty")
+
+    needs_llm = bool({"llm", "tiered"} & set(tiers)) or args.reference == "llm"
+    llm_parse = make_llm_parser(args.live, args.upstream_latency, args.seed) if needs_llm else None
+
+    def deterministic(text):
+        return trip_parser.parse_deterministic(text)
+
+    runs = {tier: [] for tier in tiers}
+    references = []
+    for _ in range(args.repeat):
+        for entry in records:
+            text = entry["input"]
+            det, det_error, det_ms = timed(deterministic, text)
+            det_result, confidence, missing = det if det else (None, 0.0, ["legs"])
+            llm_result = llm_error = None
+            llm_ms = 0.0
+            if llm_parse:
+                llm_result, llm_error, llm_ms = timed(llm_parse, text)
+
+            if "deterministic" in runs:
+                runs["deterministic"].append({"result": det_result, "error": det_error, "ms": det_ms})
+            if "llm" in runs:
+                runs["llm"].append({"result": llm_result, "error": llm_error, "ms": llm_ms})
+            if "tiered" in runs:
+                if det_result is not None and trip_parser.is_confident(confidence, missing):
+                    runs["tiered"].append({"result": det_result, "error": None, "ms": det_ms})
+                else:
+                    # /parse-trip-input falls back to the regex result when the LLM fails.
+                    runs["tiered"].append({"result": llm_result or det_result, "error": None, "ms": det_ms + llm_ms})
+            references.append(llm_result if args.reference == "llm" else corpus_reference(entry))
+
+    results = {"records": len(records), "repeat": args.repeat, "live": args.live, "reference": args.reference,
+               "tiers": {tier: summarize(tier_runs, references) for tier, tier_runs in runs.items()}}
+
+    print(f"{len(records)} records x {args.repeat}, reference: {args.reference}"
+          f"{'' if args.live else ' (llm tier uses the local stand-in)'}\n")
+    print(f"{'tier':<15}{'rec/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}  agreement")
+    for tier, r in results["tiers"].items():
+        agreement = "  ".join(
+            f"{field}={a['rate'] if a['rate'] is not None else '-'}" for field, a in r["agreement"].items()
+        )
+        print(f"{tier:<15}{r['throughput_per_s'] or '-':>10}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}"
+              f"{r['errors']:>8}  {agreement}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.min_agreement is not None and "deterministic" in results["tiers"]:
+        low = [field for field, a in results["tiers"]["deterministic"]["agreement"].items()
+               if a["rate"] is not None and a["rate"] < args.min_agreement]
+        if low:
+            print(f"\ndeterministic agreement below {args.min_agreement}: {', '.join(low)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import hashlib
+import json
+from datetime import datetime
+
+from flask import Response
+
+try:
+    import orjson
+except ImportError:  # optional speedup; falls back to the stdlib encoder
+    orjson = None
+
+# === Fast JSON Responses & Conditional GET ===
+# List endpoints serialize through json_response(), which uses orjson when it
+# is installed. They also compute a weak ETag from cheap count/max(timestamp)
+# queries, so a dashboard poll that changes nothing gets a 304 without the
+# rows being loaded.
+
+
+def dumps(payload):
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def json_response(payload, status=200, headers=None):
+    resp = Response(dumps(payload), status=status, mimetype="application/json")
+    if headers:
+        resp.headers.update(headers)
+    return resp
+
+
+def weak_etag(*parts):
+    encoded = "|".join(p.isoformat() if isinstance(p, datetime) else str(p) for p in parts)
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+
+def not_modified(request, etag, last_modified=None):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified and request.if_modified_since:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+    return False
+
+
+def validators(resp, etag, last_modified=None):
+    resp.set_etag(etag, weak=True)
+    if last_modified:
+        resp.last_modified = last_modified
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+
+def conditional_response(request, etag, last_modified, build_payload, headers=None):
+    """Answers 304 when the client's validators still match, otherwise serializes build_payload()."""
+    if not_modified(request, etag, last_modified):
+        return validators(Response(status=304), etag, last_modified)
+    return validators(json_response(build_payload(), headers=headers), etag, last_modified)
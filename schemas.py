@@ -43,6 +43,28 @@ class TripInput(BaseModel):
         except ValueError:
             raise ValueError("Departure date must be in MM/DD/YYYY format")
 
+class TripUpdateInput(BaseModel):
+    route: Optional[str] = None
+    departure_date: Optional[str] = None
+    passenger_count: Optional[str] = None
+    budget: Optional[str] = None
+    status: Optional[str] = None
+
+    @validator("departure_date")
+    def validate_departure_date(cls, v):
+        if v is None:
+            return v
+        try:
+            datetime.strptime(v, "%m/%d/%Y")
+            return v
+        except ValueError:
+            raise ValueError("Departure date must be in MM/DD/YYYY format")
+
+    @validator("passenger_count", "budget", pre=True)
+    def numbers_as_text(cls, v):
+        # Stored as entered; clients send these as numbers or strings.
+        return str(v) if isinstance(v, (int, float)) and not isinstance(v, bool) else v
+
 class QuoteInput(BaseModel):
     trip_id: str
     broker_name: str
@@ -0,0 +1,193 @@
+import os
+import re
+
+from sqlalchemy import Double, and_, cast, column, func, inspect, literal, literal_column, or_, select, table, text, union_all
+
+from models import db, Chat, Message, Quote, QuoteShare, TripPartner, WingTrip
+import partners
+
+# === Full-Text Search ===
+# GET /search ranks chat messages, quotes (aircraft, operator, notes) and trip
+# routes against a query. The index depends on the database:
+# - Postgres: GIN indexes on to_tsvector() expressions. Postgres keeps them
+#   current on every write, and queries repeat the exact expression so the
+#   planner uses them. Ranked with ts_rank.
+# - SQLite (local runs, benchmarks): external-content FTS5 tables kept in sync
+#   by insert/update/delete triggers on the source tables. Ranked with bm25.
+# install() creates whichever applies and is called from run_migrations().
+# Every query term must match, and results are limited to what `email` can
+# see: messages and routes of trips they plan or are a partner on, and quotes
+# on trips they plan, quotes they submitted or that were shared with them (the
+# same rule as /quotes/by-email; a partner broker doesn't see other brokers'
+# quotes on a shared trip).
+
+SEARCH_LANGUAGE = os.environ.get("SEARCH_LANGUAGE", "english")
+SEARCH_MAX_TERMS = 16
+SEARCH_TEXT_CHARS = 240
+
+DOC_TYPES = ("message", "quote", "trip")
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+if not re.fullmatch(r"[a-z_]+", SEARCH_LANGUAGE):
+    raise ValueError("SEARCH_LANGUAGE must be a Postgres text search configuration name.")
+
+# Document text per type, as SQL over the source table. The Postgres index
+# expressions and the queries are both built from these strings, so they match.
+PG_DOCUMENTS = {
+    "message": ("messages", "content"),
+    "quote": ("quotes", "coalesce(aircraft_type, '') || ' ' || coalesce(operator_name, '') || ' ' || coalesce(notes, '')"),
+    "trip": ("wingtrips", "route"),
+}
+
+FTS_TABLES = {
+    "message": ("messages_fts", "messages", ("content",)),
+    "quote": ("quotes_fts", "quotes", ("aircraft_type", "operator_name", "notes")),
+    "trip": ("wingtrips_fts", "wingtrips", ("route",)),
+}
+
+
+def query_terms(q):
+    return WORD_RE.findall((q or "").lower())[:SEARCH_MAX_TERMS]
+
+
+def _pg_vector_sql(doc_type):
+    return f"to_tsvector('{SEARCH_LANGUAGE}'::regconfig, {PG_DOCUMENTS[doc_type][1]})"
+
+
+def _install_postgres(conn):
+    created = []
+    existing = {ix["name"] for name, _ in PG_DOCUMENTS.values() for ix in inspect(conn).get_indexes(name)}
+    for doc_type, (table_name, _) in PG_DOCUMENTS.items():
+        name = f"ix_{table_name}_search"
+        if name not in existing:
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table_name} USING GIN ({_pg_vector_sql(doc_type)})"))
+            created.append(name)
+    return created
+
+
+def _install_sqlite(conn):
+    created = []
+    for fts, table_name, columns in FTS_TABLES.values():
+        exists = conn.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                              {"name": fts}).first()
+        if exists:
+            continue
+        cols = ", ".join(columns)
+        new_values = ", ".join(f"new.{c}" for c in columns)
+        old_values = ", ".join(f"old.{c}" for c in columns)
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE {fts} USING fts5({cols}, content='{table_name}', content_rowid='rowid', "
+            f"tokenize='porter unicode61')"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table_name} BEGIN "
+            f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.rowid, {new_values}); END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table_name} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.rowid, {old_values}); END"
+        ))
+        # Only edits to indexed columns touch the index; status changes don't.
+        conn.execute(text(
+            f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {cols} ON {table_name} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.rowid, {old_values}); "
+            f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.rowid, {new_values}); END"
+        ))
+        conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+        created.append(fts)
+    return created
+
+
+def install():
+    """Creates the search index for the current database; returns the names created."""
+    with db.engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            return _install_postgres(conn)
+        if conn.dialect.name == "sqlite":
+            return _install_sqlite(conn)
+    return []
+
+
+def _match(doc_type, source, terms, dialect):
+    """(where clause, rank expression, FROM clause) for one document type."""
+    if dialect == "postgresql":
+        tsquery = func.plainto_tsquery(literal_column(f"'{SEARCH_LANGUAGE}'::regconfig"), " ".join(terms))
+        vector = literal_column(_pg_vector_sql(doc_type))
+        # ts_rank is real; as double precision the value in the cursor compares equal
+        # to the row it came from, so tie-breaks on the next page don't skip or repeat rows.
+        return vector.op("@@")(tsquery), cast(func.ts_rank(vector, tsquery), Double), source
+
+    fts_name, table_name, _ = FTS_TABLES[doc_type]
+    fts = table(fts_name, column("rowid"))
+    # Quoted terms keep FTS5 operators in user input from being interpreted.
+    fts_query = " ".join(f'"{t}"' for t in terms)
+    from_clause = fts.join(source, literal_column(f"{table_name}.rowid") == fts.c.rowid)
+    fts_ref = literal_column(fts_name)
+    return fts_ref.op("MATCH")(fts_query), -func.bm25(fts_ref), from_clause
+
+
+def _planned_trip_ids(email):
+    return select(WingTrip.id).where(WingTrip.planner_email == email)
+
+
+def _visible_trip_ids(email):
+    return select(WingTrip.id).where(WingTrip.planner_email == email).union(
+        select(TripPartner.trip_id).where(TripPartner.email == partners.normalize_email(email))
+    )
+
+
+def _branch(doc_type, terms, email, dialect):
+    source = {"message": Message, "quote": Quote, "trip": WingTrip}[doc_type].__table__
+    where, rank, from_clause = _match(doc_type, source, terms, dialect)
+    visible = _visible_trip_ids(email)
+    if doc_type == "message":
+        query = select(
+            literal("message").label("doc_type"), Message.id.label("doc_id"), Chat.trip_id.label("trip_id"),
+            Message.content.label("body"), rank.label("rank"), Message.timestamp.label("at")
+        ).select_from(from_clause).join(Chat, Chat.id == Message.chat_id).where(Chat.trip_id.in_(visible))
+    elif doc_type == "quote":
+        shared = select(QuoteShare.quote_id).where(QuoteShare.email == partners.normalize_email(email))
+        body = Quote.aircraft_type + " · " + Quote.operator_name + " · " + func.coalesce(Quote.notes, "")
+        query = select(
+            literal("quote").label("doc_type"), Quote.id.label("doc_id"), Quote.trip_id.label("trip_id"),
+            body.label("body"), rank.label("rank"), Quote.created_at.label("at")
+        ).select_from(from_clause).where(
+            or_(Quote.trip_id.in_(_planned_trip_ids(email)), Quote.submitted_by_email == email, Quote.id.in_(shared))
+        )
+    else:
+        query = select(
+            literal("trip").label("doc_type"), WingTrip.id.label("doc_id"), WingTrip.id.label("trip_id"),
+            WingTrip.route.label("body"), rank.label("rank"), WingTrip.created_at.label("at")
+        ).select_from(from_clause).where(WingTrip.id.in_(visible))
+    return query.where(where)
+
+
+def search(q, email, doc_types=DOC_TYPES, limit=20, after=None):
+    """Returns up to `limit` + 1 rows, best first; `after` is the (rank, doc_type, doc_id) of the last row served."""
+    terms = query_terms(q)
+    if not terms:
+        return []
+    dialect = db.engine.dialect.name
+    ranked = union_all(*[_branch(t, terms, email, dialect) for t in doc_types]).subquery()
+    query = select(ranked)
+    if after:
+        rank, doc_type, doc_id = after
+        query = query.where(or_(
+            ranked.c.rank < rank,
+            and_(ranked.c.rank == rank, ranked.c.doc_type > doc_type),
+            and_(ranked.c.rank == rank, ranked.c.doc_type == doc_type, ranked.c.doc_id > doc_id)
+        ))
+    query = query.order_by(ranked.c.rank.desc(), ranked.c.doc_type, ranked.c.doc_id).limit(limit + 1)
+    return db.session.execute(query).all()
+
+
+def serialize_result(row):
+    body = row.body or ""
+    return {
+        "type": row.doc_type,
+        "id": row.doc_id,
+        "trip_id": row.trip_id,
+        "text": body if len(body) <= SEARCH_TEXT_CHARS else body[:SEARCH_TEXT_CHARS - 1].rstrip() + "…",
+        "rank": float(row.rank),
+        "timestamp": row.at.isoformat() if row.at else None
+    }
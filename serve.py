@@ -0,0 +1,24 @@
+"""Production entry point: optionally migrates the database, then execs gunicorn.
+
+    python serve.py            # serve with gunicorn.conf.py
+    python serve.py --migrate  # run `init-db` first (used by railway.json)
+"""
+import os
+import sys
+
+
+def main():
+    if "--migrate" in sys.argv[1:]:
+        import migrations
+        from app import create_app
+
+        app = create_app()
+        with app.app_context():
+            migrations.run_migrations()
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    os.execvp("gunicorn", ["gunicorn", "-c", os.path.join(here, "gunicorn.conf.py"), "wsgi:app"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import importlib.util
+import multiprocessing
+import os
+
+# === Production Serving Settings ===
+# Shared by gunicorn.conf.py (worker class/count) and create_app() (SQLAlchemy
+# pool), so each worker's connection pool matches the requests it can actually
+# run concurrently.
+#
+# WORKER_MODE:
+#   sync      one request per worker process
+#   threaded  gthread workers; default, good for OpenAI-bound routes with no extra dependency
+#   gevent    cooperative workers for many concurrent long-polls/SSE streams (needs gevent installed)
+
+WORKER_MODES = ("sync", "threaded", "gevent")
+WORKER_CLASSES = {"sync": "sync", "threaded": "gthread", "gevent": "gevent"}
+
+
+def worker_mode():
+    mode = os.environ.get("WORKER_MODE", "threaded").lower()
+    if mode not in WORKER_MODES:
+        raise ValueError(f"WORKER_MODE must be one of {', '.join(WORKER_MODES)}")
+    if mode == "gevent" and importlib.util.find_spec("gevent") is None:
+        print("❌ WORKER_MODE=gevent but gevent is not installed; using threaded workers.")
+        return "threaded"
+    return mode
+
+
+def worker_count():
+    default = min(multiprocessing.cpu_count() * 2 + 1, 8)
+    return int(os.environ.get("WEB_CONCURRENCY", default))
+
+
+def threads_per_worker():
+    return int(os.environ.get("GUNICORN_THREADS", 8))
+
+
+def worker_connections():
+    return int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 200))
+
+
+def batch_parse_concurrency():
+    # Threads one /parse-*/batch request fans out to (see app.run_batch).
+    return int(os.environ.get("BATCH_PARSE_CONCURRENCY", 8))
+
+
+def requests_per_worker(mode=None):
+    mode = mode or worker_mode()
+    if mode == "sync":
+        return 1
+    if mode == "threaded":
+        return threads_per_worker()
+    return worker_connections()
+
+
+def engine_options(database_uri):
+    """SQLAlchemy engine options for this worker, or {} for SQLite (which manages its own pool)."""
+    if not database_uri or database_uri.startswith("sqlite"):
+        return {}
+
+    # Each in-flight request needs at most one connection, and so does each AI job thread
+    # and each thread of a batch parse (they only hold one around cache/template lookups,
+    # not during the OpenAI call). gevent workers can hold hundreds of mostly-idle
+    # requests, so their pool is capped and the rest queue for a connection.
+    import jobs
+
+    wanted = min(requests_per_worker(), int(os.environ.get("DB_POOL_MAX_PER_WORKER", 20)))
+    wanted += jobs.AI_JOB_WORKERS + batch_parse_concurrency()
+    max_connections = os.environ.get("DB_MAX_CONNECTIONS")
+    if max_connections:
+        wanted = min(wanted, max(2, int(max_connections) // worker_count()))
+
+    return {
+        "pool_size": wanted,
+        "max_overflow": int(os.environ.get("DB_POOL_MAX_OVERFLOW", 2)),
+        "pool_timeout": float(os.environ.get("DB_POOL_TIMEOUT_SECONDS", 10)),
+        "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE_SECONDS", 1800)),
+        "pool_pre_ping": True
+    }
+
+
+def shutdown_background_work(wait=True):
+    # Called from gunicorn worker exit hooks so queued AI jobs and PDF extraction
+    # finish (or are cancelled) before the process goes away.
+    import jobs
+    import parse_corpus
+    import pdf_extract
+
+    jobs.shutdown(wait=wait)
+    pdf_extract.shutdown(wait=wait)
+    parse_corpus.flush()
@@ -0,0 +1,46 @@
+import os
+import sys
+import warnings
+
+import pytest
+
+# The app is a set of top-level modules, not a package.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ARCHIVE_INTERVAL_SECONDS", "0")
+os.environ.setdefault("AI_AUTH_TOKEN", "test-ai-key")
+
+
+@pytest.fixture
+def app(tmp_path):
+    warnings.filterwarnings("ignore", category=DeprecationWarning)
+    from app import create_app
+    import migrations
+    from models import db
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'wingstack.db'}", "TESTING": True})
+    with app.app_context():
+        migrations.run_migrations()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def ai_headers():
+    return {"X-Wingstack-AI-Key": os.environ["AI_AUTH_TOKEN"]}
+
+
+@pytest.fixture
+def trip_payload():
+    return {
+        "route": "TEB-OAK", "departure_date": "06/20/2025", "passenger_count": 5, "budget": "$50k",
+        "planner_name": "Pat", "planner_email": "pat@example.com",
+        "partner_names": ["B1"], "partner_emails": ["b1@example.com"], "status": "pending",
+        "legs": [{"from": "TEB", "to": "OAK", "date": "06/20/2025", "time": "09:30"}]
+    }
@@ -0,0 +1,53 @@
+import pytest
+
+import archive
+from models import db, ARCHIVE_TABLES, Chat, Message, Quote, TripLeg, WingTrip
+
+
+@pytest.fixture
+def deleted_trip(client, trip_payload):
+    trip_id = client.post("/trips", json=trip_payload).get_json()["id"]
+    client.post("/submit-quote", json={"trip_id": trip_id, "broker_name": "B1", "operator_name": "Ops",
+                                       "aircraft_type": "G450", "price": "$48,000"})
+    chat_id = client.delete(f"/trips/{trip_id}").get_json()["chat_id"]
+    client.post("/messages", json={"chat_id": chat_id, "sender_email": "pat@example.com", "content": "hello"})
+    return trip_id, chat_id
+
+
+def hot_counts(trip_id, chat_id):
+    return (WingTrip.query.filter_by(id=trip_id).count(), TripLeg.query.filter_by(trip_id=trip_id).count(),
+            Quote.query.filter_by(trip_id=trip_id).count(), Message.query.filter_by(chat_id=chat_id).count())
+
+
+def test_archive_then_restore_round_trips_every_row(app, client, deleted_trip):
+    trip_id, chat_id = deleted_trip
+    with app.app_context():
+        before = hot_counts(trip_id, chat_id)
+        assert before == (1, 1, 1, 2)
+        assert archive.run_pass(after_days=0) == 1
+        assert hot_counts(trip_id, chat_id) == (0, 0, 0, 0)
+        archived = ARCHIVE_TABLES["messages"]
+        assert db.session.execute(archived.select().where(archived.c.archive_trip_id == trip_id)).all()
+
+    assert client.get(f"/chat/{trip_id}").status_code == 404  # no new chat for an archived trip
+
+    resp = client.post(f"/trips/restore/{trip_id}")
+    assert resp.get_json() == {"status": "restored", "rehydrated": True}
+    with app.app_context():
+        assert hot_counts(trip_id, chat_id) == before
+        assert WingTrip.query.get(trip_id).status == "pending"
+        assert Chat.query.filter_by(trip_id=trip_id).one().id == chat_id
+        for table in ARCHIVE_TABLES.values():
+            assert not db.session.execute(table.select().where(table.c.archive_trip_id == trip_id)).all()
+
+
+def test_live_and_recent_trips_stay_hot(app, client, trip_payload, deleted_trip):
+    client.post("/trips", json=trip_payload)
+    with app.app_context():
+        assert archive.run_pass() == 0  # deleted, but not ARCHIVE_AFTER_DAYS ago
+        assert archive.run_pass(after_days=0) == 1
+        assert WingTrip.query.count() == 1
+
+
+def test_restore_unknown_trip(client):
+    assert client.post("/trips/restore/missing").status_code == 404
@@ -0,0 +1,14 @@
+from models import Message
+
+
+def test_chat_is_created_once(app, client):
+    trip_id = client.post("/trips", json={"route": "TEB-OAK", "departure_date": "06/20/2025"}).get_json()["id"]
+    first = client.get(f"/chat/{trip_id}").get_json()
+    second = client.get(f"/chat/{trip_id}").get_json()
+    assert first["chat_id"] == second["chat_id"]
+    with app.app_context():
+        assert Message.query.filter_by(chat_id=first["chat_id"]).count() == 1
+
+
+def test_no_chat_for_unknown_trip(client):
+    assert client.get("/chat/does-not-exist").status_code == 404
@@ -0,0 +1,57 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+import jobs
+from models import db, AIJob
+
+
+@pytest.fixture
+def blocked_kind(app):
+    release = threading.Event()
+    jobs.register("test_blocked", lambda payload: (release.wait(5) and {"ok": True}, 200))
+    yield "test_blocked"
+    release.set()
+
+
+def test_identical_input_coalesces(app, blocked_kind):
+    with app.app_context():
+        first, coalesced = jobs.submit(blocked_kind, {"text": "a"}, coalesce_on=["a", False])
+        assert not coalesced
+        second, coalesced = jobs.submit(blocked_kind, {"text": "a"}, coalesce_on=["a", False])
+        assert coalesced and second.id == first.id
+
+
+def test_cache_bypass_is_not_merged_into_a_cached_job(app, blocked_kind):
+    with app.app_context():
+        cached, _ = jobs.submit(blocked_kind, {"text": "a", "no_cache": False}, coalesce_on=["a", False])
+        fresh, coalesced = jobs.submit(blocked_kind, {"text": "a", "no_cache": True}, coalesce_on=["a", True])
+        assert not coalesced and fresh.id != cached.id
+
+
+def test_database_allows_one_active_job_per_input(app):
+    with app.app_context():
+        db.session.add(AIJob(kind="k", input_hash="h", payload="{}", status="queued"))
+        db.session.commit()
+        db.session.add(AIJob(kind="k", input_hash="h", payload="{}", status="running"))
+        with pytest.raises(IntegrityError):
+            db.session.commit()
+        db.session.rollback()
+        db.session.add(AIJob(kind="k", input_hash="h", payload="{}", status="succeeded"))
+        db.session.commit()
+
+
+def test_purge_deletes_only_old_finished_jobs(app):
+    old = datetime.utcnow() - timedelta(seconds=jobs.AI_JOB_RETENTION_SECONDS + 60)
+    with app.app_context():
+        db.session.add_all([
+            AIJob(id="old-done", kind="k", input_hash="1", payload="{}", status="succeeded", finished_at=old),
+            AIJob(id="old-failed", kind="k", input_hash="2", payload="{}", status="failed", finished_at=old),
+            AIJob(id="recent", kind="k", input_hash="3", payload="{}", status="succeeded", finished_at=datetime.utcnow()),
+            AIJob(id="queued", kind="k", input_hash="4", payload="{}", status="queued"),
+        ])
+        db.session.commit()
+        assert jobs.purge_finished() == 2
+        assert sorted(j.id for j in AIJob.query.all()) == ["queued", "recent"]
@@ -0,0 +1,73 @@
+from datetime import datetime
+
+import pytest
+
+import pagination
+
+
+@pytest.mark.parametrize("values, types", [
+    ((datetime(2025, 6, 20, 9, 30, 0, 123456), "f0c1"), (datetime, str)),
+    ((0.1 + 0.2, "quote", "id-1"), (float, str, str)),
+    (("2025-06-20", "trip-1"), (str, str)),
+])
+def test_cursor_round_trip(values, types):
+    cursor = pagination.encode_cursor(*values)
+    assert "=" not in cursor and "/" not in cursor and "+" not in cursor
+    assert pagination.decode_cursor(cursor, *types) == values
+
+
+@pytest.mark.parametrize("cursor", ["", "!!!", "bm90IGpzb24", pagination.encode_cursor("a"), pagination.encode_cursor("x", "y")])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(pagination.InvalidCursor):
+        pagination.decode_cursor(cursor, datetime, str)
+
+
+@pytest.mark.parametrize("raw, expected", [(None, 100), ("", 100), ("5", 5), ("100000", 500)])
+def test_parse_limit(raw, expected):
+    assert pagination.parse_limit(raw) == expected
+
+
+@pytest.mark.parametrize("raw", ["0", "-3", "ten"])
+def test_parse_limit_rejects(raw):
+    with pytest.raises(ValueError):
+        pagination.parse_limit(raw)
+
+
+@pytest.fixture
+def trips(client, trip_payload):
+    # Bulk rows share one created_at, so paging has to tie-break on id.
+    body = client.post("/trips/bulk", json={"trips": [dict(trip_payload, route=f"R{i}") for i in range(7)]}).get_json()
+    assert body["created"] == 7
+    return body
+
+
+def test_trip_pages_cover_every_trip_once(client, trips):
+    seen, params = [], {"limit": 3, "fields": "id,route"}
+    while True:
+        resp = client.get("/trips", query_string=params)
+        assert resp.status_code == 200
+        page = resp.get_json()
+        assert all(set(t) == {"id", "route"} for t in page)
+        seen += [t["id"] for t in page]
+        if "X-Next-Cursor" not in resp.headers:
+            break
+        assert 'rel="next"' in resp.headers["Link"]
+        params["cursor"] = resp.headers["X-Next-Cursor"]
+    assert sorted(seen) == sorted(r["id"] for r in trips["results"])
+
+
+def test_trips_bad_cursor_and_fields(client, trips):
+    assert client.get("/trips", query_string={"cursor": "garbage"}).status_code == 400
+    assert client.get("/trips", query_string={"fields": "id,password"}).status_code == 400
+
+
+def test_trips_conditional_get(client, trips):
+    first = client.get("/trips")
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"')
+    assert client.get("/trips", headers={"If-None-Match": etag}).status_code == 304
+
+    trip_id = trips["results"][0]["id"]
+    assert client.patch(f"/trips/{trip_id}", json={"route": "TEB-VNY"}).status_code == 200
+    changed = client.get("/trips", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
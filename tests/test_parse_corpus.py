@@ -0,0 +1,30 @@
+import glob
+import json
+import multiprocessing
+
+import parse_corpus
+
+
+def _write(worker, batches):
+    for i in range(batches):
+        parse_corpus._write_batch([{"worker": worker, "batch": i, "input": "x" * 200}] * 5)
+
+
+def test_workers_rotating_the_same_file_lose_nothing(tmp_path, monkeypatch):
+    monkeypatch.setattr(parse_corpus, "PARSE_CORPUS_PATH", str(tmp_path / "parse_corpus.jsonl"))
+    monkeypatch.setattr(parse_corpus, "PARSE_CORPUS_MAX_BYTES", 4096)
+    monkeypatch.setattr(parse_corpus, "PARSE_CORPUS_BACKUPS", 1000)
+
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=_write, args=(w, 40)) for w in range(4)]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join()
+        assert p.exitcode == 0
+
+    records = []
+    for path in glob.glob(str(tmp_path / "parse_corpus.jsonl*")):
+        with open(path, encoding="utf-8") as f:
+            records += [json.loads(line) for line in f]
+    assert len(records) == 4 * 40 * 5
@@ -0,0 +1,36 @@
+import os
+import time
+
+import pytest
+
+import pdf_extract
+
+
+def _slow(path, max_pages, max_chars):
+    time.sleep(30)
+
+
+def _pid(path, max_pages, max_chars):
+    return str(os.getpid())
+
+
+@pytest.fixture(autouse=True)
+def fresh_pool():
+    yield
+    pdf_extract.shutdown(wait=False)
+
+
+def test_timeout_kills_the_running_worker(monkeypatch):
+    monkeypatch.setattr(pdf_extract, "_extract_pages", _pid)
+    before = pdf_extract.extract_text("unused", timeout=30)
+
+    monkeypatch.setattr(pdf_extract, "_extract_pages", _slow)
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        pdf_extract.extract_text("unused", timeout=1)
+    assert time.monotonic() - started < 5
+    with pytest.raises(ProcessLookupError):
+        os.kill(int(before), 0)  # the pool that ran it (and its workers) is gone
+
+    monkeypatch.setattr(pdf_extract, "_extract_pages", _pid)
+    assert pdf_extract.extract_text("unused", timeout=30) != before
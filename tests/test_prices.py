@@ -0,0 +1,42 @@
+import pytest
+
+from prices import parse_price
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("$23,000", (23000.0, "USD")),
+    ("23k", (23000.0, "USD")),
+    ("23000 USD", (23000.0, "USD")),
+    ("EUR 18.5k + tax", (18500.0, "EUR")),
+    ("£41,250.50", (41250.5, "GBP")),
+    ("Citation XLS 2018, $23,000", (23000.0, "USD")),
+    ("Challenger 350 – 2019 – $48k", (48000.0, "USD")),
+])
+def test_common_formats(raw, expected):
+    assert parse_price(raw) == expected
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("23.000 €", (23000.0, "EUR")),
+    ("€23.000", (23000.0, "EUR")),
+    ("$ 23 000", (23000.0, "USD")),
+    ("1.234.567,89 EUR", (1234567.89, "EUR")),
+    ("23,50 €", (23.5, "EUR")),
+    ("1,5m", (1500000.0, "USD")),
+])
+def test_european_grouping_and_decimal_commas(raw, expected):
+    assert parse_price(raw) == expected
+
+
+@pytest.mark.parametrize("raw", ["99999999999999", "$10,000,000,000", "25,000,000,000 EUR"])
+def test_amounts_too_large_for_the_column_are_null(raw):
+    assert parse_price(raw) == (None, None)
+
+
+def test_largest_amount_that_fits():
+    assert parse_price("$9,999,999,999.99") == (9999999999.99, "USD")
+
+
+@pytest.mark.parametrize("raw", [None, "", "Call for pricing"])
+def test_no_amount(raw):
+    assert parse_price(raw) == (None, None)
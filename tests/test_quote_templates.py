@@ -0,0 +1,70 @@
+import pytest
+
+import quote_templates
+
+EMAIL = """Skyline Charter Group
+Aircraft: {aircraft}
+Price: {price}
+Year of Make: 2018
+Wifi: Yes
+Cancellation: 50% within 7 days
+"""
+
+
+def email(aircraft="Citation XLS", price="$23,000"):
+    return EMAIL.format(aircraft=aircraft, price=price)
+
+
+def parsed(aircraft="Citation XLS", price="$23,000", category="Midsize", **extra):
+    return dict({
+        "aircraft": aircraft, "price": price, "category": category, "broker_name": "Skyline Charter Group",
+        "cancellation_policy": "50% within 7 days", "wifi": "Yes", "yom": "2018",
+        "refurbished_year": "", "notes": ""
+    }, **extra)
+
+
+@pytest.fixture
+def ctx(app):
+    with app.app_context():
+        yield
+
+
+def test_layout_is_used_after_enough_confirmations(ctx):
+    assert quote_templates.extract("email_quote", email()) is None
+    quote_templates.learn("email_quote", email(), parsed())
+    assert quote_templates.extract("email_quote", email()) is None  # one sighting isn't enough
+    quote_templates.learn("email_quote", email(), parsed())
+
+    result = quote_templates.extract("email_quote", email(price="$24,500"))
+    assert result["aircraft"] == "Citation XLS"
+    assert result["price"] == "24500"  # always normalized, like price_amount
+    assert result["category"] == "Midsize"
+    assert result["broker_name"] == "Skyline Charter Group"
+    assert result["cancellation_policy"] == "50% within 7 days"
+
+
+def test_unknown_aircraft_goes_back_to_the_llm(ctx):
+    for _ in range(2):
+        quote_templates.learn("email_quote", email(), parsed())
+    assert quote_templates.extract("email_quote", email(aircraft="Gulfstream G450")) is None
+
+    quote_templates.learn("email_quote", email(aircraft="Gulfstream G450"), parsed("Gulfstream G450", category="Heavy"))
+    assert quote_templates.extract("email_quote", email(aircraft="Gulfstream G450"))["category"] == "Heavy"
+
+
+def test_unlabelled_per_quote_details_make_the_layout_unlearnable(ctx):
+    answer = parsed(notes="Catering included on request")
+    assert quote_templates.derive_mapping(email(), quote_templates.labelled_lines(email()), answer) is None
+    assert quote_templates.learn("email_quote", email(), answer) is None
+
+
+def test_a_changed_mapping_starts_over(ctx):
+    for _ in range(2):
+        quote_templates.learn("email_quote", email(), parsed())
+    quote_templates.learn("email_quote", email(), parsed(yom=""))
+    assert quote_templates.extract("email_quote", email()) is None
+    assert quote_templates.stats()["relearned"] >= 1
+
+
+def test_short_documents_are_not_fingerprinted():
+    assert quote_templates.fingerprint("email_quote", "Price: $23,000\nThanks!") is None
@@ -0,0 +1,71 @@
+import pytest
+
+import pagination
+
+
+@pytest.fixture
+def shared_trip(client):
+    trip = client.post("/trips", json={
+        "route": "Teterboro to Aspen", "departure_date": "06/20/2025",
+        "planner_email": "planner@example.com",
+        "partner_emails": ["b1@example.com", "b2@example.com"], "partner_names": ["B1", "B2"]
+    }).get_json()
+    quote = {"trip_id": trip["id"], "broker_name": "B1", "price": "$48,000"}
+    client.post("/submit-quote", json=dict(quote, operator_name="SecretOps", aircraft_type="G450",
+                                           notes="our best rate", submitted_by_email="b1@example.com"))
+    client.post("/submit-quote", json=dict(quote, operator_name="OpenOps", aircraft_type="G450",
+                                           notes="shared rate", submitted_by_email="b1@example.com",
+                                           shared_with_emails="b2@example.com"))
+    return trip["id"]
+
+
+def search(client, email, q, **params):
+    resp = client.get("/search", query_string=dict(params, q=q, email=email))
+    assert resp.status_code == 200
+    return resp
+
+
+def hits(resp, doc_type="quote"):
+    return sorted(r["text"] for r in resp.get_json() if r["type"] == doc_type)
+
+
+def test_planner_sees_every_quote_on_their_trip(client, shared_trip):
+    assert hits(search(client, "planner@example.com", "G450")) == [
+        "G450 · OpenOps · shared rate", "G450 · SecretOps · our best rate"
+    ]
+
+
+def test_partner_broker_only_sees_quotes_shared_with_them(client, shared_trip):
+    assert hits(search(client, "b2@example.com", "G450")) == ["G450 · OpenOps · shared rate"]
+    assert client.get("/quotes/by-email", query_string={"email": "b2@example.com"}).get_json()[0]["operator_name"] == "OpenOps"
+
+
+def test_partner_still_finds_the_trip_route(client, shared_trip):
+    assert hits(search(client, "b2@example.com", "aspen"), "trip") == ["Teterboro to Aspen"]
+
+
+def test_outsiders_see_nothing(client, shared_trip):
+    assert search(client, "stranger@example.com", "G450 aspen").get_json() == []
+
+
+def test_cursor_pages_cover_every_hit_once(client, shared_trip):
+    seen = []
+    params = {"limit": 1}
+    while True:
+        resp = search(client, "planner@example.com", "rate", **params)
+        seen += [(r["type"], r["id"]) for r in resp.get_json()]
+        cursor = resp.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        params["cursor"] = cursor
+    assert len(seen) == 2 and len(set(seen)) == 2
+
+
+def test_bad_cursor_is_rejected(client, shared_trip):
+    resp = client.get("/search", query_string={"q": "G450", "email": "planner@example.com", "cursor": "nope"})
+    assert resp.status_code == 400
+
+
+@pytest.mark.parametrize("values", [(0.0607927, "quote", "abc"), (-1.5e-06, "message", "m-1")])
+def test_rank_cursor_round_trips_exactly(values):
+    assert pagination.decode_cursor(pagination.encode_cursor(*values), float, str, str) == values
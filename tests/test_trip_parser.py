@@ -0,0 +1,49 @@
+import pytest
+
+import trip_parser
+
+
+def parse(text):
+    result, confidence, missing = trip_parser.parse_deterministic(text)
+    legs = [(leg["from"], leg["to"], leg["date"], leg["time"]) for leg in result["legs"]]
+    return result, legs, trip_parser.is_confident(confidence, missing)
+
+
+def test_shorthand_is_parsed_without_the_llm():
+    result, legs, confident = parse("TEB-OAK 06/20/2025 5 pax $50k")
+    assert legs == [("TEB", "OAK", "06/20/2025", "")]
+    assert result["passenger_count"] == "5"
+    assert result["budget"] == "50000"
+    assert confident
+
+
+def test_multi_leg_lines_keep_their_own_dates_and_times():
+    _, legs, confident = parse("TEB-OAK 06/20/2025 10am\nOAK-TEB 06/22/2025 3pm\n4 pax")
+    assert legs == [("TEB", "OAK", "06/20/2025", "10:00"), ("OAK", "TEB", "06/22/2025", "15:00")]
+    assert confident
+
+
+@pytest.mark.parametrize("text", ["TEB OAK 06/20/2025 5 pax", "TEB to OAK 06/20/2025 5 pax", "TEB → OAK 06/20/2025 5 pax"])
+def test_separators(text):
+    _, legs, confident = parse(text)
+    assert legs == [("TEB", "OAK", "06/20/2025", "")]
+    assert confident
+
+
+@pytest.mark.parametrize("text", ["ASAP TEB-OAK 06/20/2025 5 pax $50k", "NEED JET TEB-OAK 06/20/2025 5 pax"])
+def test_capitalized_words_never_displace_an_explicit_pair(text):
+    _, legs, confident = parse(text)
+    assert legs == [("TEB", "OAK", "06/20/2025", "")]
+    assert not confident  # stray codes on the line: let the LLM confirm
+
+
+@pytest.mark.parametrize("text", ["NEED JET TEB OAK 06/20/2025 5 pax", "TEB-OAK OAK-LAX 06/20/2025 5 pax"])
+def test_conflicting_candidates_go_to_the_llm(text):
+    _, _, confident = parse(text)
+    assert not confident
+
+
+def test_prose_without_a_route_is_not_confident():
+    result, legs, confident = parse("Can you find us something for next month, maybe 5 people?")
+    assert legs == []
+    assert not confident
@@ -0,0 +1,74 @@
+from datetime import date
+
+import pytest
+
+import pagination
+import trip_values
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("06/20/2025", date(2025, 6, 20)), ("6/20/25", date(2025, 6, 20)), ("2025-06-20", date(2025, 6, 20)),
+    ("", None), (None, None), ("next week", None), ("02/30/2025", None),
+])
+def test_parse_departure(raw, expected):
+    assert trip_values.parse_departure(raw) == expected
+
+
+@pytest.mark.parametrize("raw, expected", [("5", 5), (5, 5), ("5 pax", 5), ("0", None), ("1000", None), ("", None)])
+def test_parse_passengers(raw, expected):
+    assert trip_values.parse_passengers(raw) == expected
+
+
+def test_typed_values():
+    assert trip_values.typed_values("06/20/2025", "5", "$50k") == {
+        "departure_on": date(2025, 6, 20), "passengers": 5, "budget_amount": 50000.0
+    }
+
+
+@pytest.fixture
+def upcoming(client, trip_payload):
+    days = ["06/20/2025", "06/21/2025", "06/21/2025", "06/23/2025", "07/30/2025"]
+    items = [dict(trip_payload, departure_date=d, budget=f"${(i + 1) * 10}k", route=f"R{i}") for i, d in enumerate(days)]
+    assert client.post("/trips/bulk", json={"trips": items}).get_json()["created"] == 5
+
+
+def test_upcoming_window_and_budget(client, upcoming):
+    resp = client.get("/trips/upcoming", query_string={"from": "2025-06-20", "days": 7, "fields": "route,departure_on"})
+    assert resp.status_code == 200
+    assert [t["departure_on"] for t in resp.get_json()] == ["2025-06-20", "2025-06-21", "2025-06-21", "2025-06-23"]
+    # Each sample trip has one leg on 06/20, inside the window.
+    assert all([d["date"] for d in t["departures"]] == ["2025-06-20"] for t in resp.get_json())
+
+    resp = client.get("/trips/upcoming", query_string={"from": "2025-06-20", "days": 7, "min_budget": 25000, "fields": "route"})
+    assert sorted(t["route"] for t in resp.get_json()) == ["R2", "R3"]
+
+
+def test_upcoming_pages_with_a_date_cursor(client, upcoming):
+    seen, params = [], {"from": "2025-06-20", "days": 60, "limit": 2, "fields": "route"}
+    while True:
+        resp = client.get("/trips/upcoming", query_string=params)
+        assert resp.status_code == 200
+        seen += [t["route"] for t in resp.get_json()]
+        if "X-Next-Cursor" not in resp.headers:
+            break
+        params["cursor"] = resp.headers["X-Next-Cursor"]
+    assert sorted(seen) == ["R0", "R1", "R2", "R3", "R4"]
+
+
+def test_upcoming_rejects_bad_input(client, upcoming):
+    bad_date_cursor = pagination.encode_cursor("not-a-date", "x")
+    for params in ({"cursor": bad_date_cursor}, {"min_budget": "nan"}, {"days": "soon"}):
+        assert client.get("/trips/upcoming", query_string=params).status_code == 400
+
+
+def test_patch_keeps_typed_columns_in_sync(client, trip_payload):
+    trip_id = client.post("/trips", json=trip_payload).get_json()["id"]
+    resp = client.patch(f"/trips/{trip_id}", json={"departure_date": "07/01/2025", "passenger_count": 6, "budget": "45k"})
+    assert resp.status_code == 200
+    trip = next(t for t in client.get("/trips", query_string={"fields": "id,departure_on,passengers,budget_amount"}).get_json()
+                if t["id"] == trip_id)
+    assert (trip["departure_on"], trip["passengers"], trip["budget_amount"]) == ("2025-07-01", 6, 45000)
+
+    resp = client.patch(f"/trips/{trip_id}", json={"departure_date": "2025-07-01"})
+    assert resp.status_code == 400
+    assert resp.get_json()["error"][0]["loc"] == ["departure_date"]
@@ -0,0 +1,18 @@
+from models import TripLeg, WingTrip
+
+
+def test_bulk_reports_each_bad_item_and_inserts_the_rest(app, client, trip_payload):
+    items = [trip_payload, "not a trip", dict(trip_payload, departure_date="2025-06-20"), None]
+    resp = client.post("/trips/bulk", json={"trips": items})
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert (body["created"], body["failed"]) == (1, 3)
+    results = {r["index"]: r for r in body["results"]}
+    assert "id" in results[0]
+    assert results[1]["errors"] == [{"loc": [], "msg": "Trip must be a JSON object."}]
+    assert results[2]["errors"][0]["loc"] == ["departure_date"]
+    assert results[3]["errors"] == [{"loc": [], "msg": "Trip must be a JSON object."}]
+    with app.app_context():
+        trip = WingTrip.query.one()
+        assert (trip.passengers, trip.budget_amount) == (5, 50000)
+        assert TripLeg.query.filter_by(trip_id=trip.id).count() == 1
@@ -0,0 +1,124 @@
+import threading
+
+import pytest
+
+import upstream
+
+
+class Upstream5xx(Exception):
+    status_code = 503
+
+
+class BadRequest(Exception):
+    status_code = 400
+
+
+@pytest.fixture(autouse=True)
+def guard(monkeypatch):
+    monkeypatch.setattr(upstream, "LLM_MAX_RETRIES", 0)
+    monkeypatch.setattr(upstream, "LLM_BREAKER_FAILURES", 3)
+    monkeypatch.setattr(upstream, "LLM_BREAKER_COOLDOWN_SECONDS", 60)
+    monkeypatch.setattr(upstream, "LLM_BULKHEAD_WAIT_SECONDS", 0.05)
+    monkeypatch.setattr(upstream, "_bulkhead", threading.BoundedSemaphore(1))
+    upstream.reset()
+    yield
+    upstream.reset()
+
+
+def fail(error):
+    def fn(timeout):
+        raise error
+    return fn
+
+
+def test_fn_gets_the_remaining_budget():
+    assert 0 < upstream.call("trip", lambda timeout: timeout) <= upstream.latency_budget("trip")
+
+
+def test_breaker_opens_after_consecutive_upstream_failures():
+    for _ in range(3):
+        with pytest.raises(Upstream5xx):
+            upstream.call("trip", fail(Upstream5xx()))
+    assert upstream.breaker_state() == upstream.OPEN
+    with pytest.raises(upstream.UpstreamUnavailable) as rejected:
+        upstream.call("trip", lambda timeout: "never called")
+    assert rejected.value.retry_after > 0
+
+
+def test_success_resets_the_failure_count():
+    for _ in range(2):
+        with pytest.raises(Upstream5xx):
+            upstream.call("trip", fail(Upstream5xx()))
+    upstream.call("trip", lambda timeout: "ok")
+    with pytest.raises(Upstream5xx):
+        upstream.call("trip", fail(Upstream5xx()))
+    assert upstream.breaker_state() == upstream.CLOSED
+
+
+def test_client_errors_do_not_count():
+    for _ in range(10):
+        with pytest.raises(BadRequest):
+            upstream.call("trip", fail(BadRequest()))
+    assert upstream.breaker_state() == upstream.CLOSED
+
+
+def test_half_open_probe_closes_or_reopens(monkeypatch):
+    for _ in range(3):
+        with pytest.raises(Upstream5xx):
+            upstream.call("trip", fail(Upstream5xx()))
+    monkeypatch.setattr(upstream, "LLM_BREAKER_COOLDOWN_SECONDS", 0)
+    assert upstream.breaker_state() == upstream.HALF_OPEN
+    with pytest.raises(Upstream5xx):
+        upstream.call("trip", fail(Upstream5xx()))
+    assert upstream._state == upstream.OPEN
+    assert upstream.call("trip", lambda timeout: "ok") == "ok"
+    assert upstream.breaker_state() == upstream.CLOSED
+
+
+def test_retryable_errors_are_retried_within_budget(monkeypatch):
+    monkeypatch.setattr(upstream, "LLM_MAX_RETRIES", 1)
+    monkeypatch.setattr(upstream, "LLM_RETRY_BACKOFF_SECONDS", 0.01)
+    attempts = []
+
+    def flaky(timeout):
+        attempts.append(timeout)
+        if len(attempts) == 1:
+            raise Upstream5xx()
+        return "ok"
+
+    assert upstream.call("trip", flaky) == "ok"
+    assert len(attempts) == 2 and upstream.stats()["retries"] == 1
+
+
+def hold_slot():
+    entered, release = threading.Event(), threading.Event()
+
+    def slow(timeout):
+        entered.set()
+        release.wait(5)
+        return "slow"
+
+    thread = threading.Thread(target=upstream.call, args=("trip", slow))
+    thread.start()
+    entered.wait(5)
+    return thread, release
+
+
+def test_bulkhead_rejects_when_full():
+    thread, release = hold_slot()
+    try:
+        with pytest.raises(upstream.UpstreamUnavailable):
+            upstream.call("trip", lambda timeout: "ok")
+        assert upstream.stats()["bulkhead_rejections"] == 1
+    finally:
+        release.set()
+        thread.join()
+
+
+def test_queued_calls_wait_for_a_slot():
+    thread, release = hold_slot()
+    threading.Timer(0.2, release.set).start()
+    with upstream.queued():
+        assert upstream.call("trip", lambda timeout: "ok") == "ok"
+    thread.join()
+    assert upstream.stats()["bulkhead_rejections"] == 0
@@ -0,0 +1,16 @@
+# === Token Estimates ===
+# A cheap ~4 characters/token estimate, close enough for budgeting prompts
+# without pulling a tokenizer into every worker.
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    return (len(text or "") + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_to_tokens(text, budget):
+    max_chars = budget * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    return text[:max(0, max_chars - 1)].rstrip() + "…"
@@ -0,0 +1,189 @@
+import os
+import re
+import threading
+from datetime import datetime
+
+# === Deterministic Trip Parser ===
+# Tier 1 of /parse-trip-input. Planner shorthand like "TEB-OAK 06/20/2025 5 pax $50k"
+# is handled here in microseconds; GPT-4 is only asked when required fields are
+# missing or the confidence score is below TRIP_PARSER_CONFIDENCE_THRESHOLD.
+# Every pattern is precompiled and legs are paired with a single forward scan per
+# line, so long pasted text stays linear instead of backtracking through `.*?`.
+
+TRIP_PARSER_CONFIDENCE_THRESHOLD = float(os.environ.get("TRIP_PARSER_CONFIDENCE_THRESHOLD", 0.8))
+
+# An explicit separator ("TEB-OAK", "TEB to OAK") beats bare adjacency ("TEB OAK"),
+# which any two capitalized words ("NEED JET", "ASAP TEB") also match. The space
+# form is only tried on lines without an explicit pair; overlapping candidates
+# (the lookahead finds all of them) mark the line as ambiguous.
+AIRPORT_PAIR_RE = re.compile(r"\b([A-Z]{3,4})[ ]*(?:-+|–|—|→|>|\bto\b)[ ]*([A-Z]{3,4})\b")
+SPACED_PAIR_RE = re.compile(r"\b([A-Z]{3,4})[ ]+([A-Z]{3,4})\b")
+SPACED_CANDIDATE_RE = re.compile(r"\b(?=([A-Z]{3,4})[ ]+([A-Z]{3,4})\b)")
+AMBIGUOUS_LEGS_PENALTY = 0.5
+DATE_RE = re.compile(r"\b(\d{1,2})/(\d{1,2})/(\d{4}|\d{2})\b")
+TIME_RE = re.compile(r"\b(\d{1,2})(?::(\d{2}))?[ ]*([ap]\.?m\.?)?(?![\w/])", re.IGNORECASE)
+PAX_RE = re.compile(r"\b(\d{1,3})\s*(?:pax|passengers?|adults|people|guests)\b", re.IGNORECASE)
+BUDGET_RE = re.compile(
+    r"(?:(?P<dollar>\$)\s*(?P<amount1>\d{1,3}(?:,\d{3})+|\d+(?:\.\d+)?)\s*(?P<suffix1>k\b|thousand\b|m\b|million\b)?"
+    r"|\b(?P<amount2>\d{1,3}(?:,\d{3})+|\d+(?:\.\d+)?)\s*(?:(?P<suffix2>k\b|thousand\b|m\b|million\b)\s*(?:usd\b)?|(?P<usd>usd\b)))",
+    re.IGNORECASE
+)
+BUDGET_MULTIPLIERS = {"k": 1000, "thousand": 1000, "m": 1000000, "million": 1000000}
+
+NON_SPACE_RE = re.compile(r"\S")
+FILLER_RE = re.compile(r"[,;:.|()\[\]]|\b(?:on|at|for|and|with|budget|of|around|approx|~)\b", re.IGNORECASE)
+
+_lock = threading.Lock()
+_tier_counts = {"deterministic": 0, "llm": 0, "fallback": 0}
+
+
+def record_tier(tier):
+    with _lock:
+        _tier_counts[tier] += 1
+
+
+def tier_stats():
+    with _lock:
+        snapshot = dict(_tier_counts)
+    total = sum(snapshot.values())
+    snapshot["total"] = total
+    snapshot["llm_call_rate"] = round((snapshot["llm"] + snapshot["fallback"]) / total, 4) if total else 0.0
+    return snapshot
+
+
+def _normalize_date(match):
+    month, day, year = match.groups()
+    if len(year) == 2:
+        year = "20" + year
+    try:
+        return datetime(int(year), int(month), int(day)).strftime("%m/%d/%Y")
+    except ValueError:
+        return None
+
+
+def _normalize_time(match):
+    hour, minute, meridiem = match.groups()
+    if minute is None and meridiem is None:
+        return None
+    hour = int(hour)
+    minute = int(minute or 0)
+    if meridiem:
+        meridiem = meridiem[0].lower()
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem == "p" else 0)
+    if hour > 23 or minute > 59:
+        return None
+    return f"{hour:02d}:{minute:02d}"
+
+
+def _line_pairs(line):
+    """(airport pair matches, ambiguous) for one line."""
+    spaced = list(SPACED_CANDIDATE_RE.finditer(line))
+    explicit = list(AIRPORT_PAIR_RE.finditer(line))
+    if explicit:
+        return explicit, bool(spaced)
+    pairs = list(SPACED_PAIR_RE.finditer(line))
+    # "NEED JET TEB OAK" has three overlapping candidates but only two pairs.
+    return pairs, len(spaced) > len(pairs)
+
+
+def _scan_legs(text, spans):
+    """Returns (legs, ambiguous); ambiguous means some line had conflicting airport candidates."""
+    legs = []
+    ambiguous = False
+    offset = -1
+    for line in text.split("\n"):
+        offset += 1
+        line_start = offset
+        offset += len(line)
+        airports, conflicting = _line_pairs(line)
+        if not airports:
+            continue
+        ambiguous = ambiguous or conflicting
+        dates = list(DATE_RE.finditer(line))
+
+        # Pair each airport pair with the first date after it on the same line.
+        d = 0
+        consumed = 0
+        for a in airports:
+            if a.start() < consumed:
+                # Two pairs competing for one date: don't guess which one it belongs to.
+                ambiguous = True
+                continue
+            while d < len(dates) and dates[d].start() < a.end():
+                d += 1
+            if d == len(dates):
+                break
+            date_match = dates[d]
+            d += 1
+            formatted_date = _normalize_date(date_match)
+            consumed = date_match.end()
+            if not formatted_date:
+                continue
+
+            leg_time = ""
+            time_match = TIME_RE.search(line, date_match.end(), date_match.end() + 16)
+            if time_match:
+                leg_time = _normalize_time(time_match) or ""
+                if leg_time:
+                    consumed = time_match.end()
+                    spans.append((line_start + time_match.start(), line_start + time_match.end()))
+
+            legs.append({"from": a.group(1), "to": a.group(2), "date": formatted_date, "time": leg_time})
+            spans.append((line_start + a.start(), line_start + a.end()))
+            spans.append((line_start + date_match.start(), line_start + date_match.end()))
+    return legs, ambiguous
+
+
+def _extract_budget(text):
+    for match in BUDGET_RE.finditer(text):
+        amount = match.group("amount1") or match.group("amount2")
+        suffix = (match.group("suffix1") or match.group("suffix2") or "").lower()
+        value = float(amount.replace(",", "")) * BUDGET_MULTIPLIERS.get(suffix, 1)
+        return str(int(value)), match.span()
+    return "", None
+
+
+def parse_deterministic(text):
+    """Returns (result, confidence, missing_fields); result has the same shape as the LLM output."""
+    spans = []
+    legs, ambiguous = _scan_legs(text, spans)
+
+    pax_match = PAX_RE.search(text)
+    passenger_count = pax_match.group(1) if pax_match else ""
+    if pax_match:
+        spans.append(pax_match.span())
+
+    budget, budget_span = _extract_budget(text)
+    if budget_span:
+        spans.append(budget_span)
+
+    # Coverage: share of non-space characters explained by the fields we extracted.
+    # Shorthand is almost fully covered; prose that merely mentions a route is not.
+    total = len(NON_SPACE_RE.findall(text))
+    explained = sum(len(NON_SPACE_RE.findall(text[start:end])) for start, end in spans)
+    explained += sum(len(NON_SPACE_RE.findall(m.group(0))) for m in FILLER_RE.finditer(text))
+    coverage = min(1.0, explained / total) if total else 0.0
+
+    missing = []
+    if not legs:
+        missing.append("legs")
+    if not passenger_count:
+        missing.append("passenger_count")
+
+    confidence = 0.45 * bool(legs) + 0.25 * bool(passenger_count) + 0.1 * bool(budget) + 0.2 * coverage
+    if ambiguous:
+        confidence = max(0.0, confidence - AMBIGUOUS_LEGS_PENALTY)
+    result = {"legs": legs, "passenger_count": passenger_count, "budget": budget}
+    return result, round(confidence, 3), missing
+
+
+def is_confident(confidence, missing, threshold=None):
+    threshold = TRIP_PARSER_CONFIDENCE_THRESHOLD if threshold is None else threshold
+    return not missing and confidence >= threshold
+
+
+def fallback_regex_parser(text):
+    result, _, _ = parse_deterministic(text)
+    return result
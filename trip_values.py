@@ -0,0 +1,42 @@
+import re
+from datetime import datetime
+
+import prices
+
+# === Typed Trip Values ===
+# WingTrip.departure_date, passenger_count and budget stay as the planner typed
+# them ("06/20/2025", "5", "$50k"). departure_on, passengers and budget_amount
+# hold the parsed values so departure windows and budget bands can be answered
+# with an index range scan. Anything unparseable is NULL and drops out of range
+# queries.
+
+DATE_FORMATS = ("%m/%d/%Y", "%m/%d/%y", "%Y-%m-%d")
+INTEGER_RE = re.compile(r"\d+")
+MAX_PASSENGERS = 999
+
+
+def parse_departure(value):
+    value = (value or "").strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_passengers(value):
+    match = INTEGER_RE.search(str(value or ""))
+    if not match:
+        return None
+    count = int(match.group())
+    return count if 0 < count <= MAX_PASSENGERS else None
+
+
+def typed_values(departure_date=None, passenger_count=None, budget=None):
+    """Column values for WingTrip's typed copies of the given string fields."""
+    return {
+        "departure_on": parse_departure(departure_date),
+        "passengers": parse_passengers(passenger_count),
+        "budget_amount": prices.parse_price(budget)[0]
+    }
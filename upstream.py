@@ -0,0 +1,225 @@
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+# === Upstream LLM Guard ===
+# Every OpenAI call runs through call(kind, fn) from llm.create_completion().
+# call() applies three guards:
+# - Latency budget per kind (LLM_LATENCY_BUDGETS). The budget bounds the
+#   bulkhead wait, each attempt's request timeout and any retry.
+# - Bulkhead: at most AI_MAX_UPSTREAM_CALLS calls in flight per process.
+#   Callers that can't get a slot within LLM_BULKHEAD_WAIT_SECONDS are
+#   rejected instead of queueing.
+#   Batch items and async jobs run inside queued() and instead wait for a slot
+#   for as long as their latency budget allows.
+# - Circuit breaker. After LLM_BREAKER_FAILURES consecutive upstream failures
+#   (timeouts, connection errors, 429 and 5xx), calls fail fast for
+#   LLM_BREAKER_COOLDOWN_SECONDS. One probe call is then allowed through:
+#   success closes the breaker, failure reopens it. Client errors such as an
+#   oversized prompt (400) say nothing about upstream health and don't count.
+# Rejected calls raise UpstreamUnavailable, so /parse-trip-input answers
+# from the regex parser and the other AI routes return 503 without
+# touching OpenAI.
+
+AI_MAX_UPSTREAM_CALLS = int(os.environ.get("AI_MAX_UPSTREAM_CALLS", 8))
+LLM_BULKHEAD_WAIT_SECONDS = float(os.environ.get("LLM_BULKHEAD_WAIT_SECONDS", 2))
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", 1))
+LLM_RETRY_BACKOFF_SECONDS = float(os.environ.get("LLM_RETRY_BACKOFF_SECONDS", 0.5))
+LLM_BREAKER_FAILURES = int(os.environ.get("LLM_BREAKER_FAILURES", 5))
+LLM_BREAKER_COOLDOWN_SECONDS = float(os.environ.get("LLM_BREAKER_COOLDOWN_SECONDS", 30))
+
+DEFAULT_LATENCY_BUDGET_SECONDS = float(os.environ.get("LLM_DEFAULT_LATENCY_BUDGET_SECONDS", 30))
+LATENCY_BUDGETS = {"trip": 8.0, "email_quote": 20.0, "pdf_quote": 30.0, "summary": 15.0}
+for _item in os.environ.get("LLM_LATENCY_BUDGETS", "").split(","):
+    # e.g. LLM_LATENCY_BUDGETS="trip=5,summary=10"
+    if "=" in _item:
+        _kind, _seconds = _item.split("=", 1)
+        LATENCY_BUDGETS[_kind.strip()] = float(_seconds)
+
+RETRYABLE_ERRORS = ("APITimeoutError", "APIConnectionError", "RateLimitError", "InternalServerError")
+RETRYABLE_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+BREAKER_STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class UpstreamUnavailable(RuntimeError):
+    def __init__(self, reason, retry_after=None):
+        super().__init__(f"LLM upstream unavailable ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+_bulkhead = threading.BoundedSemaphore(AI_MAX_UPSTREAM_CALLS)
+_local = threading.local()
+_lock = threading.Lock()
+_state = CLOSED
+_consecutive_failures = 0
+_opened_at = 0.0
+_probe_in_flight = False
+_in_flight = 0
+_stats = {
+    "calls": 0, "failures": 0, "timeouts": 0, "retries": 0,
+    "breaker_opens": 0, "breaker_rejections": 0, "bulkhead_rejections": 0
+}
+
+
+def latency_budget(kind):
+    return LATENCY_BUDGETS.get(kind, DEFAULT_LATENCY_BUDGET_SECONDS)
+
+
+def is_retryable(error):
+    if isinstance(error, TimeoutError) or type(error).__name__ in RETRYABLE_ERRORS:
+        return True
+    return getattr(error, "status_code", None) in RETRYABLE_STATUS_CODES
+
+
+def is_timeout(error):
+    return isinstance(error, TimeoutError) or type(error).__name__ == "APITimeoutError"
+
+
+def _count(stat, amount=1):
+    with _lock:
+        _stats[stat] += amount
+
+
+def _before_call():
+    """Raises UpstreamUnavailable if the breaker rejects the call; returns True for a half-open probe."""
+    global _state, _probe_in_flight
+    with _lock:
+        if _state == OPEN:
+            remaining = LLM_BREAKER_COOLDOWN_SECONDS - (time.monotonic() - _opened_at)
+            if remaining > 0:
+                _stats["breaker_rejections"] += 1
+                raise UpstreamUnavailable("circuit open", retry_after=max(1, int(remaining + 0.999)))
+            _state = HALF_OPEN
+        if _state == HALF_OPEN:
+            if _probe_in_flight:
+                _stats["breaker_rejections"] += 1
+                raise UpstreamUnavailable("circuit half-open", retry_after=1)
+            _probe_in_flight = True
+            return True
+    return False
+
+
+@contextmanager
+def queued():
+    """Calls made in this block wait for a bulkhead slot within their latency budget instead of being rejected."""
+    previous = getattr(_local, "queued", False)
+    _local.queued = True
+    try:
+        yield
+    finally:
+        _local.queued = previous
+
+
+def counts_against_breaker(error):
+    return is_retryable(error)
+
+
+def _after_call(probe, ok):
+    global _state, _consecutive_failures, _opened_at, _probe_in_flight
+    with _lock:
+        if probe:
+            _probe_in_flight = False
+        if ok:
+            _consecutive_failures = 0
+            if _state != CLOSED:
+                print("✅ LLM upstream recovered; circuit closed")
+            _state = CLOSED
+            return
+        _consecutive_failures += 1
+        if _state == HALF_OPEN or _consecutive_failures >= LLM_BREAKER_FAILURES:
+            if _state != OPEN:
+                _stats["breaker_opens"] += 1
+                print(f"❌ LLM upstream unhealthy after {_consecutive_failures} failures; circuit open")
+            _state = OPEN
+            _opened_at = time.monotonic()
+
+
+def call(kind, fn):
+    """Runs fn(timeout) under the breaker, bulkhead and latency budget for `kind`."""
+    global _in_flight, _probe_in_flight
+    deadline = time.monotonic() + latency_budget(kind)
+    probe = _before_call()
+    acquired = False
+    try:
+        wait = max(0.0, deadline - time.monotonic())
+        if not getattr(_local, "queued", False):
+            wait = min(LLM_BULKHEAD_WAIT_SECONDS, wait)
+        acquired = _bulkhead.acquire(timeout=wait)
+        if not acquired:
+            _count("bulkhead_rejections")
+            raise UpstreamUnavailable("too many in-flight calls", retry_after=1)
+        with _lock:
+            _in_flight += 1
+
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                _count("timeouts")
+                _after_call(probe, False)
+                probe = False
+                raise TimeoutError(f"LLM latency budget for '{kind}' exhausted")
+            _count("calls")
+            try:
+                result = fn(remaining)
+            except Exception as e:
+                _count("failures")
+                if is_timeout(e):
+                    _count("timeouts")
+                backoff = LLM_RETRY_BACKOFF_SECONDS * (2 ** attempt) * random.uniform(0.5, 1.0)
+                if attempt < LLM_MAX_RETRIES and is_retryable(e) and deadline - time.monotonic() > backoff + 1:
+                    attempt += 1
+                    _count("retries")
+                    time.sleep(backoff)
+                    continue
+                if counts_against_breaker(e):
+                    _after_call(probe, False)
+                elif probe:
+                    _after_call(probe, True)  # the upstream answered, so it's reachable
+                probe = False
+                raise
+            _after_call(probe, True)
+            probe = False
+            return result
+    finally:
+        if probe:
+            # Rejected by the bulkhead before probing; let the next caller probe.
+            with _lock:
+                _probe_in_flight = False
+        if acquired:
+            with _lock:
+                _in_flight -= 1
+            _bulkhead.release()
+
+
+def breaker_state():
+    with _lock:
+        if _state == OPEN and time.monotonic() - _opened_at >= LLM_BREAKER_COOLDOWN_SECONDS:
+            return HALF_OPEN
+        return _state
+
+
+def stats():
+    state = breaker_state()
+    with _lock:
+        snapshot = dict(_stats)
+        snapshot["in_flight"] = _in_flight
+        snapshot["consecutive_failures"] = _consecutive_failures
+    snapshot["breaker_state"] = state
+    snapshot["breaker_state_code"] = BREAKER_STATE_CODES[state]
+    snapshot["max_in_flight"] = AI_MAX_UPSTREAM_CALLS
+    return snapshot
+
+
+def reset():
+    """Closes the breaker and clears counters (benchmarks, tests)."""
+    global _state, _consecutive_failures, _opened_at, _probe_in_flight
+    with _lock:
+        _state, _consecutive_failures, _opened_at, _probe_in_flight = CLOSED, 0, 0.0, False
+        for key in _stats:
+            _stats[key] = 0